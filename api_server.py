@@ -0,0 +1,345 @@
+"""Local HTTP API for ERP integration (no Streamlit required)
+
+Usage:
+    python api_server.py [--address 127.0.0.1] [--port 8502] [--workers 2] [--logo logo.png]
+
+Endpoints (JSON in and out, quotations in the stored/exported format):
+    GET  /health
+    POST /api/totals                 {line_items, discount_percent, gst_percent, interstate}
+                                     -> line amounts and totals
+    POST /api/pdf[?engine=auto]      quotation -> application/pdf
+    GET  /api/quotations             ?customer=&from=&to=&limit=&offset=
+    POST /api/quotations             store a quotation (?on_conflict=skip|update|newer);
+                                     quote_ref and quote_date default to the next number and today
+    GET  /api/quotations/<ref>
+    GET  /api/quotations/<ref>/pdf
+
+Every response carries a Server-Timing header with the time spent in each stage.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import tornado.httpserver
+import tornado.log
+import tornado.netutil
+import tornado.web
+from tornado.ioloop import IOLoop
+
+from data import store
+from utils.batch_export import create_render_pool, render_quotation, default_worker_count, pdf_filename
+from utils.calculations import recalculate_quotation
+from utils.logo import prepare_logo
+from utils.pdf_cache import get_pdf_cache, quotation_cache_key
+
+ENGINES = ('auto', 'platypus', 'canvas')
+
+# Listing page size when none (or too large a one) is requested
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Offer validity of created quotations that do not give one (as the quotation form)
+DEFAULT_VALIDITY_DAYS = 15
+
+def checked_recalculation(quotation):
+    """Quotation with line amounts and totals recomputed (HTTP 400 on unusable line items)"""
+    items = quotation.get('line_items')
+    if not isinstance(items, list):
+        raise tornado.web.HTTPError(400, log_message='line_items must be a list')
+    for number, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            raise tornado.web.HTTPError(400, log_message=f'Line item {number} is not an object')
+        for field in ('qty', 'unit_price'):
+            value = item.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise tornado.web.HTTPError(400, log_message=f'Line item {number} has no numeric {field}')
+    return recalculate_quotation(quotation)
+
+class RenderService:
+    """Renders PDFs on a process pool behind the PDF cache, refusing work beyond max_pending"""
+
+    def __init__(self, workers=None, max_pending=None, timeout=60, logo=b'', db_threads=4, work_threads=4):
+        self.workers = workers or default_worker_count()
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self.logo = logo
+        self.pending = 0
+
+        self.pool = create_render_pool(self.workers)
+        # SQLite calls can wait on another writer's lock, so they stay off the IO loop
+        self.db_executor = ThreadPoolExecutor(db_threads, thread_name_prefix='api-db')
+        # Parsing, totals, cache keys and cache file reads grow with the quotation,
+        # so they stay off the IO loop too
+        self.work_executor = ThreadPoolExecutor(work_threads, thread_name_prefix='api-work')
+        self.cache = get_pdf_cache()
+
+    def warm_up(self):
+        """Start the render processes now rather than on the first request"""
+        # Unpickling the task imports the PDF modules in each worker
+        for future in [self.pool.submit(default_worker_count) for _ in range(self.workers)]:
+            future.result()
+
+    async def run_db(self, func, *args):
+        return await IOLoop.current().run_in_executor(self.db_executor, func, *args)
+
+    async def run_work(self, func, *args):
+        return await IOLoop.current().run_in_executor(self.work_executor, func, *args)
+
+    def cached(self, quotation, engine):
+        """(cache key, cached PDF bytes or None) - run on the work executor"""
+        key = quotation_cache_key(quotation, engine)
+        return key, self.cache.get(key)
+
+    async def render(self, quotation, engine, timings):
+        """PDF bytes for a quotation, from the cache or a render process"""
+        if self.logo:
+            quotation = {**quotation, 'company_logo': self.logo}
+        with timings('cache'):
+            key, data = await self.run_work(self.cached, quotation, engine)
+        if data is not None:
+            return data
+
+        if self.pending >= self.max_pending:
+            raise tornado.web.HTTPError(503, log_message=f'{self.pending} renders are already queued')
+        self.pending += 1
+        try:
+            with timings('render'):
+                future = IOLoop.current().run_in_executor(self.pool, render_quotation, quotation, engine)
+                # The worker finishes the render anyway; only the response gives up
+                _, data = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise tornado.web.HTTPError(504, log_message=f'Rendering took longer than {self.timeout:g} s')
+        except Exception as e:
+            raise tornado.web.HTTPError(422, log_message=f'Cannot render quotation: {type(e).__name__}: {e}')
+        finally:
+            self.pending -= 1
+
+        await self.run_work(self.cache.put, key, data)
+        return data
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        self.db_executor.shutdown()
+        self.work_executor.shutdown()
+
+class ApiHandler(tornado.web.RequestHandler):
+    """JSON errors and per-stage Server-Timing for every endpoint"""
+
+    def initialize(self, service):
+        self.service = service
+
+    def prepare(self):
+        self._start = time.perf_counter()
+        self._timings = []
+
+    @contextmanager
+    def timed(self, name):
+        """Record how long a block takes under name in the Server-Timing header"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timings.append((name, time.perf_counter() - start))
+
+    def finish(self, chunk=None):
+        timings = getattr(self, '_timings', [])
+        total = time.perf_counter() - getattr(self, '_start', time.perf_counter())
+        self.set_header('Server-Timing', ', '.join(
+            f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings + [('total', total)]))
+        return super().finish(chunk)
+
+    def write_error(self, status_code, **kwargs):
+        message = self._reason
+        exception = kwargs.get('exc_info', (None, None))[1]
+        if isinstance(exception, tornado.web.HTTPError) and exception.log_message:
+            message = exception.log_message
+        if status_code == 503:
+            self.set_header('Retry-After', '1')
+        self.finish({'error': message})
+
+    async def json_body(self):
+        """Decoded JSON object from the request body (400 if it is not one)"""
+        with self.timed('parse'):
+            try:
+                body = await self.service.run_work(json.loads, self.request.body)
+            except (ValueError, UnicodeDecodeError) as e:
+                raise tornado.web.HTTPError(400, log_message=f'Invalid JSON: {e}')
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, log_message='Request body must be a JSON object')
+        return body
+
+    async def write_json(self, data, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json; charset=UTF-8')
+        with self.timed('encode'):
+            body = await self.service.run_work(functools.partial(json.dumps, data, default=str))
+        self.finish(body)
+
+    async def recalculated(self, quotation):
+        """Quotation with line amounts and totals recomputed (400 on unusable line items)"""
+        with self.timed('calc'):
+            return await self.service.run_work(checked_recalculation, quotation)
+
+    async def send_pdf(self, quotation):
+        engine = self.get_query_argument('engine', 'auto')
+        if engine not in ENGINES:
+            raise tornado.web.HTTPError(400, log_message=f'engine must be one of {", ".join(ENGINES)}')
+        data = await self.service.render(quotation, engine, self.timed)
+        try:
+            filename = pdf_filename(quotation)
+        except ValueError:
+            filename = 'Quotation.pdf'
+        self.set_header('Content-Type', 'application/pdf')
+        self.set_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.finish(data)
+
+class HealthHandler(ApiHandler):
+    def get(self):
+        # Encoded in place - a health check must not queue behind large requests
+        self.finish({'status': 'ok', 'pending_renders': self.service.pending})
+
+class TotalsHandler(ApiHandler):
+    async def post(self):
+        body = await self.json_body()
+        quotation = await self.recalculated({
+            'line_items': body.get('line_items'),
+            'totals': {
+                'discount_percent': body.get('discount_percent', 0),
+                'gst_percent': body.get('gst_percent', 18),
+                'interstate': bool(body.get('interstate', False)),
+            },
+        })
+        await self.write_json({'line_items': quotation['line_items'], 'totals': quotation['totals']})
+
+class PdfHandler(ApiHandler):
+    async def post(self):
+        await self.send_pdf(await self.recalculated(await self.json_body()))
+
+class QuotationListHandler(ApiHandler):
+    async def get(self):
+        filters = (self.get_query_argument('customer', None),
+                   self.get_query_argument('from', None),
+                   self.get_query_argument('to', None))
+        try:
+            limit = min(int(self.get_query_argument('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            offset = max(int(self.get_query_argument('offset', 0)), 0)
+        except ValueError:
+            raise tornado.web.HTTPError(400, log_message='limit and offset must be integers')
+
+        def page():
+            # Stored JSON text is sent as-is, never decoded and re-encoded
+            rows = list(store.iter_quotation_json(*filters, limit=limit, offset=offset))
+            return store.count_quotations(*filters), rows
+
+        with self.timed('db'):
+            total, rows = await self.service.run_db(page)
+        self.set_header('Content-Type', 'application/json; charset=UTF-8')
+        self.finish(f'{{"total": {total}, "limit": {limit}, "offset": {offset}, '
+                    f'"quotations": [{",".join(rows)}]}}')
+
+    async def post(self):
+        on_conflict = self.get_query_argument('on_conflict', 'skip')
+        if on_conflict not in store.CONFLICT_MODES:
+            raise tornado.web.HTTPError(400, log_message=f'on_conflict must be one of {", ".join(store.CONFLICT_MODES)}')
+
+        quotation = await self.recalculated(await self.json_body())
+        if not (quotation.get('client') or {}).get('name'):
+            raise tornado.web.HTTPError(400, log_message='client.name is required')
+        quotation.pop('company_logo', None)
+        with self.timed('db'):
+            if not quotation.get('quote_ref'):
+                quotation['quote_ref'] = await self.service.run_db(store.next_quote_ref)
+            now = datetime.now()
+            quotation.setdefault('quote_date', now.strftime('%d-%b-%Y'))
+            if 'validity_date' not in quotation:
+                quote_day = store.to_iso_date(quotation['quote_date'])
+                start = datetime.strptime(quote_day, '%Y-%m-%d') if quote_day else now
+                quotation['validity_date'] = (start + timedelta(days=DEFAULT_VALIDITY_DAYS)).strftime('%d-%b-%Y')
+            quotation['created_at'] = now.isoformat()
+            stats = await self.service.run_db(store.merge_quotations, [quotation], on_conflict)
+
+        if stats['invalid']:
+            raise tornado.web.HTTPError(400, log_message=stats['errors'][0][1])
+        if stats['skipped']:
+            raise tornado.web.HTTPError(409, log_message=f"{quotation['quote_ref']} already exists")
+        self.set_header('Location', f"/api/quotations/{quotation['quote_ref']}")
+        await self.write_json(quotation, 201 if stats['inserted'] else 200)
+
+class QuotationHandler(ApiHandler):
+    async def stored(self, quote_ref):
+        with self.timed('db'):
+            quotation = await self.service.run_db(store.fetch_quotation, quote_ref)
+        if quotation is None:
+            raise tornado.web.HTTPError(404, log_message=f'No quotation {quote_ref}')
+        return quotation
+
+    async def get(self, quote_ref):
+        await self.write_json(await self.stored(quote_ref))
+
+class QuotationPdfHandler(QuotationHandler):
+    async def get(self, quote_ref):
+        await self.send_pdf(await self.stored(quote_ref))
+
+def make_app(service):
+    routes = [
+        (r'/health', HealthHandler),
+        (r'/api/totals', TotalsHandler),
+        (r'/api/pdf', PdfHandler),
+        (r'/api/quotations', QuotationListHandler),
+        (r'/api/quotations/([^/]+)', QuotationHandler),
+        (r'/api/quotations/([^/]+)/pdf', QuotationPdfHandler),
+    ]
+    return tornado.web.Application([(path, handler, {'service': service}) for path, handler in routes])
+
+async def serve(args):
+    logo = b''
+    if args.logo:
+        with open(args.logo, 'rb') as f:
+            logo = prepare_logo(f.read())
+    service = RenderService(args.workers, args.max_pending, args.render_timeout, logo)
+    service.warm_up()
+
+    # HTTP/1.1 keep-alive is on by default; idle connections close after --keep-alive seconds
+    server = tornado.httpserver.HTTPServer(make_app(service), idle_connection_timeout=args.keep_alive,
+                                           max_body_size=args.max_body_mb * 1024 * 1024)
+    sockets = tornado.netutil.bind_sockets(args.port, args.address)
+    server.add_sockets(sockets)
+    # The bound port is printed so --port 0 (any free port) can be used in tests
+    print(f'Listening on http://{args.address}:{sockets[0].getsockname()[1]}', flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        server.stop()
+        await server.close_all_connections()
+        service.close()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Quotation HTTP API')
+    parser.add_argument('--address', default='127.0.0.1', help='Interface to listen on (default: localhost only)')
+    parser.add_argument('--port', type=int, default=8502, help='Port (0 picks a free one)')
+    parser.add_argument('-w', '--workers', type=int, default=default_worker_count(),
+                        help='Render processes (default: CPU count)')
+    parser.add_argument('--max-pending', type=int, help='Renders allowed to wait before 503 (default: 4 per worker)')
+    parser.add_argument('--render-timeout', type=float, default=60, help='Seconds before a render answers 504')
+    parser.add_argument('--keep-alive', type=float, default=75, help='Idle keep-alive timeout in seconds')
+    parser.add_argument('--max-body-mb', type=int, default=64, help='Largest accepted request body')
+    parser.add_argument('--logo', help='Company logo added to every rendered PDF')
+    return parser
+
+def main(argv=None):
+    tornado.log.enable_pretty_logging()
+    asyncio.run(serve(build_parser().parse_args(argv)))
+
+if __name__ == '__main__':
+    main()
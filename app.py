@@ -1,11 +1,35 @@
 import streamlit as st
 import pandas as pd
+import altair as alt
 from datetime import datetime, timedelta
+import io
 import json
 import os
-from utils.pdf_generator import generate_quotation_pdf
+import tempfile
+from utils.pdf_cache import get_quotation_pdf, get_pdf_cache
+from utils.jobs import get_job_queue, QueueFull, DONE
+from utils import metrics
+from utils.batch_export import export_quotations_zip, default_worker_count, ExportTooLarge
 from utils.calculations import calculate_totals
-from data.quotations import init_session_state, save_quotation, get_quotations
+from utils.line_items import LineItem, items_page_frame, changed_rows
+from utils.line_item_import import import_line_items
+from data.catalogue import get_catalogue
+from data.search import RANKED_MATCHES
+from utils.gst_rates import lookup_gst_rate
+from utils.logo import prepare_logo
+from data.quotations import (init_session_state, save_quotation,
+                             get_quotation_summaries, count_quotation_summaries,
+                             search_quotations, count_search_results,
+                             get_sales_rollups, get_company_profile,
+                             get_company_profiles, save_company_profile,
+                             delete_company_profile,
+                             clear_quotations, get_draft_quote_ref,
+                             get_quotation_by_ref, iter_quotations,
+                             count_quotations, add_line_item, add_line_items,
+                             remove_line_items,
+                             update_line_item,
+                             get_draft_totals, export_quotations_ndjson,
+                             import_quotations_json, import_quotations_ndjson)
 
 # Page configuration
 st.set_page_config(page_title="Quotation Generator",
@@ -21,67 +45,109 @@ st.title("📄 Professional Quotation Generator")
 # Sidebar for navigation
 st.sidebar.title("Navigation")
 page = st.sidebar.radio(
-    "Select Page", ["Create Quotation", "Manage Quotations", "Configuration"],
+    "Select Page", ["Create Quotation", "Manage Quotations", "Analytics", "Configuration", "Diagnostics"],
     index=0)
 
-if page == "Create Quotation":
-    st.header("Create New Quotation")
-
-    # Create two columns for better layout
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        # Customer Information Section
-        st.subheader("Customer Information")
-
-        client_name = st.text_input("Customer Name",
-                                    placeholder="M/s. Customer Name")
-        client_address = st.text_area("Customer Address",
-                                      placeholder="Customer Address")
-
-        col_cust1, col_cust2 = st.columns(2)
-        with col_cust1:
-            client_contact_person = st.text_input("Contact Person",
-                                                  placeholder="Mr./Ms. Name")
-            client_email = st.text_input("Email",
-                                         placeholder="customer@email.com")
-        with col_cust2:
-            client_phone = st.text_input("Customer Phone",
-                                         placeholder="+91-XXXXXXXXXX")
-
-        # Quotation Details
-        st.subheader("Quotation Details")
-
-        col_q1, col_q2 = st.columns(2)
-        with col_q1:
-            quote_ref = st.text_input(
-                "Quote Reference",
-                value=
-                f"Q{datetime.now().strftime('%Y%m%d')}{len(st.session_state.quotations) + 1:03d}"
-            )
-            subject = st.text_input("Subject",
-                                    placeholder="Offer for Supply of...")
-        with col_q2:
-            # Date validation - only current and back-dated (up to 25 days)
-            today = datetime.now().date()
-            min_date = today - timedelta(days=25)
-            quote_date = st.date_input("Quote Date",
-                                       value=today,
-                                       min_value=min_date,
-                                       max_value=today)
-            validity_days = st.number_input("Validity (Days)",
-                                            min_value=1,
-                                            value=15)
-
-        # Line Items Section
-        st.subheader("Line Items")
+# Create Quotation sections - each fragment reruns on its own, so typing in
+# one field no longer re-executes the whole page
+
+@st.fragment
+def customer_section():
+    """Customer and quotation details"""
+    # Customer Information Section
+    st.subheader("Customer Information")
+
+    client_name = st.text_input("Customer Name",
+                                placeholder="M/s. Customer Name")
+    client_address = st.text_area("Customer Address",
+                                  placeholder="Customer Address")
+
+    col_cust1, col_cust2 = st.columns(2)
+    with col_cust1:
+        client_contact_person = st.text_input("Contact Person",
+                                              placeholder="Mr./Ms. Name")
+        client_email = st.text_input("Email",
+                                     placeholder="customer@email.com")
+    with col_cust2:
+        client_phone = st.text_input("Customer Phone",
+                                     placeholder="+91-XXXXXXXXXX")
+
+    # Quotation Details
+    st.subheader("Quotation Details")
+
+    col_q1, col_q2 = st.columns(2)
+    with col_q1:
+        quote_ref = st.text_input(
+            "Quote Reference",
+            value=get_draft_quote_ref())
+        subject = st.text_input("Subject",
+                                placeholder="Offer for Supply of...")
+    with col_q2:
+        # Date validation - only current and back-dated (up to 25 days)
+        today = datetime.now().date()
+        min_date = today - timedelta(days=25)
+        quote_date = st.date_input("Quote Date",
+                                   value=today,
+                                   min_value=min_date,
+                                   max_value=today)
+        validity_days = st.number_input("Validity (Days)",
+                                        min_value=1,
+                                        value=15)
+
+    # Read by the preview section when the PDF is generated
+    st.session_state.draft_details = {
+        'quote_ref': quote_ref,
+        'quote_date': quote_date,
+        'validity_days': validity_days,
+        'subject': subject,
+        'client': {
+            'name': client_name,
+            'address': client_address,
+            'email': client_email,
+            'phone': client_phone,
+            'contact_person': client_contact_person
+        }
+    }
 
-        # Initialize line items in session state if not exists
-        if 'current_line_items' not in st.session_state:
-            st.session_state.current_line_items = []
 
-        # Add new line item form
-        with st.expander("Add New Line Item", expanded=True):
+@st.fragment
+def add_item_section():
+    """Add-item form - fields are only sent when the form is submitted"""
+    with st.expander("Add New Line Item", expanded=True):
+        # Catalogue search - the index is built once per process and shared by all sessions
+        catalogue = get_catalogue()
+        if catalogue:
+            query = st.text_input("Search Catalogue",
+                                  placeholder="Part number or description",
+                                  key="catalogue_query")
+            matches = {product['part_no']: product
+                       for product in catalogue.search(query)} if query else {}
+            if matches:
+                col_match1, col_match2 = st.columns([4, 1],
+                                                    vertical_alignment="bottom")
+                with col_match1:
+                    part_no = st.selectbox(
+                        "Matching Parts",
+                        list(matches),
+                        format_func=lambda p: f"{p} - {matches[p]['description']}")
+                with col_match2:
+                    # Pre-fill the form below (set before its widgets are created)
+                    if st.button("Use Part", use_container_width=True):
+                        product = matches[part_no]
+                        st.session_state.new_part_no = product['part_no']
+                        st.session_state.new_description = product['description']
+                        st.session_state.new_hsn = product['hsn']
+                        if product['list_price']:
+                            st.session_state.new_unit_price = product['list_price']
+                        if product['delivery_weeks']:
+                            st.session_state.new_delivery = max(1, product['delivery_weeks'])
+            elif query:
+                st.caption("No matching parts in the catalogue.")
+
+        # Default set through session state so the catalogue can overwrite it
+        st.session_state.setdefault('new_delivery', 4)
+
+        with st.form("add_line_item_form", border=False):
             col_item1, col_item2 = st.columns(2)
             with col_item1:
                 item_part_no = st.text_input("Item", key="new_part_no")
@@ -90,285 +156,648 @@ if page == "Create Quotation":
                 item_hsn = st.text_input("HSN Code", key="new_hsn")
                 item_delivery = st.number_input("Delivery (weeks)",
                                                 min_value=1,
-                                                value=4,
                                                 key="new_delivery")
             with col_item2:
+                # Defaults are the minimum values
                 item_qty = st.number_input("Quantity",
                                            min_value=1,
-                                           value=1,
                                            key="new_qty")
                 item_unit_price = st.number_input("Unit Price (₹)",
                                                   min_value=0.0,
-                                                  value=0.0,
                                                   step=0.01,
                                                   key="new_unit_price")
                 item_discount = st.number_input("Item Discount (%)",
                                                 min_value=0.0,
                                                 max_value=100.0,
-                                                value=0.0,
                                                 step=0.1,
                                                 key="new_discount")
 
-            if st.button("Add Item", type="primary"):
-                if item_part_no and item_description and item_qty > 0 and item_unit_price > 0:
-                    # Calculate total price with discount
-                    gross_amount = item_qty * item_unit_price
-                    discount_amount = gross_amount * (item_discount / 100)
-                    total_price = gross_amount - discount_amount
-
-                    new_item = {
-                        'part_no': item_part_no,
-                        'description': item_description,
-                        'hsn': item_hsn,
-                        'qty': item_qty,
-                        'unit_price': item_unit_price,
-                        'delivery_weeks': item_delivery,
-                        'discount_percent': item_discount,
-                        'discount_amount': discount_amount,
-                        'total_price': total_price
-                    }
-                    st.session_state.current_line_items.append(new_item)
-                    st.success("Item added successfully!")
-                    st.rerun()
-                else:
-                    st.error(
-                        "Please fill in all required fields with valid values."
-                    )
-
-        # Display current line items
-        if st.session_state.current_line_items:
-            st.subheader("Current Line Items")
-
-            # Create DataFrame for display
-            df = pd.DataFrame(st.session_state.current_line_items)
-
-            # Display items with edit/delete options
-            for idx, item in enumerate(st.session_state.current_line_items):
-                with st.container():
-                    col_display1, col_display2, col_actions = st.columns(
-                        [3, 2, 1])
-
-                    with col_display1:
-                        st.write(
-                            f"**{item['part_no']}** - {item['description']}")
-                        st.write(f"HSN: {item['hsn']}")
-                        if item.get('delivery_weeks'):
-                            st.write(
-                                f"Delivery: {item['delivery_weeks']} weeks")
-
-                    with col_display2:
-                        st.write(f"Qty: {item['qty']}")
-                        st.write(f"Unit Price: ₹{item['unit_price']:,.2f}")
-                        if item.get('discount_percent', 0) > 0:
-                            st.write(
-                                f"Discount: {item['discount_percent']:.1f}%")
-                        st.write(f"**Total: ₹{item['total_price']:,.2f}**")
-
-                    with col_actions:
-                        if st.button("🗑️",
-                                     key=f"delete_{idx}",
-                                     help="Delete item"):
-                            st.session_state.current_line_items.pop(idx)
-                            st.rerun()
-
-                    st.divider()
-
-        # Terms and Conditions
-        st.subheader("Terms & Conditions")
-
-        # Basic Terms
-        col_terms1, col_terms2 = st.columns(2)
-        with col_terms1:
-            gst_percent = st.number_input("Taxes (%)",
-                                          min_value=0.0,
-                                          value=18.0,
-                                          step=0.1)
-            payment_options = [
-                "100% Against PI", "50% Advance Balance Against PI",
-                "30% Advance Balance Against PI", "Custom"
-            ]
-            payment_choice = st.selectbox("Payment Terms", payment_options)
-            if payment_choice == "Custom":
-                payment_terms = st.text_input("Custom Payment Terms",
-                                              value="100% Against PI")
+            submitted = st.form_submit_button("Add Item", type="primary")
+
+        if submitted:
+            if item_part_no and item_description and item_qty > 0 and item_unit_price > 0:
+                # Line amounts (discount and total) are derived by LineItem,
+                # the GST rate comes from the HSN rate table
+                new_item = LineItem(item_part_no, item_description,
+                                    item_hsn, item_qty, item_unit_price,
+                                    item_delivery, item_discount,
+                                    gst_percent=lookup_gst_rate(item_hsn))
+                add_line_item(new_item)
+                # The grid and preview depend on the items - refresh the whole page
+                st.rerun()
             else:
-                payment_terms = payment_choice
+                st.error(
+                    "Please fill in all required fields with valid values.")
+
+
+@st.fragment
+def import_items_section():
+    """Bulk import of line items from a CSV/XLSX sheet"""
+    with st.expander("Import Line Items from CSV / Excel"):
+        st.caption("Columns: Item, Description, HSN Code, Quantity, Unit Price, "
+                   "Discount (%) and Delivery (weeks). Discount and delivery are optional.")
+        item_file = st.file_uploader("Line item sheet",
+                                     type=['csv', 'xlsx'],
+                                     key="line_item_file")
+        if not item_file:
+            st.session_state.pop('line_item_import_report', None)
+
+        if item_file and st.button("Import Items"):
+            try:
+                items, errors = import_line_items(item_file)
+            except ValueError as e:
+                st.error(f"Could not import {item_file.name}: {e}")
+            else:
+                add_line_items(items)
+                # Kept for the report below, which is shown after the page refresh
+                st.session_state.line_item_import_report = {
+                    'file': item_file.name,
+                    'imported': len(items),
+                    'errors': errors
+                }
+                st.rerun()
+
+        report = st.session_state.get('line_item_import_report')
+        if report:
+            st.success(f"Imported {report['imported']} items from {report['file']}.")
+            if report['errors']:
+                st.warning(f"{len(report['errors'])} rows were skipped:")
+                st.dataframe(pd.DataFrame(report['errors'],
+                                          columns=['Row', 'Errors']),
+                             hide_index=True,
+                             use_container_width=True)
+
+
+@st.fragment
+def line_items_section():
+    """Paged grid of the draft line items - only the visible page is rendered"""
+    if not st.session_state.current_line_items:
+        return
+
+    st.subheader("Current Line Items")
+
+    line_items = st.session_state.current_line_items
+    col_page1, col_page2, col_page3 = st.columns([1, 1, 2])
+    with col_page1:
+        page_size = st.selectbox("Rows per page", [25, 50, 100],
+                                 key="items_page_size")
+    page_count = max(1, -(-len(line_items) // page_size))
+    # Stay on a valid page after deletions
+    if st.session_state.get('items_page', 1) > page_count:
+        st.session_state.items_page = page_count
+    with col_page2:
+        page_number = st.number_input("Page",
+                                      min_value=1,
+                                      max_value=page_count,
+                                      key="items_page")
+    with col_page3:
+        st.caption(f"{len(line_items)} items · page {page_number} of {page_count}")
+
+    page_start = (page_number - 1) * page_size
+    page_frame = items_page_frame(line_items, page_start,
+                                  page_start + page_size)
+
+    # Keyed on the draft version so the grid resets after every applied change
+    edited_frame = st.data_editor(
+        page_frame,
+        key=f"line_item_editor_{st.session_state.get('line_items_version', 0)}_{page_start}_{page_size}",
+        hide_index=True,
+        use_container_width=True,
+        num_rows="fixed",
+        disabled=['sr', 'total_price'],
+        column_config={
+            'sr': st.column_config.NumberColumn("Sr.", width="small"),
+            'part_no': st.column_config.TextColumn("Item", required=True),
+            'description': st.column_config.TextColumn("Description", required=True),
+            'hsn': st.column_config.TextColumn("HSN"),
+            'gst_percent': st.column_config.NumberColumn("GST (%)", min_value=0.0, max_value=100.0, format="%g"),
+            'delivery_weeks': st.column_config.NumberColumn("Delivery (weeks)", min_value=1, step=1),
+            'qty': st.column_config.NumberColumn("Qty", min_value=1, step=1, required=True),
+            'unit_price': st.column_config.NumberColumn("Unit Price (₹)", min_value=0.0, format="%.2f", required=True),
+            'discount_percent': st.column_config.NumberColumn("Discount (%)", min_value=0.0, max_value=100.0, format="%.1f"),
+            'total_price': st.column_config.NumberColumn("Total (₹)", format="%.2f"),
+            'delete': st.column_config.CheckboxColumn("Delete"),
+        })
+
+    # Inline edits - only the changed rows are recomputed, then the preview is refreshed
+    edited_rows = changed_rows(page_frame, edited_frame)
+    if edited_rows:
+        for position, changes in edited_rows.items():
+            update_line_item(position, changes)
+        st.rerun()
 
-        with col_terms2:
-            price_terms = st.text_input("Price", value="Ex-works, Mumbai")
-            freight_terms = st.text_input("Freight & Transit Insurance",
-                                          value="In your scope")
+    selected_rows = edited_frame.index[edited_frame['delete']].tolist()
+    if st.button(f"Delete Selected ({len(selected_rows)})",
+                 disabled=not selected_rows):
+        remove_line_items(selected_rows)
+        st.rerun()
 
-        additional_terms = st.text_area(
-            "Additional Terms and Conditions",
-            value=
-            "Packing: 2% Extra.\nInstallation & Commissioning charges not included."
-        )
 
-        st.divider()
+@st.fragment
+def terms_section():
+    """Terms and conditions"""
+    st.subheader("Terms & Conditions")
+
+    # Basic Terms
+    col_terms1, col_terms2 = st.columns(2)
+    with col_terms1:
+        gst_percent = st.number_input(
+            "Taxes (%)",
+            min_value=0.0,
+            value=18.0,
+            step=0.1,
+            help="Default GST rate for lines whose HSN code is not in the rate table")
+        interstate = st.checkbox("Inter-state supply (IGST)")
+        payment_options = [
+            "100% Against PI", "50% Advance Balance Against PI",
+            "30% Advance Balance Against PI", "Custom"
+        ]
+        payment_choice = st.selectbox("Payment Terms", payment_options)
+        if payment_choice == "Custom":
+            payment_terms = st.text_input("Custom Payment Terms",
+                                          value="100% Against PI")
+        else:
+            payment_terms = payment_choice
+
+    with col_terms2:
+        price_terms = st.text_input("Price", value="Ex-works, Mumbai")
+        freight_terms = st.text_input("Freight & Transit Insurance",
+                                      value="In your scope")
+
+    additional_terms = st.text_area(
+        "Additional Terms and Conditions",
+        value=
+        "Packing: 2% Extra.\nInstallation & Commissioning charges not included."
+    )
+
+    previous_terms = st.session_state.get('draft_terms')
+    st.session_state.draft_terms = {
+        'gst_percent': gst_percent,
+        'interstate': interstate,
+        'payment': payment_terms,
+        'price': price_terms,
+        'freight': freight_terms,
+        'additional': additional_terms
+    }
 
-        # Get extended terms from session state for PDF generation
-        warranty_terms = st.session_state.get(
-            'company_warranty',
-            "Period shall be within 12 months from the date of commissioning or 18 months from the date of supply whichever is earlier. Warranty is not applicable for spare parts."
-        )
+    # The preview totals depend on the tax settings - refresh the page when they change
+    if previous_terms is not None and (previous_terms['gst_percent'] != gst_percent
+                                       or previous_terms['interstate'] != interstate):
+        st.rerun()
 
-        cancellation_terms = st.session_state.get(
-            'company_cancellation',
-            "In case of cancellation of order after 7 days of PO placement, cancellation charges would be applicable at the rate of 20% for standard valves and 40% for Non Standard valves on the order value."
-        )
 
-        penalty_terms = st.session_state.get(
-            'company_penalty',
-            "In case of Non lifting of consignment after the contractual delivery date, we reserve the right to charge penalty at the rate of 5% per month on order value."
-        )
+@st.fragment
+def preview_section():
+    """Totals and PDF generation"""
+    st.subheader("Quotation Preview")
 
-    with col2:
-        # Preview Section
-        st.subheader("Quotation Preview")
-
-        if st.session_state.current_line_items:
-            # Calculate totals
-            totals = calculate_totals(st.session_state.current_line_items, 0,
-                                      gst_percent)
-
-            # Display summary
-            st.metric("Subtotal", f"₹{totals['subtotal']:,.2f}")
-            st.metric("Taxable Amount", f"₹{totals['taxable_amount']:,.2f}")
-            st.metric("GST", f"₹{totals['gst_amount']:,.2f}")
-            st.metric("**Total Amount**", f"₹{totals['total_amount']:,.2f}")
-
-            # Generate PDF button
-            if st.button("Generate PDF",
-                         type="primary",
-                         use_container_width=True):
-                if client_name and quote_ref:
-                    quotation_data = {
-                        'quote_ref':
-                        quote_ref,
-                        'quote_date':
-                        quote_date.strftime('%d-%b-%Y'),
-                        'validity_date':
-                        (quote_date +
-                         timedelta(days=validity_days)).strftime('%d-%b-%Y'),
-                        'company': {
-                            'name':
-                            st.session_state.get('company_name',
-                                                 'MACHT AUTOMATION LLP'),
-                            'address':
-                            st.session_state.get(
-                                'company_address',
-                                'Off 01, Grd Floor, Laxmi Niwas, Ram Maruti Road, Naupada, Thane (W) Thane 400602, Maharashtra, India.'
-                            ),
-                            'email':
-                            st.session_state.get('company_email',
-                                                 'sales@macht-automation.com'),
-                            'phone':
-                            st.session_state.get('company_phone',
-                                                 '9820667352 / 9167930569'),
-                            'gst':
-                            st.session_state.get('company_gst',
-                                                 '27ABRFM7709G1ZR'),
-                            'msme':
-                            st.session_state.get('company_msme',
-                                                 'UDYAM-MH-33-0133361')
-                        },
-                        'client': {
-                            'name': client_name,
-                            'address': client_address,
-                            'email': client_email,
-                            'phone': client_phone,
-                            'contact_person': client_contact_person
-                        },
-                        'subject':
-                        subject,
-                        'line_items':
-                        st.session_state.current_line_items,
-                        'totals':
-                        totals,
-                        'terms': {
-                            'payment': payment_terms,
-                            'price': price_terms,
-                            'freight': freight_terms,
-                            'warranty': warranty_terms,
-                            'cancellation': cancellation_terms,
-                            'penalty': penalty_terms,
-                            'additional': additional_terms
-                        }
-                    }
-
-                    # Generate PDF
-                    pdf_buffer = generate_quotation_pdf(quotation_data)
-
-                    # Save quotation
-                    save_quotation(quotation_data)
-
-                    # Download button
-                    st.download_button(label="Download PDF",
-                                       data=pdf_buffer,
-                                       file_name=f"Quotation_{quote_ref}.pdf",
-                                       mime="application/pdf",
-                                       type="primary")
-
-                    st.success("Quotation generated successfully!")
-                else:
-                    st.error(
-                        "Please fill in Customer Name and Quote Reference.")
+    if not st.session_state.current_line_items:
+        st.info("Add line items to see preview and generate PDF.")
+        return
+
+    details = st.session_state.draft_details
+    terms = st.session_state.draft_terms
+    gst_percent = terms['gst_percent']
+    interstate = terms['interstate']
+
+    # Running totals - O(1) per line change however many lines the draft has
+    totals = get_draft_totals(0, gst_percent, interstate)
+
+    # Display summary
+    st.metric("Subtotal", f"₹{totals['subtotal']:,.2f}")
+    st.metric("Taxable Amount", f"₹{totals['taxable_amount']:,.2f}")
+    st.metric("GST", f"₹{totals['gst_amount']:,.2f}")
+    for slab in totals['gst_slabs']:
+        if interstate:
+            st.caption(f"IGST @ {slab['rate']:g}% on ₹{slab['taxable_amount']:,.2f}: "
+                       f"₹{slab['igst_amount']:,.2f}")
         else:
-            st.info("Add line items to see preview and generate PDF.")
+            st.caption(f"CGST + SGST @ {slab['rate'] / 2:g}% + {slab['rate'] / 2:g}% "
+                       f"on ₹{slab['taxable_amount']:,.2f}: ₹{slab['gst_amount']:,.2f}")
+    st.metric("**Total Amount**", f"₹{totals['total_amount']:,.2f}")
+
+    # Generate PDF button
+    if st.button("Generate PDF",
+                 type="primary",
+                 use_container_width=True):
+        quote_ref = details['quote_ref']
+        quote_date = details['quote_date']
+        if details['client']['name'] and quote_ref:
+            company = get_company_profile()
+            quotation_data = {
+                'quote_ref':
+                quote_ref,
+                'quote_date':
+                quote_date.strftime('%d-%b-%Y'),
+                'validity_date':
+                (quote_date +
+                 timedelta(days=details['validity_days'])).strftime('%d-%b-%Y'),
+                'company': {
+                    field: company[field]
+                    for field in ('name', 'address', 'email', 'phone', 'gst', 'msme')
+                },
+                'client':
+                dict(details['client']),
+                'subject':
+                details['subject'],
+                'company_logo':
+                st.session_state.get('company_logo'),
+                'line_items':
+                [item.to_dict() for item in st.session_state.current_line_items],
+                # Exact totals for the saved quotation (one pass on click only)
+                'totals':
+                calculate_totals(st.session_state.current_line_items,
+                                 0, gst_percent, interstate),
+                'terms': {
+                    'payment': terms['payment'],
+                    'price': terms['price'],
+                    'freight': terms['freight'],
+                    # Extended terms come from the company profile
+                    'warranty': company['warranty'],
+                    'cancellation': company['cancellation'],
+                    'penalty': company['penalty'],
+                    'additional': terms['additional']
+                }
+            }
+
+            # Saving never overwrites a stored quotation (e.g. an imported or typed reference)
+            if get_quotation_by_ref(quote_ref) is not None:
+                st.error(f"Quotation {quote_ref} already exists. Please use another Quote Reference.")
+            # Render in the background; the draft is only saved once queued
+            elif submit_pdf_job(quotation_data):
+                save_quotation(quotation_data)
+                st.rerun()
+        else:
+            st.error(
+                "Please fill in Customer Name and Quote Reference.")
+
+# PDF rendering runs on the shared background job queue so a large quote
+# never blocks the page; sessions keep their job ids and poll for the result
+JOB_POLL_SECONDS = 1
+
+def submit_pdf_job(quotation):
+    """Queue a PDF render for this session, returning False when the queue is full"""
+    try:
+        # A copy, as the caller may go on to change the quotation while it renders
+        job_id = get_job_queue().submit(get_quotation_pdf, dict(quotation),
+                                        label=quotation['quote_ref'])
+    except QueueFull:
+        st.warning("The PDF queue is busy, please try again in a moment.")
+        return False
+    st.session_state.setdefault('pdf_jobs', []).insert(0, job_id)
+    return True
+
+def pdf_jobs_section(polling):
+    """Status of this session's PDF renders, with a download once each finishes"""
+    queue = get_job_queue()
+    jobs = [job for job in map(queue.get, st.session_state.get('pdf_jobs', [])) if job]
+    # Expired jobs are forgotten by the queue
+    st.session_state.pdf_jobs = [job.id for job in jobs]
+    if not jobs:
+        return
+
+    st.subheader("PDF Jobs")
+    for job in jobs:
+        with st.container(border=True):
+            if job.state == DONE:
+                st.download_button(label=f"Download {job.label}",
+                                   data=job.result,
+                                   file_name=f"Quotation_{job.label}.pdf",
+                                   mime="application/pdf",
+                                   type="primary",
+                                   key=f"download_job_{job.id}")
+            elif not job.finished:
+                st.caption(f"{job.label}: {job.state} ({job.elapsed:.0f} s)")
+                st.button("Cancel", key=f"cancel_job_{job.id}",
+                          on_click=queue.cancel, args=(job.id,))
+                continue
+            else:
+                st.warning(f"{job.label}: {job.error}")
+            st.button("Dismiss", key=f"dismiss_job_{job.id}",
+                      on_click=queue.forget, args=(job.id,))
 
-elif page == "Manage Quotations":
-    st.header("Manage Quotations")
+    # Everything finished - rerun once more so the page stops polling
+    if polling and all(job.finished for job in jobs):
+        st.rerun()
+
+def show_pdf_jobs():
+    """Render the PDF job list, polling while any job is unfinished"""
+    queue = get_job_queue()
+    polling = any(job and not job.finished
+                  for job in map(queue.get, st.session_state.get('pdf_jobs', [])))
+    st.fragment(pdf_jobs_section, run_every=JOB_POLL_SECONDS if polling else None)(polling)
+
+# Streamlit holds a download in memory until it is fetched, so ZIP exports
+# stop at this size (override with QUOTATION_EXPORT_MAX_MB)
+EXPORT_MAX_MB = int(os.environ.get('QUOTATION_EXPORT_MAX_MB', 200))
+
+# Rollup dimensions on the Analytics page: (choice, key column, label for a blank key)
+ROLLUP_VIEWS = {
+    'customer': ("By Customer", "Customer", "(no customer)"),
+    'month': ("By Month", "Month", "(no date)"),
+    'hsn': ("By HSN Code", "HSN Code", "(no HSN)"),
+}
+
+# Bars shown in the customer and HSN charts (the table lists every row)
+ROLLUP_CHART_ROWS = 20
+
+def rollup_frame(rows, key_column, blank_label):
+    """Analytics table of one rollup dimension"""
+    return pd.DataFrame([{
+        key_column: row['key'] or blank_label,
+        'Quotations': row['quotes'],
+        'Lines': row['lines'],
+        'Quoted Value': row['total_amount'],
+        'Taxable Amount': row['taxable_amount'],
+        'CGST + SGST': row['gst_amount'] - row['igst_amount'],
+        'IGST': row['igst_amount'],
+        'Avg Discount (%)': (row['discount_amount'] / row['gross_amount'] * 100
+                             if row['gross_amount'] else 0.0),
+        'Avg Quote Value': row['total_amount'] / row['quotes'] if row['quotes'] else 0.0,
+    } for row in rows])
+
+
+if page == "Create Quotation":
+    st.header("Create New Quotation")
 
-    quotations = get_quotations()
+    # Create two columns for better layout
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        customer_section()
+
+        # Line Items Section
+        st.subheader("Line Items")
+        add_item_section()
+        import_items_section()
+        line_items_section()
+
+        terms_section()
+
+        st.divider()
 
-    if quotations:
-        st.subheader(f"Total Quotations: {len(quotations)}")
+    with col2:
+        # Preview Section
+        preview_section()
+        show_pdf_jobs()
 
-        # Display quotations in a table
-        quotation_data = []
-        for quote in quotations:
-            quotation_data.append({
-                'Quote Ref': quote['quote_ref'],
-                'Date': quote['quote_date'],
-                'Customer': quote['client']['name'],
-                'Total Amount': f"₹{quote['totals']['total_amount']:,.2f}",
-                'Items': len(quote['line_items'])
-            })
+elif page == "Manage Quotations":
+    st.header("Manage Quotations")
 
-        df = pd.DataFrame(quotation_data)
-        st.dataframe(df, use_container_width=True)
+    stored_total = count_quotation_summaries()
+
+    if stored_total:
+        st.subheader(f"Total Quotations: {stored_total}")
+
+        # Full-text search over customer, address, subject, part numbers and descriptions
+        list_search = st.text_input("Search",
+                                    placeholder="Customer, city, subject, part no. or description",
+                                    key="list_search").strip()
+
+        # Filters, sorting and paging all run in SQL on the summary columns, so
+        # only the visible page is ever loaded however large the history is
+        col_filter1, col_filter2, col_filter3, col_filter4 = st.columns(4)
+        with col_filter1:
+            list_customer = st.text_input("Customer starts with", key="list_customer")
+        with col_filter2:
+            list_dates = st.date_input("Quote Date Range", value=(), key="list_dates")
+        with col_filter3:
+            list_min_total = st.number_input("Min Amount (₹)", min_value=0.0, value=None,
+                                             step=1000.0, key="list_min_total")
+        with col_filter4:
+            list_max_total = st.number_input("Max Amount (₹)", min_value=0.0, value=None,
+                                             step=1000.0, key="list_max_total")
+
+        list_date_from, list_date_to = (list_dates if len(list_dates) == 2
+                                        else (None, None))
+        list_filters = dict(customer=list_customer.strip() or None,
+                            date_from=list_date_from,
+                            date_to=list_date_to,
+                            min_total=list_min_total,
+                            max_total=list_max_total)
+        if list_search:
+            # Counted only as far as ranking goes; larger result sets are listed newest first
+            matching = count_search_results(list_search, **list_filters, cap=RANKED_MATCHES + 1)
+        else:
+            matching = count_quotation_summaries(**list_filters)
+
+        sort_labels = {
+            'date': "Date",
+            'customer': "Customer",
+            'total': "Total Amount"
+        }
+        col_sort1, col_sort2, col_sort3, col_sort4 = st.columns(4)
+        with col_sort1:
+            list_sort = st.selectbox("Sort by", list(sort_labels),
+                                     format_func=sort_labels.get, key="list_sort",
+                                     disabled=bool(list_search),
+                                     help="Search results are ordered by relevance")
+        with col_sort2:
+            list_descending = st.toggle("Descending", value=True, key="list_descending",
+                                        disabled=bool(list_search))
+        with col_sort3:
+            page_size = st.selectbox("Rows per page", [25, 50, 100], index=1,
+                                     key="list_page_size")
+        page_count = max(1, -(-matching // page_size))
+        # Filters may have shrunk the result below the current page
+        if st.session_state.get('list_page', 1) > page_count:
+            st.session_state.list_page = page_count
+        with col_sort4:
+            list_page = st.number_input(f"Page (of {page_count})", min_value=1,
+                                        max_value=page_count, step=1, key="list_page")
+
+        if list_search:
+            summaries = search_quotations(list_search, **list_filters,
+                                          limit=page_size,
+                                          offset=(list_page - 1) * page_size)
+        else:
+            summaries = get_quotation_summaries(**list_filters,
+                                                sort=list_sort,
+                                                descending=list_descending,
+                                                limit=page_size,
+                                                offset=(list_page - 1) * page_size)
+
+        if summaries:
+            df = pd.DataFrame([{
+                'Quote Ref': summary['quote_ref'],
+                'Date': summary['quote_day'],
+                'Customer': summary['customer_name'],
+                'Total Amount': f"₹{summary['total_amount'] or 0:,.2f}",
+                'Items': summary['item_count'],
+                **({'Match': summary['match']} if list_search else {})
+            } for summary in summaries])
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            shown = f"Showing {(list_page - 1) * page_size + 1}-{(list_page - 1) * page_size + len(summaries)}"
+            if list_search and matching > RANKED_MATCHES:
+                st.caption(f"{shown} of more than {RANKED_MATCHES:,} matches, newest first - "
+                           f"add words to narrow the search")
+            elif list_search:
+                st.caption(f"{shown} of {matching} matches, best match first")
+            else:
+                st.caption(f"{shown} of {matching} matching quotations")
+        else:
+            st.info("No quotations match the search and selected filters." if list_search
+                    else "No quotations match the selected filters.")
 
         # Option to regenerate PDF for existing quotations
         st.subheader("Regenerate PDF")
-        selected_quote_ref = st.selectbox("Select Quotation",
-                                          [q['quote_ref'] for q in quotations])
-
-        if st.button("Regenerate PDF"):
-            selected_quotation = next(
-                (q
-                 for q in quotations if q['quote_ref'] == selected_quote_ref),
-                None)
+        selected_quote_ref = st.selectbox("Select Quotation (current page)",
+                                          [summary['quote_ref'] for summary in summaries])
+
+        if st.button("Regenerate PDF", disabled=not selected_quote_ref):
+            selected_quotation = get_quotation_by_ref(selected_quote_ref)
             if selected_quotation:
-                pdf_buffer = generate_quotation_pdf(selected_quotation)
-                st.download_button(
-                    label="Download PDF",
-                    data=pdf_buffer,
-                    file_name=f"Quotation_{selected_quote_ref}.pdf",
-                    mime="application/pdf",
-                    type="primary")
+                # The logo is company configuration and is not stored with quotations
+                selected_quotation['company_logo'] = st.session_state.get('company_logo')
+                submit_pdf_job(selected_quotation)
+
+        show_pdf_jobs()
+
+        # Batch export of many quotations as one ZIP of PDFs
+        st.subheader("Batch Export")
+
+        col_export1, col_export2, col_export3 = st.columns(3)
+        with col_export1:
+            export_customer = st.text_input("Customer (blank for all)",
+                                            key="export_customer")
+        with col_export2:
+            export_dates = st.date_input("Quote Date Range",
+                                         value=(),
+                                         key="export_dates")
+        with col_export3:
+            export_workers = st.slider("Worker Processes",
+                                       min_value=1,
+                                       max_value=max(default_worker_count(), 2),
+                                       value=default_worker_count(),
+                                       key="export_workers")
+
+        if st.button("Export PDFs as ZIP"):
+            date_from, date_to = (export_dates if len(export_dates) == 2
+                                  else (None, None))
+            export_filters = dict(customer=export_customer.strip() or None,
+                                  date_from=date_from,
+                                  date_to=date_to)
+            export_total = count_quotations(**export_filters)
+
+            if export_total:
+                progress_bar = st.progress(0.0, text="Rendering PDFs...")
+
+                def report_progress(done, total):
+                    progress_bar.progress(done / total,
+                                          text=f"Rendered {done} of {total} PDFs")
+
+                # Stream the archive to a temporary file instead of memory
+                with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as zip_file:
+                    company_logo = st.session_state.get('company_logo')
+                    try:
+                        exported = export_quotations_zip(
+                            ({**q, 'company_logo': company_logo}
+                             for q in iter_quotations(**export_filters)),
+                            zip_file,
+                            workers=export_workers,
+                            progress=report_progress,
+                            total=export_total,
+                            max_bytes=EXPORT_MAX_MB * 1024 * 1024)
+                    except ExportTooLarge:
+                        exported = None
+
+                if exported is None:
+                    progress_bar.empty()
+                    st.error(f"The PDFs add up to more than {EXPORT_MAX_MB} MB, too large to "
+                             f"download here. Narrow the customer or date filters, or render them "
+                             f"with `python cli.py render` instead.")
+                else:
+                    # Streamlit reads the file into memory - bounded by EXPORT_MAX_MB
+                    with open(zip_file.name, 'rb') as archive:
+                        st.download_button(label=f"Download ZIP ({exported} PDFs)",
+                                           data=archive,
+                                           file_name="Quotations.zip",
+                                           mime="application/zip",
+                                           type="primary")
+                os.remove(zip_file.name)
+            else:
+                st.warning("No quotations match the selected filters.")
     else:
         st.info("No quotations found. Create your first quotation!")
 
+    # Backup and restore of the quotation history as NDJSON (one quotation per line)
+    st.subheader("Backup & Restore")
+
+    col_backup1, col_backup2 = st.columns(2)
+    with col_backup1:
+        if st.button("Prepare Backup", disabled=not stored_total):
+            # Streamed to a temporary file so the history is never held in memory
+            with tempfile.NamedTemporaryFile('w', suffix='.ndjson', encoding='utf-8',
+                                             delete=False) as backup_file:
+                backup_file.writelines(export_quotations_ndjson())
+
+            with open(backup_file.name, 'rb') as backup:
+                st.download_button(label="Download Backup (NDJSON)",
+                                   data=backup,
+                                   file_name=f"quotations_{datetime.now().strftime('%Y%m%d')}.ndjson",
+                                   mime="application/x-ndjson",
+                                   type="primary")
+            os.remove(backup_file.name)
+
+    with col_backup2:
+        backup_upload = st.file_uploader("Restore from Backup",
+                                         type=['ndjson', 'jsonl', 'json'],
+                                         key="backup_upload")
+        conflict_labels = {
+            'update': "Replace existing quotations",
+            'skip': "Keep existing quotations",
+            'newer': "Replace only with newer versions"
+        }
+        on_conflict = st.radio("When a quote reference already exists",
+                               list(conflict_labels),
+                               format_func=conflict_labels.get,
+                               key="backup_on_conflict")
+
+        if backup_upload and st.button("Merge Backup"):
+            # Merged by quote reference, quotations not in the backup are kept
+            if backup_upload.name.lower().endswith('.json'):
+                # A JSON export is a single array, numbered by record
+                result = import_quotations_json(
+                    backup_upload.getvalue().decode('utf-8'), on_conflict)
+                position = 'Record'
+            else:
+                # NDJSON is merged line by line
+                result = import_quotations_ndjson(
+                    io.TextIOWrapper(backup_upload, encoding='utf-8'), on_conflict)
+                position = 'Line'
+            summary = (f"{result['inserted']} added, {result['updated']} updated, "
+                       f"{result['skipped']} skipped, {result['invalid']} rejected.")
+            if result['invalid'] and not (result['inserted'] or result['updated'] or result['skipped']):
+                st.error(f"Nothing was restored: {summary}")
+            else:
+                st.success(summary)
+            if result['invalid']:
+                st.warning(f"{result['invalid']} invalid records were rejected:")
+                st.dataframe(pd.DataFrame(result['errors'],
+                                          columns=[position, 'Error']),
+                             hide_index=True,
+                             use_container_width=True)
+
     # Clear all quotations button
     if st.button("Clear All Quotations", type="secondary"):
-        st.session_state.quotations = []
+        clear_quotations()
         st.success("All quotations cleared!")
         st.rerun()
 
 elif page == "Configuration":
     st.header("Company Configuration")
 
+    # Company profiles are stored once for everyone; this session only picks one
+    # (not a keyed widget - Streamlit drops widget state on pages that do not show it)
+    profiles = get_company_profiles()
+    profile_names = list(profiles)
+    current_profile = st.session_state.get('company_profile')
+    profile_name = st.selectbox("Quote as (company profile)", profile_names,
+                                index=profile_names.index(current_profile) if current_profile in profiles else 0,
+                                help="Profiles are shared by all users; edits apply to everyone's new quotations")
+    st.session_state.company_profile = profile_name
+    profile = profiles[profile_name]
+
     # Company Information Section
     st.subheader("Company Information")
 
@@ -381,93 +810,78 @@ elif page == "Configuration":
                                         type=['png', 'jpg', 'jpeg'])
         if company_logo:
             st.image(company_logo, width=200)
-            st.session_state.company_logo = company_logo
+            # Downscaled to the printed size once, every PDF reuses the prepared image
+            try:
+                st.session_state.company_logo = prepare_logo(company_logo)
+            except Exception as e:
+                st.error(f"Could not read the logo image: {e}")
 
         # Basic Company Info
-        company_name = st.text_input("Company Name",
-                                     value=st.session_state.get(
-                                         'company_name', 'DEVSHRI MARKETING'))
-        company_address = st.text_area(
-            "Company Address",
-            value=st.session_state.get(
-                'company_address',
-                '2/49, Suraj Building, J. B. Marg, Elphinstone Road, Prabhadevi, Mumbai - 400013.'
-            ))
-        company_email = st.text_input("Company Email",
-                                      value=st.session_state.get(
-                                          'company_email',
-                                          'sales@devshrimarketing.com.com'))
+        company_name = st.text_input("Company Name", value=profile['name'])
+        company_address = st.text_area("Company Address", value=profile['address'])
+        company_email = st.text_input("Company Email", value=profile['email'])
 
     with col_config2:
         st.subheader("Contact & Registration")
-        company_phone = st.text_input("Company Phone",
-                                      value=st.session_state.get(
-                                          'company_phone', '9821219871'))
-        company_gst = st.text_input("GST Number",
-                                    value=st.session_state.get(
-                                        'company_gst', '27AAEFD3217G1ZS'))
-        company_msme = st.text_input("MSME Number",
-                                     value=st.session_state.get(
-                                         'company_msme',
-                                         'UDYAM-MH-19-0084808'))
+        company_phone = st.text_input("Company Phone", value=profile['phone'])
+        company_gst = st.text_input("GST Number", value=profile['gst'])
+        company_msme = st.text_input("MSME Number", value=profile['msme'])
 
     st.divider()
 
     # Terms & Conditions Configuration
     st.subheader("Default Terms & Conditions")
 
-    warranty_terms = st.text_area(
-        "Warranty Terms",
-        value=st.session_state.get(
-            'company_warranty',
-            "Period shall be within 12 months from the date of commissioning or 18 months from the date of supply whichever is earlier. Warranty is not applicable for spare parts."
-        ))
-
-    cancellation_terms = st.text_area(
-        "Cancellation Terms",
-        value=st.session_state.get(
-            'company_cancellation',
-            "In case of cancellation of order after 7 days of PO placement, cancellation charges would be applicable at the rate of 20% for standard valves and 40% for Non Standard valves on the order value."
-        ))
-
-    penalty_terms = st.text_area(
-        "Penalty Terms",
-        value=st.session_state.get(
-            'company_penalty',
-            "In case of Non lifting of consignment after the contractual delivery date, we reserve the right to charge penalty at the rate of 5% per month on order value."
-        ))
-
-    # Save Configuration Button
-    if st.button("Save Configuration", type="primary"):
-        # Save all company information to session state
-        st.session_state.company_name = company_name
-        st.session_state.company_address = company_address
-        st.session_state.company_email = company_email
-        st.session_state.company_phone = company_phone
-        st.session_state.company_gst = company_gst
-        st.session_state.company_msme = company_msme
-        st.session_state.company_warranty = warranty_terms
-        st.session_state.company_cancellation = cancellation_terms
-        st.session_state.company_penalty = penalty_terms
-
-        st.success("Configuration saved successfully!")
-        st.rerun()
+    warranty_terms = st.text_area("Warranty Terms", value=profile['warranty'])
+    cancellation_terms = st.text_area("Cancellation Terms", value=profile['cancellation'])
+    penalty_terms = st.text_area("Penalty Terms", value=profile['penalty'])
+
+    edited_profile = {
+        'name': company_name,
+        'address': company_address,
+        'email': company_email,
+        'phone': company_phone,
+        'gst': company_gst,
+        'msme': company_msme,
+        'warranty': warranty_terms,
+        'cancellation': cancellation_terms,
+        'penalty': penalty_terms
+    }
+
+    col_save1, col_save2, col_save3 = st.columns(3)
+    with col_save1:
+        # Save Configuration Button
+        if st.button("Save Configuration", type="primary"):
+            save_company_profile(profile_name, edited_profile)
+            st.success("Configuration saved successfully!")
+            st.rerun()
+    with col_save2:
+        new_profile_name = st.text_input("New profile name", key="new_profile_name",
+                                         label_visibility="collapsed",
+                                         placeholder="New profile name")
+        if st.button("Save as New Profile", disabled=not new_profile_name.strip()):
+            if new_profile_name.strip() in profiles:
+                st.error(f"A profile named {new_profile_name.strip()} already exists.")
+            else:
+                save_company_profile(new_profile_name, edited_profile)
+                st.session_state.company_profile = new_profile_name.strip()
+                st.rerun()
+    with col_save3:
+        if st.button("Delete Profile", disabled=len(profiles) <= 1):
+            delete_company_profile(profile_name)
+            st.rerun()
 
     # Display current configuration status
     st.divider()
     st.subheader("Current Configuration Status")
 
     config_status = {
-        "Company Name":
-        st.session_state.get('company_name', 'Not set'),
-        "Company Email":
-        st.session_state.get('company_email', 'Not set'),
-        "Company Phone":
-        st.session_state.get('company_phone', 'Not set'),
-        "GST Number":
-        st.session_state.get('company_gst', 'Not set'),
-        "MSME Number":
-        st.session_state.get('company_msme', 'Not set'),
+        "Company Profile": profile_name,
+        "Company Name": profile['name'] or 'Not set',
+        "Company Email": profile['email'] or 'Not set',
+        "Company Phone": profile['phone'] or 'Not set',
+        "GST Number": profile['gst'] or 'Not set',
+        "MSME Number": profile['msme'] or 'Not set',
         "Logo":
         "Uploaded" if st.session_state.get('company_logo') else "Not uploaded"
     }
@@ -475,3 +889,120 @@ elif page == "Configuration":
     config_df = pd.DataFrame(list(config_status.items()),
                              columns=['Setting', 'Value'])
     st.dataframe(config_df, use_container_width=True)
+
+elif page == "Analytics":
+    st.header("Analytics")
+    st.caption("Totals of all saved quotations, updated as quotations are saved, imported and deleted. "
+               "Discounts include item-wise and quotation discounts.")
+
+    # Pre-aggregated rollups - a few rows per customer, month and HSN code
+    month_rows = get_sales_rollups('month')
+    if month_rows:
+        overall = {measure: sum(row[measure] for row in month_rows)
+                   for measure in ('quotes', 'gross_amount', 'discount_amount', 'gst_amount', 'total_amount')}
+        col_kpi1, col_kpi2, col_kpi3, col_kpi4 = st.columns(4)
+        with col_kpi1:
+            st.metric("Quoted Value", f"₹{overall['total_amount']:,.2f}")
+        with col_kpi2:
+            st.metric("Quotations", f"{overall['quotes']:,}")
+        with col_kpi3:
+            average_discount = (overall['discount_amount'] / overall['gross_amount'] * 100
+                                if overall['gross_amount'] else 0.0)
+            st.metric("Average Discount", f"{average_discount:.1f}%")
+        with col_kpi4:
+            st.metric("GST", f"₹{overall['gst_amount']:,.2f}")
+
+        amount_format = st.column_config.NumberColumn(format="₹%.2f")
+        column_config = {
+            'Quoted Value': amount_format,
+            'Taxable Amount': amount_format,
+            'CGST + SGST': amount_format,
+            'IGST': amount_format,
+            'Avg Quote Value': amount_format,
+            'Avg Discount (%)': st.column_config.NumberColumn(format="%.1f"),
+        }
+
+        # One dimension at a time - tabs would build every chart on each run
+        dimension = st.radio("Group by", list(ROLLUP_VIEWS), horizontal=True,
+                             format_func=lambda d: ROLLUP_VIEWS[d][0], key="analytics_dimension")
+        _, key_column, blank_label = ROLLUP_VIEWS[dimension]
+        rows = month_rows if dimension == 'month' else get_sales_rollups(dimension)
+        rollup_df = rollup_frame(rows, key_column, blank_label)
+        tooltip = [key_column, 'Quotations', 'Quoted Value', 'Avg Discount (%)']
+        if dimension == 'month':
+            # Chronological, every month
+            rollup_df = rollup_df.sort_values(key_column, ignore_index=True)
+            chart = alt.Chart(rollup_df).mark_bar().encode(
+                x=alt.X(key_column, sort=None), y='Quoted Value', tooltip=tooltip)
+        else:
+            # Largest first (rows come sorted by value), top rows only
+            chart = alt.Chart(rollup_df.head(ROLLUP_CHART_ROWS)).mark_bar().encode(
+                x='Quoted Value', y=alt.Y(key_column, sort=None), tooltip=tooltip)
+        st.altair_chart(chart, use_container_width=True)
+        st.dataframe(rollup_df, use_container_width=True, hide_index=True,
+                     column_config=column_config)
+    else:
+        st.info("No quotations found. Create your first quotation!")
+
+elif page == "Diagnostics":
+    st.header("Diagnostics")
+    st.caption("Timings and counters of this server process, shared by every session. "
+               "Recording is off by default (set QUOTATION_METRICS=1 to start with it on).")
+
+    recording = st.toggle("Record timings and counters", value=metrics.is_enabled())
+    if recording != metrics.is_enabled():
+        metrics.set_enabled(recording)
+
+    snapshot = metrics.snapshot()
+    since = datetime.fromtimestamp(snapshot['started_at']).strftime('%d-%b-%Y %H:%M:%S')
+    st.write(f"Recorded since {since}")
+
+    # Timers: one latency histogram per hook
+    st.subheader("Timings")
+    timers = snapshot['timers']
+    if timers:
+        timer_df = pd.DataFrame([{
+            'Operation': name,
+            'Calls': timer['count'],
+            'Mean (ms)': timer['mean_ms'],
+            'p50 (ms)': timer['p50_ms'],
+            'p95 (ms)': timer['p95_ms'],
+            'p99 (ms)': timer['p99_ms'],
+            'Max (ms)': timer['max_ms'],
+            'Total (ms)': timer['total_ms'],
+        } for name, timer in timers.items()])
+        st.dataframe(timer_df, use_container_width=True, hide_index=True,
+                     column_config={column: st.column_config.NumberColumn(format="%.2f")
+                                    for column in timer_df.columns[2:]})
+
+        selected_timer = st.selectbox("Histogram", list(timers))
+        bounds = snapshot['bucket_bounds_ms']
+        labels = [f"≤{bound:g} ms" for bound in bounds] + [f">{bounds[-1]:g} ms"]
+        histogram_df = pd.DataFrame({'Duration': labels, 'Calls': timers[selected_timer]['buckets']})
+        st.altair_chart(alt.Chart(histogram_df).mark_bar().encode(
+            x=alt.X('Duration', sort=None), y='Calls'), use_container_width=True)
+    else:
+        st.info("No timings recorded yet.")
+
+    # Counters, plus the cache and job queue state that is always tracked
+    st.subheader("Counters")
+    pdf_cache = get_pdf_cache()
+    counter_rows = [{'Counter': name, 'Value': value} for name, value in snapshot['counters'].items()]
+    counter_rows += [
+        {'Counter': 'pdf_cache.hits (since start)', 'Value': pdf_cache.hits},
+        {'Counter': 'pdf_cache.misses (since start)', 'Value': pdf_cache.misses},
+    ]
+    counter_rows += [{'Counter': f'jobs.current.{state}', 'Value': count}
+                     for state, count in get_job_queue().stats().items()]
+    st.dataframe(pd.DataFrame(counter_rows), use_container_width=True, hide_index=True)
+
+    col_diag1, col_diag2 = st.columns(2)
+    with col_diag1:
+        st.download_button(label="Export as JSON",
+                           data=metrics.export_json(),
+                           file_name=f"diagnostics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                           mime="application/json")
+    with col_diag2:
+        if st.button("Reset"):
+            metrics.reset()
+            st.rerun()
@@ -0,0 +1,47 @@
+"""Compare the platypus and canvas PDF engines on large quotations
+
+Usage:
+    python -m benchmarks.bench_engines [--sizes 100 1000 2000 5000 10000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_quotation
+from utils.pdf_generator import generate_quotation_pdf
+
+ENGINES = ('platypus', 'canvas')
+
+def measure(quotation, engine, trace_memory=False):
+    """Wall time, peak traced memory (MB, optional) and size of one render"""
+    start = time.perf_counter()
+    pdf_data = generate_quotation_pdf(quotation, engine=engine)
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        # Separate pass - tracemalloc slows rendering down several times
+        tracemalloc.start()
+        generate_quotation_pdf(quotation, engine=engine)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return seconds, peak, len(pdf_data)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 2000, 5000, 10000])
+    parser.add_argument('--memory', action='store_true', help='Also report peak traced memory')
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>7} {'engine':<9} {'seconds':>9} {'peak MB':>9} {'PDF KB':>9} {'speedup':>8}")
+    for size in args.sizes:
+        quotation = make_quotation(size)
+        results = {engine: measure(quotation, engine, args.memory) for engine in ENGINES}
+        baseline = results['platypus'][0]
+        for engine, (seconds, peak, size_bytes) in results.items():
+            peak_text = f'{peak:.1f}' if peak is not None else '-'
+            print(f"{size:>7} {engine:<9} {seconds:>9.3f} {peak_text:>9} "
+                  f"{size_bytes / 1024:>9.0f} {baseline / seconds:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare embedding the uploaded logo as-is with the prepared (print-size) logo
+
+Usage:
+    python -m benchmarks.bench_logo [--items 20] [--repeat 10] [--logo path ...]
+"""
+import argparse
+import statistics
+import time
+from io import BytesIO
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.synthetic import make_quotation
+from utils import pdf_generator
+from utils.logo import logo_bytes
+
+def synthetic_logos():
+    """A camera-sized photo (JPEG) and a flat-colour logo with transparency (PNG)"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:2000, 0:3000]
+    photo = np.stack([x % 256, y % 256, (x + y) % 256], axis=-1) + rng.integers(0, 40, (2000, 3000, 3))
+    photo_file = BytesIO()
+    Image.fromarray(np.clip(photo, 0, 255).astype(np.uint8)).save(photo_file, format='JPEG', quality=95)
+
+    flat = Image.new('RGBA', (1800, 1200), (0, 0, 0, 0))
+    flat.paste((37, 99, 235, 255), (200, 200, 1600, 1000))
+    flat.paste((255, 255, 255, 255), (500, 450, 1300, 750))
+    flat_file = BytesIO()
+    flat.save(flat_file, format='PNG')
+    return {'photo 3000x2000 JPEG': photo_file.getvalue(), 'flat 1800x1200 PNG': flat_file.getvalue()}
+
+def measure(quotation, repeat):
+    """Median render time (ms) and PDF size (KB)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf_data = pdf_generator.generate_quotation_pdf(quotation)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, len(pdf_data) / 1024
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--logo', nargs='*', help='Logo files to test (default: synthetic logos)')
+    args = parser.parse_args(argv)
+
+    logos = synthetic_logos()
+    if args.logo:
+        logos = {}
+        for path in args.logo:
+            with open(path, 'rb') as f:
+                logos[path] = f.read()
+
+    base = make_quotation(args.items)
+    print(f"{'logo':<24} {'upload KB':>9} {'mode':<9} {'render ms':>10} {'PDF KB':>8}")
+    for name, data in logos.items():
+        quotation = {**base, 'company_logo': data}
+        # Previous behaviour: the upload is embedded unchanged on every render
+        with mock.patch.object(pdf_generator, 'prepare_logo', logo_bytes):
+            original = measure(quotation, args.repeat)
+        pdf_generator.prepare_logo(data)
+        prepared = measure(quotation, args.repeat)
+        for mode, (ms, kb) in (('original', original), ('prepared', prepared)):
+            print(f"{name:<24} {len(data) / 1024:>9.0f} {mode:<9} {ms:>10.1f} {kb:>8.0f}")
+
+if __name__ == '__main__':
+    main()
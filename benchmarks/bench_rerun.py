@@ -0,0 +1,105 @@
+"""Measure Create Quotation rerun latency with a large draft
+
+Usage:
+    python -m benchmarks.bench_rerun [--items 500] [--repeat 10] [--baseline REV]
+
+A keystroke in the Customer Name field is replayed with Streamlit's AppTest.
+AppTest always runs the whole script, so the cost of a fragment-only rerun is
+reported as the time spent in the body of the fragment holding the field.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic import make_line_items
+from utils.line_items import LineItem
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs the app with st.fragment wrapped so each fragment body is timed
+HARNESS = '''
+import functools
+import runpy
+import sys
+import time
+
+sys.path.insert(0, {repo_root!r})
+import streamlit as st
+
+_fragment = st.fragment
+
+def _timed_fragment(func=None, **kwargs):
+    if func is None:
+        return lambda f: _timed_fragment(f, **kwargs)
+
+    @functools.wraps(func)
+    def timed(*args, **kw):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kw)
+        finally:
+            st.session_state.setdefault('bench_fragment_seconds', {{}})[func.__name__] = time.perf_counter() - start
+    return _fragment(timed, **kwargs)
+
+st.fragment = _timed_fragment
+runpy.run_path({app_path!r}, run_name='__main__')
+'''
+
+def _harness(app_path, directory):
+    path = os.path.join(directory, f'harness_{os.path.basename(app_path)}')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HARNESS.format(repo_root=REPO_ROOT, app_path=app_path))
+    return path
+
+def measure(app_path, directory, items, repeat):
+    """Full-script rerun times after typing into Customer Name, plus fragment body times"""
+    at = AppTest.from_file(_harness(app_path, directory), default_timeout=120)
+    at.session_state['current_line_items'] = [LineItem.from_dict(item) for item in make_line_items(items)]
+    at.run()
+
+    customer = next(w for w in at.text_input if w.label == 'Customer Name')
+    reruns = []
+    fragments = {}
+    for i in range(repeat):
+        start = time.perf_counter()
+        customer.input(f'Customer {i}').run()
+        reruns.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        customer = next(w for w in at.text_input if w.label == 'Customer Name')
+        timings = at.session_state['bench_fragment_seconds'] if 'bench_fragment_seconds' in at.session_state else {}
+        for name, seconds in timings.items():
+            fragments.setdefault(name, []).append(seconds)
+    return reruns, fragments
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--baseline', help='Also measure app.py as of this git revision')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        apps = [('current', os.path.join(REPO_ROOT, 'app.py'))]
+        if args.baseline:
+            baseline_path = os.path.join(directory, 'baseline_app.py')
+            source = subprocess.run(['git', 'show', f'{args.baseline}:app.py'], cwd=REPO_ROOT,
+                                    check=True, capture_output=True).stdout
+            with open(baseline_path, 'wb') as f:
+                f.write(source)
+            apps.insert(0, (args.baseline, baseline_path))
+
+        print(f'{args.items} line items, {args.repeat} keystrokes in Customer Name')
+        for label, app_path in apps:
+            reruns, fragments = measure(app_path, directory, args.items, args.repeat)
+            print(f'{label:<12} full script rerun   median {statistics.median(reruns) * 1000:8.1f} ms')
+            for name, seconds in sorted(fragments.items()):
+                print(f'{"":<12} fragment {name:<20} {statistics.median(seconds) * 1000:8.1f} ms')
+
+if __name__ == '__main__':
+    main()
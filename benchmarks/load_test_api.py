@@ -0,0 +1,157 @@
+"""Load test the HTTP API, reporting requests per second and latency percentiles
+
+Usage:
+    python -m benchmarks.load_test_api [--endpoint totals pdf get list] [--concurrency 8]
+                                       [--requests 400] [--items 20] [--url http://127.0.0.1:8502]
+
+Without --url a server is started on a free localhost port with a temporary database.
+Each client thread keeps one keep-alive connection open for all of its requests.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.synthetic import make_quotation
+
+ENDPOINTS = ('totals', 'pdf', 'get', 'list')
+
+# Quotations stored before the get/list runs
+SEED_QUOTATIONS = 200
+
+def start_server(workers, db_path):
+    """Run api_server.py on a free port, returning (process, base url)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'QUOTATION_DB_PATH': db_path}
+    process = subprocess.Popen([sys.executable, os.path.join(root, 'api_server.py'), '--port', '0',
+                                '--workers', str(workers)],
+                               cwd=root, env=env, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('Listening on '):
+        process.kill()
+        raise RuntimeError(f'API server did not start: {line!r}')
+    return process, line.split()[-1]
+
+def request(conn, method, path, body=None):
+    """One request on a keep-alive connection, returning (status, body, seconds)"""
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    start = time.perf_counter()
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, data, time.perf_counter() - start
+
+def make_requests(endpoint, items, count, refs):
+    """(method, path, body) for each request of a run"""
+    if endpoint == 'totals':
+        quotation = make_quotation(items)
+        body = json.dumps({'line_items': quotation['line_items'], 'gst_percent': 18})
+        return [('POST', '/api/totals', body)] * count
+    if endpoint == 'pdf':
+        # A few distinct quotations, so both renders and cache hits are measured
+        bodies = [json.dumps(make_quotation(items, index)) for index in range(8)]
+        return [('POST', '/api/pdf', bodies[i % len(bodies)]) for i in range(count)]
+    if endpoint == 'get':
+        return [('GET', f'/api/quotations/{refs[i % len(refs)]}', None) for i in range(count)]
+    return [('GET', f'/api/quotations?limit=50&offset={(i * 50) % len(refs)}', None) for i in range(count)]
+
+def seed(host, port, items):
+    """Store SEED_QUOTATIONS quotations through the API, returning their references"""
+    conn = http.client.HTTPConnection(host, port)
+    refs = []
+    for index in range(SEED_QUOTATIONS):
+        quotation = make_quotation(items, index)
+        status, data, _ = request(conn, 'POST', '/api/quotations?on_conflict=update', json.dumps(quotation))
+        if status not in (200, 201):
+            raise RuntimeError(f'Seeding failed ({status}): {data[:200]!r}')
+        refs.append(quotation['quote_ref'])
+    conn.close()
+    return refs
+
+def run(host, port, requests, concurrency):
+    """Send requests from concurrency threads, returning latencies, failures and wall time"""
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+    queue = iter(requests)
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=120)
+        while True:
+            with lock:
+                job = next(queue, None)
+            if job is None:
+                break
+            status, data, seconds = request(conn, *job)
+            with lock:
+                latencies.append(seconds)
+                if status >= 400:
+                    failures.append(status)
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), failures, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Running API server (default: start one)')
+    parser.add_argument('--endpoint', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--items', type=int, default=20, help='Line items per quotation')
+    parser.add_argument('--workers', type=int, default=2, help='Render processes of a started server')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args(argv)
+
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if url is None:
+            process, url = start_server(args.workers, os.path.join(tmp, 'load_test.db'))
+        host, port = urlsplit(url).hostname, urlsplit(url).port
+        try:
+            refs = seed(host, port, args.items) if {'get', 'list'} & set(args.endpoint) else []
+
+            results = []
+            print(f"{'endpoint':<8} {'requests':>8} {'failed':>6} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+            for endpoint in args.endpoint:
+                requests = make_requests(endpoint, args.items, args.requests, refs)
+                latencies, failures, wall = run(host, port, requests, args.concurrency)
+                result = {
+                    'endpoint': endpoint,
+                    'requests': len(latencies),
+                    'failed': len(failures),
+                    'concurrency': args.concurrency,
+                    'items': args.items,
+                    'rps': len(latencies) / wall,
+                    'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+                    'p99_ms': float(np.percentile(latencies, 99)) * 1000,
+                    'max_ms': float(latencies.max()) * 1000,
+                }
+                results.append(result)
+                print(f"{endpoint:<8} {result['requests']:>8} {result['failed']:>6} {result['rps']:>8.1f} "
+                      f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['max_ms']:>8.1f}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
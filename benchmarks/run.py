@@ -0,0 +1,205 @@
+"""Benchmark suite: calculations, PDF rendering and quotation storage
+
+Usage:
+    python -m benchmarks.run [--quick] [--output results.json] [--baseline baseline.json]
+                             [--threshold 0.25] [--only calc pdf store]
+
+Times calculate_totals and generate_quotation_pdf at 1 to 10,000 line items (PDF
+wall time, peak traced memory and size) and the data/quotations.py operations at
+growing history sizes. Results are written as JSON; with --baseline each metric is
+compared with a stored run and the exit status is 1 if any got slower or bigger
+than the threshold allows.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.synthetic import make_line_items, make_quotation
+from utils.calculations import calculate_totals
+from utils.pdf_generator import generate_quotation_pdf
+
+ITEM_SIZES = [1, 10, 100, 1000, 10000]
+HISTORY_SIZES = [100, 1000, 10000]
+QUICK_ITEM_SIZES = [1, 10, 100, 1000]
+QUICK_HISTORY_SIZES = [100, 1000]
+
+# Line items per stored quotation in the history benchmarks
+HISTORY_ITEMS = 10
+
+# Metrics compared with the baseline (lower is better); others are informational
+COMPARED_METRICS = ('seconds', 'peak_mb', 'bytes')
+
+# Slowdowns smaller than this are timer noise however large the ratio
+NOISE_FLOOR_SECONDS = 50e-6
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_call(func, min_repeat=3, min_seconds=0.2, max_repeat=1000):
+    """Median wall time of func, repeated until both minimums are met"""
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_repeat and (len(times) < min_repeat or time.perf_counter() - start < min_seconds):
+        call_start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - call_start)
+    return statistics.median(times), len(times)
+
+def peak_memory(func):
+    """Peak traced allocation (MB) of one call"""
+    # Separate pass - tracemalloc slows the code down several times
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def bench_calculations(sizes):
+    results = {}
+    for size in sizes:
+        line_items = make_line_items(size)
+        seconds, repeat = time_call(lambda: calculate_totals(line_items, 0, 18))
+        results[f'calculate_totals[{size}]'] = {'seconds': seconds, 'repeat': repeat}
+    return results
+
+def bench_pdf(sizes):
+    results = {}
+    for size in sizes:
+        quotation = make_quotation(size)
+        # The engine the app uses ('auto' switches to the canvas engine for large quotes)
+        render = lambda: generate_quotation_pdf(quotation, engine='auto')
+        seconds, repeat = time_call(render, min_repeat=1 if size >= 1000 else 3, min_seconds=1)
+        results[f'generate_quotation_pdf[{size}]'] = {
+            'seconds': seconds,
+            'repeat': repeat,
+            'peak_mb': peak_memory(render),
+            'bytes': len(render()),
+        }
+    return results
+
+def bench_store(history_sizes, tmp_dir):
+    # The facade imports streamlit but these functions do not need a session
+    from data import db, quotations, store
+
+    results = {}
+    previous_path = db.get_db_path()
+    try:
+        for size in history_sizes:
+            db.set_db_path(os.path.join(tmp_dir, f'history_{size}.db'))
+            history = [make_quotation(HISTORY_ITEMS, index) for index in range(size)]
+            start = time.perf_counter()
+            store.merge_quotations(history)
+            results[f'store.merge_quotations[{size}]'] = {'seconds': time.perf_counter() - start, 'repeat': 1}
+
+            refs = [q['quote_ref'] for q in history]
+            customer = history[0]['client']['name']
+            extra = make_quotation(HISTORY_ITEMS, size)
+            # put_quotation only inserts, so every call stores a new reference
+            extra_refs = (f"{extra['quote_ref']}-{number}" for number in itertools.count())
+            lookups = iter(refs * 1000)
+            cases = {
+                'store.put_quotation': lambda: store.put_quotation({**extra, 'quote_ref': next(extra_refs)}),
+                'quotations.get_quotation_by_ref': lambda: quotations.get_quotation_by_ref(next(lookups)),
+                'quotations.get_quotations_page': lambda: quotations.get_quotations(limit=50, offset=size // 2),
+                'quotations.get_quotations_customer': lambda: quotations.get_quotations(customer=customer),
+                'quotations.count_quotations': lambda: quotations.count_quotations(),
+                'quotations.iter_quotations': lambda: sum(1 for _ in quotations.iter_quotations()),
+                'quotations.export_quotations_ndjson': lambda: sum(1 for _ in quotations.export_quotations_ndjson()),
+            }
+            for name, func in cases.items():
+                seconds, repeat = time_call(func)
+                results[f'{name}[{size}]'] = {'seconds': seconds, 'repeat': repeat}
+            db.close_connection()
+    finally:
+        db.set_db_path(previous_path)
+    return results
+
+def environment():
+    """Where the run happened, so results are only compared like for like"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+def compare(results, baseline, threshold):
+    """(benchmark, metric, baseline, current, ratio) for every metric worse than threshold allows"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric in COMPARED_METRICS:
+            old = baseline.get(name, {}).get(metric)
+            new = metrics.get(metric)
+            if metric == 'seconds' and new is not None and old is not None and new - old < NOISE_FLOOR_SECONDS:
+                continue
+            if old and new is not None and new / old > 1 + threshold:
+                regressions.append((name, metric, old, new, new / old))
+    return regressions
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':<46} {'ms':>10} {'vs base':>8} {'peak MB':>8} {'KB':>8}")
+    for name, metrics in results.items():
+        old = (baseline or {}).get(name, {}).get('seconds')
+        change = f"{metrics['seconds'] / old:>7.2f}x" if old else ''
+        peak = f"{metrics['peak_mb']:>8.1f}" if 'peak_mb' in metrics else ''
+        size = f"{metrics['bytes'] / 1024:>8.0f}" if 'bytes' in metrics else ''
+        print(f"{name:<46} {metrics['seconds'] * 1000:>10.3f} {change:>8} {peak:>8} {size:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=['calc', 'pdf', 'store'], default=['calc', 'pdf', 'store'])
+    parser.add_argument('--quick', action='store_true', help='Skip the 10,000 item and 10,000 quotation sizes')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare with a results file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown/growth over the baseline (default: 0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    item_sizes = QUICK_ITEM_SIZES if args.quick else ITEM_SIZES
+    history_sizes = QUICK_HISTORY_SIZES if args.quick else HISTORY_SIZES
+
+    results = {}
+    if 'calc' in args.only:
+        results.update(bench_calculations(item_sizes))
+    if 'pdf' in args.only:
+        results.update(bench_pdf(item_sizes))
+    if 'store' in args.only:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results.update(bench_store(history_sizes, tmp_dir))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline and baseline['results'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+    if baseline is None:
+        return 0
+    if baseline.get('environment', {}).get('platform') != platform.platform():
+        print('warning: the baseline was recorded on a different platform', file=sys.stderr)
+    regressions = compare(results, baseline['results'], args.threshold)
+    for name, metric, old, new, ratio in regressions:
+        print(f'regression: {name} {metric} {old:.6g} -> {new:.6g} ({ratio:.2f}x)', file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import random
+
+from utils.calculations import calculate_totals, calculate_line_item_amounts
+
+DESCRIPTIONS = [
+    'Pneumatic actuated ball valve, SS316, full bore',
+    'Butterfly valve with gear operator, PN16',
+    'Solenoid valve 5/2 way, 24V DC',
+    'Pressure gauge 0-10 bar, 100mm dial, glycerine filled',
+    'Limit switch box with proximity sensors',
+]
+HSN_CODES = ['8481', '84818030', '9026', '85365090', '8413']
+CUSTOMERS = ['Acme Industries', 'Pune Process Plants', 'Thane Fluid Systems', 'Nashik Valves', 'Mumbai Pharma']
+
+def make_line_items(count, seed=0):
+    """Deterministic synthetic line items"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        qty = rng.randint(1, 20)
+        unit_price = round(rng.uniform(100, 50000), 2)
+        discount_percent = rng.choice([0.0, 0.0, 5.0, 10.0, 12.5])
+        discount_amount, total_price = calculate_line_item_amounts(qty, unit_price, discount_percent)
+        items.append({
+            'part_no': f'MA-{seed:04d}-{i:05d}',
+            'description': rng.choice(DESCRIPTIONS),
+            'hsn': rng.choice(HSN_CODES),
+            'qty': qty,
+            'unit_price': unit_price,
+            'delivery_weeks': rng.randint(1, 12),
+            'discount_percent': discount_percent,
+            'discount_amount': discount_amount,
+            'total_price': total_price,
+        })
+    return items
+
+def make_quotation(item_count, index=0, seed=0):
+    """Deterministic synthetic quotation with item_count line items"""
+    rng = random.Random(seed * 100003 + index)
+    line_items = make_line_items(item_count, seed=index)
+    day = 1 + index % 28
+    return {
+        'quote_ref': f'Q202601{day:02d}{index:05d}',
+        'quote_date': f'{day:02d}-Jan-2026',
+        'validity_date': f'{day:02d}-Feb-2026',
+        'company': {
+            'name': 'MACHT AUTOMATION LLP',
+            'address': 'Off 01, Grd Floor, Laxmi Niwas, Ram Maruti Road, Naupada, Thane (W) Thane 400602, Maharashtra, India.',
+            'email': 'sales@macht-automation.com',
+            'phone': '9820667352 / 9167930569',
+            'gst': '27ABRFM7709G1ZR',
+            'msme': 'UDYAM-MH-33-0133361',
+        },
+        'client': {
+            'name': rng.choice(CUSTOMERS),
+            'address': 'Plot 12, MIDC Industrial Area, Pune 411019',
+            'email': 'purchase@example.com',
+            'phone': '+91-9800000000',
+            'contact_person': 'Mr. Buyer',
+        },
+        'subject': 'Offer for Supply of Industrial Valves',
+        'line_items': line_items,
+        'totals': calculate_totals(line_items, 0, 18),
+        'terms': {
+            'payment': '100% Against PI',
+            'price': 'Ex-works, Mumbai',
+            'freight': 'In your scope',
+            'warranty': 'Period shall be within 12 months from the date of commissioning.',
+            'cancellation': 'Cancellation charges applicable after 7 days of PO placement.',
+            'penalty': 'Penalty at the rate of 5% per month on order value.',
+            'additional': 'Packing: 2% Extra.',
+        },
+    }
+
+def make_catalogue(count, seed=0):
+    """Deterministic synthetic price list rows (CATALOGUE_COLUMNS of data.catalogue)"""
+    rng = random.Random(seed)
+    series = ['BV', 'BFV', 'SV', 'PG', 'LS', 'ACT', 'FLG', 'CV']
+    sizes = ['15NB', '20NB', '25NB', '40NB', '50NB', '80NB', '100NB', '150NB']
+    rows = []
+    for i in range(count):
+        prefix = rng.choice(series)
+        size = rng.choice(sizes)
+        rows.append({
+            'part_no': f'{prefix}-{size}-{i:06d}',
+            'description': f'{rng.choice(DESCRIPTIONS)}, {size}',
+            'hsn': rng.choice(HSN_CODES),
+            'list_price': round(rng.uniform(100, 50000), 2),
+            'delivery_weeks': rng.randint(1, 12),
+        })
+    return rows
@@ -0,0 +1,212 @@
+"""Headless quotation tools (no Streamlit required)
+
+Usage:
+    python cli.py render quotations.json more.ndjson -o pdfs/ --workers 4
+    python cli.py export history.ndjson [--customer NAME] [--from DATE] [--to DATE]
+    python cli.py import history.ndjson [--on-conflict update|skip|newer]
+    python cli.py rebuild-rollups
+"""
+import argparse
+import functools
+import json
+import os
+import statistics
+import sys
+import time
+
+from data import rollups, store
+from utils.batch_export import (render_quotations_parallel, render_quotation_timed,
+                                create_render_pool, default_worker_count)
+
+def iter_quotation_file(path, errors=None):
+    """Yield quotations from a JSON export (list or single object) or an NDJSON file
+
+    With an errors list, input that is not valid JSON is appended to it as a
+    message and skipped instead of raising.
+    """
+    if path.endswith(('.ndjson', '.jsonl')):
+        # One quotation per line - streamed, never loaded whole
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    if errors is None:
+                        raise
+                    errors.append(f'line {number}: not valid JSON: {e}')
+                    continue
+                yield record
+        return
+
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            if errors is None:
+                raise
+            errors.append(f'not valid JSON: {e}')
+            return
+    if isinstance(data, dict):
+        data = [data]
+    yield from data
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+def render_file(path, output_dir, executor, workers, engine='auto'):
+    """Render every quotation in one input file, returning its timing statistics"""
+    render_times = []
+    errors = []
+    # Lines that are not JSON never reach a worker - they fail here, on their own
+    unreadable = []
+    total_bytes = 0
+
+    start = time.perf_counter()
+    # Totals are recomputed inside the workers, so a bad record only fails itself
+    render = functools.partial(render_quotation_timed, recalculate=True, engine=engine)
+    results = render_quotations_parallel(iter_quotation_file(path, unreadable), workers=workers,
+                                         render=render, executor=executor)
+    for filename, pdf_data, seconds, error in results:
+        render_times.append(seconds)
+        if error:
+            errors.append(f'{filename}: {error}')
+            continue
+        with open(os.path.join(output_dir, filename), 'wb') as f:
+            f.write(pdf_data)
+        total_bytes += len(pdf_data)
+    wall = time.perf_counter() - start
+    errors = unreadable + errors
+
+    render_times.sort()
+    return {
+        'file': path,
+        'quotations': len(render_times) + len(unreadable),
+        'failed': len(errors),
+        'errors': errors,
+        'wall_seconds': wall,
+        'pdfs_per_second': len(render_times) / wall if wall else 0.0,
+        'render_mean_ms': statistics.fmean(render_times) * 1000 if render_times else 0.0,
+        'render_p50_ms': _percentile(render_times, 0.50) * 1000,
+        'render_p95_ms': _percentile(render_times, 0.95) * 1000,
+        'render_max_ms': render_times[-1] * 1000 if render_times else 0.0,
+        'output_bytes': total_bytes,
+    }
+
+def print_stats(stats):
+    """Print a per-file timing table"""
+    print(f"{'file':<40} {'quotes':>7} {'failed':>6} {'wall s':>8} {'pdf/s':>8} "
+          f"{'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for s in stats:
+        print(f"{os.path.basename(s['file']):<40} {s['quotations']:>7} {s['failed']:>6} "
+              f"{s['wall_seconds']:>8.2f} {s['pdfs_per_second']:>8.1f} {s['render_mean_ms']:>8.1f} "
+              f"{s['render_p50_ms']:>8.1f} {s['render_p95_ms']:>8.1f} {s['render_max_ms']:>8.1f}")
+        for error in s['errors']:
+            print(f'  error: {error}', file=sys.stderr)
+
+def cmd_render(args):
+    """Render quotation files to PDFs"""
+    os.makedirs(args.output, exist_ok=True)
+
+    stats = []
+    if args.workers == 1:
+        for path in args.files:
+            stats.append(render_file(path, args.output, None, 1, args.engine))
+    else:
+        # One pool for all files so workers start only once
+        with create_render_pool(args.workers) as executor:
+            for path in args.files:
+                stats.append(render_file(path, args.output, executor, args.workers, args.engine))
+
+    print_stats(stats)
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+
+    return 1 if any(s['failed'] for s in stats) else 0
+
+def cmd_export(args):
+    """Stream the stored quotations to an NDJSON file"""
+    count = 0
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        for data in store.iter_quotation_json(args.customer, args.date_from, args.date_to):
+            out.write(data)
+            out.write('\n')
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f'Exported {count} quotations', file=sys.stderr)
+    return 0
+
+def cmd_import(args):
+    """Merge quotation files into the store by quote_ref"""
+    failed = False
+    for path in args.files:
+        if path.endswith(('.ndjson', '.jsonl')):
+            # Parsed line by line inside the merge, so bad lines are reported, not fatal
+            with open(path, encoding='utf-8') as f:
+                stats = store.merge_quotations(f, args.on_conflict, parse=json.loads)
+        else:
+            stats = store.merge_quotations(iter_quotation_file(path), args.on_conflict)
+
+        print(f"{os.path.basename(path)}: {stats['inserted']} inserted, {stats['updated']} updated, "
+              f"{stats['skipped']} skipped, {stats['invalid']} invalid")
+        for number, error in stats['errors']:
+            print(f'  record {number}: {error}', file=sys.stderr)
+        failed = failed or stats['invalid'] > 0
+    return 1 if failed else 0
+
+def cmd_rebuild_rollups(args):
+    """Recompute the sales rollups from the stored quotations"""
+    start = time.perf_counter()
+    count = rollups.rebuild_rollups()
+    print(f'Rebuilt sales rollups from {count} quotations in {time.perf_counter() - start:.1f} s')
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Headless quotation tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render = subparsers.add_parser('render', help='Render quotations from JSON/NDJSON files to PDFs')
+    render.add_argument('files', nargs='+', help='JSON export or NDJSON files')
+    render.add_argument('-o', '--output', default='pdfs', help='Output directory (default: pdfs)')
+    render.add_argument('-w', '--workers', type=int, default=default_worker_count(),
+                        help='Render processes (default: CPU count)')
+    render.add_argument('--engine', choices=['auto', 'platypus', 'canvas'], default='auto',
+                        help='PDF engine (auto uses canvas for very large quotations)')
+    render.add_argument('--stats-json', help='Also write the timing statistics to this file')
+    render.set_defaults(func=cmd_render)
+
+    export = subparsers.add_parser('export', help='Export stored quotations as NDJSON')
+    export.add_argument('output', help="NDJSON file to write ('-' for stdout)")
+    export.add_argument('--customer', help='Only quotations for this customer')
+    export.add_argument('--from', dest='date_from', help='Earliest quote date (YYYY-MM-DD)')
+    export.add_argument('--to', dest='date_to', help='Latest quote date (YYYY-MM-DD)')
+    export.set_defaults(func=cmd_export)
+
+    merge = subparsers.add_parser('import', help='Merge JSON/NDJSON quotation files into the store')
+    merge.add_argument('files', nargs='+', help='JSON export or NDJSON files')
+    merge.add_argument('--on-conflict', choices=store.CONFLICT_MODES, default='update',
+                       help='Existing quote_ref: update it, skip the record, or update only if newer')
+    merge.set_defaults(func=cmd_import)
+
+    rebuild = subparsers.add_parser('rebuild-rollups',
+                                    help='Recompute the Analytics page totals from the stored quotations')
+    rebuild.set_defaults(func=cmd_rebuild_rollups)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
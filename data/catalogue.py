@@ -0,0 +1,189 @@
+import os
+import threading
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+# Price list used for part number autocomplete (override with PRODUCT_CATALOGUE_PATH)
+DEFAULT_CATALOGUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'product_catalogue.csv')
+
+CATALOGUE_COLUMNS = ('part_no', 'description', 'hsn', 'list_price', 'delivery_weeks')
+
+# Bytes of each 'part_no description' string that take part in fuzzy matching
+TRIGRAM_TEXT_WIDTH = 64
+
+# Long queries are matched on their most selective trigrams only, keeping lookups fast
+MAX_QUERY_TRIGRAMS = 16
+
+def _trigram_codes(matrix):
+    """Trigram codes (3 bytes packed into an int) for every window of a uint8 matrix"""
+    matrix = matrix.astype(np.int32)
+    codes = (matrix[:, :-2] << 16) | (matrix[:, 1:-1] << 8) | matrix[:, 2:]
+    # Windows running into the zero padding after the text are not trigrams
+    return codes, matrix[:, 2:] != 0
+
+def _encode(texts, width):
+    """Lower-cased, space-padded UTF-8 strings as a fixed-width uint8 matrix"""
+    encoded = np.array([f' {text.lower()} '.encode('utf-8')[:width] for text in texts], dtype=f'S{width}')
+    return encoded.view(np.uint8).reshape(len(texts), width)
+
+def _run_starts(values):
+    """Mask of the first element of each run of equal values in a sorted array"""
+    starts = np.ones(len(values), dtype=bool)
+    starts[1:] = values[1:] != values[:-1]
+    return starts
+
+class ProductCatalogue:
+    """Read-only product list with a part number prefix index and a trigram index"""
+
+    def __init__(self, part_no, description, hsn, list_price, delivery_weeks):
+        self.part_no = list(part_no)
+        self.description = list(description)
+        self.hsn = list(hsn)
+        self.list_price = np.asarray(list_price, dtype=np.float64)
+        self.delivery_weeks = np.asarray(delivery_weeks, dtype=np.float64)
+        self._build_prefix_index()
+        self._build_trigram_index()
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Build from a DataFrame with the CATALOGUE_COLUMNS"""
+        missing = [column for column in ('part_no', 'description') if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Catalogue is missing column(s): {', '.join(missing)}")
+
+        frame = frame.dropna(subset=['part_no'])
+        def text(column):
+            if column not in frame.columns:
+                return [''] * len(frame)
+            return frame[column].fillna('').astype(str).str.strip().tolist()
+        def number(column):
+            if column not in frame.columns:
+                return np.full(len(frame), np.nan)
+            return pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64)
+
+        return cls(text('part_no'), text('description'), text('hsn'),
+                   number('list_price'), number('delivery_weeks'))
+
+    @classmethod
+    def from_csv(cls, path):
+        """Load a price list CSV"""
+        return cls.from_frame(pd.read_csv(path, dtype={'part_no': str, 'hsn': str}))
+
+    def __len__(self):
+        return len(self.part_no)
+
+    def _build_prefix_index(self):
+        # Part numbers sorted case-insensitively; a prefix is one contiguous slice
+        keys = [part_no.lower() for part_no in self.part_no]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._prefix_keys = [keys[i] for i in order]
+        self._prefix_rows = np.array(order, dtype=np.int64)
+
+    def _build_trigram_index(self):
+        count = max(len(self.part_no), 1)
+        texts = [f'{p} {d}' for p, d in zip(self.part_no, self.description)]
+        codes, valid = _trigram_codes(_encode(texts or [''], TRIGRAM_TEXT_WIDTH))
+        rows = np.broadcast_to(np.arange(count, dtype=np.int64)[:, None], codes.shape)
+
+        # One (trigram, row) pair per distinct trigram of a row, sorted by trigram.
+        # Sort and compare neighbours - much faster than np.unique's hashing here
+        pairs = np.sort(codes[valid].astype(np.int64) * count + rows[valid])
+        pairs = pairs[_run_starts(pairs)]
+        pair_codes = pairs // count
+        self._trigram_rows = (pairs % count).astype(np.int32)
+
+        # Postings of a trigram are the contiguous run of its pairs
+        self._trigram_starts = np.flatnonzero(_run_starts(pair_codes))
+        self._trigrams = pair_codes[self._trigram_starts]
+        self._trigram_ends = np.append(self._trigram_starts[1:], len(pair_codes))
+        self._row_trigram_counts = np.bincount(self._trigram_rows, minlength=len(self.part_no))
+
+    def record(self, row):
+        """Catalogue entry as a dict"""
+        price = self.list_price[row]
+        delivery = self.delivery_weeks[row]
+        return {
+            'part_no': self.part_no[row],
+            'description': self.description[row],
+            'hsn': self.hsn[row],
+            'list_price': None if np.isnan(price) else float(price),
+            'delivery_weeks': None if np.isnan(delivery) else int(delivery),
+        }
+
+    def get(self, part_no):
+        """Exact (case-insensitive) part number lookup"""
+        key = part_no.strip().lower()
+        index = bisect_left(self._prefix_keys, key)
+        if index < len(self._prefix_keys) and self._prefix_keys[index] == key:
+            return self.record(self._prefix_rows[index])
+        return None
+
+    def prefix_rows(self, prefix, limit=10):
+        """Rows whose part number starts with prefix, in part number order"""
+        key = prefix.strip().lower()
+        if not key:
+            return []
+        start = bisect_left(self._prefix_keys, key)
+        stop = bisect_left(self._prefix_keys, key + '\uffff', start, min(start + limit, len(self._prefix_keys)))
+        return self._prefix_rows[start:stop].tolist()
+
+    def fuzzy_rows(self, query, limit=10):
+        """Rows ranked by trigram similarity (Jaccard) to the query"""
+        query = query.strip()
+        if not query or not len(self):
+            return []
+        codes, valid = _trigram_codes(_encode([query], TRIGRAM_TEXT_WIDTH))
+        query_trigrams = np.unique(codes[valid])
+        positions = np.searchsorted(self._trigrams, query_trigrams)
+        found = positions < len(self._trigrams)
+        found[found] = self._trigrams[positions[found]] == query_trigrams[found]
+        positions = positions[found]
+        if not len(positions):
+            return []
+        if len(positions) > MAX_QUERY_TRIGRAMS:
+            sizes = self._trigram_ends[positions] - self._trigram_starts[positions]
+            positions = positions[np.argsort(sizes, kind='stable')[:MAX_QUERY_TRIGRAMS]]
+
+        postings = np.concatenate([self._trigram_rows[self._trigram_starts[p]:self._trigram_ends[p]] for p in positions])
+        shared = np.bincount(postings, minlength=len(self))
+        candidates = np.flatnonzero(shared)
+        scores = shared[candidates] / (len(query_trigrams) + self._row_trigram_counts[candidates] - shared[candidates])
+
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        return candidates[np.argsort(-scores, kind='stable')].tolist()
+
+    def search(self, query, limit=10):
+        """Part number prefix matches first, then fuzzy matches on part number and description"""
+        rows = self.prefix_rows(query, limit)
+        if len(rows) < limit:
+            seen = set(rows)
+            rows += [row for row in self.fuzzy_rows(query, limit) if row not in seen][:limit - len(rows)]
+        return [self.record(row) for row in rows]
+
+_catalogue = None
+_catalogue_path = None
+_catalogue_lock = threading.Lock()
+
+def get_catalogue_path():
+    """Path of the product catalogue CSV"""
+    return os.environ.get('PRODUCT_CATALOGUE_PATH', DEFAULT_CATALOGUE_PATH)
+
+def get_catalogue():
+    """Process-wide catalogue, built on first use and shared by every session (None if there is no price list)"""
+    global _catalogue, _catalogue_path
+    path = get_catalogue_path()
+    if _catalogue_path != path:
+        with _catalogue_lock:
+            if _catalogue_path != path:
+                _catalogue = ProductCatalogue.from_csv(path) if os.path.exists(path) else None
+                _catalogue_path = path
+    return _catalogue
+
+def search_products(query, limit=10):
+    """Search the product catalogue, returning entry dicts"""
+    catalogue = get_catalogue()
+    return catalogue.search(query, limit) if catalogue else []
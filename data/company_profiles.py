@@ -0,0 +1,167 @@
+import json
+import threading
+from datetime import datetime
+from types import MappingProxyType
+
+# store is imported for its schema: store_meta, which holds the profiles version
+from data import db, store
+
+db.register_schema("""
+-- Companies we quote as, shared by every session and process
+CREATE TABLE IF NOT EXISTS company_profiles (
+    profile_name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('profiles_version', 0);
+""")
+
+# Company details and default extended terms kept in a profile
+PROFILE_FIELDS = ('name', 'address', 'email', 'phone', 'gst', 'msme',
+                  'warranty', 'cancellation', 'penalty')
+
+_DEFAULT_TERMS = {
+    'warranty': 'Period shall be within 12 months from the date of commissioning or 18 months from the date of supply whichever is earlier. Warranty is not applicable for spare parts.',
+    'cancellation': 'In case of cancellation of order after 7 days of PO placement, cancellation charges would be applicable at the rate of 20% for standard valves and 40% for Non Standard valves on the order value.',
+    'penalty': 'In case of Non lifting of consignment after the contractual delivery date, we reserve the right to charge penalty at the rate of 5% per month on order value.',
+}
+
+# Profiles a new database starts with; new sessions quote as the first one
+DEFAULT_PROFILES = {
+    'MACHT AUTOMATION LLP': {
+        'name': 'MACHT AUTOMATION LLP',
+        'address': 'Off 01, Grd Floor, Laxmi Niwas, Ram Maruti Road, Naupada, Thane (W) Thane 400602, Maharashtra, India.',
+        'email': 'sales@macht-automation.com',
+        'phone': '9820667352 / 9167930569',
+        'gst': '27ABRFM7709G1ZR',
+        'msme': 'UDYAM-MH-33-0133361',
+        **_DEFAULT_TERMS,
+    },
+    'DEVSHRI MARKETING': {
+        'name': 'DEVSHRI MARKETING',
+        'address': '2/49, Suraj Building, J. B. Marg, Elphinstone Road, Prabhadevi, Mumbai - 400013.',
+        'email': 'sales@devshrimarketing.com',
+        'phone': '9821219871',
+        'gst': '27AAEFD3217G1ZS',
+        'msme': 'UDYAM-MH-19-0084808',
+        **_DEFAULT_TERMS,
+    },
+}
+DEFAULT_PROFILE_NAME = next(iter(DEFAULT_PROFILES))
+
+def _bump_version(conn):
+    conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'profiles_version'")
+
+def _seed_profiles(conn):
+    """Store the default profiles in a database that has none"""
+    if conn.execute('SELECT 1 FROM company_profiles LIMIT 1').fetchone():
+        return
+    # Runs inside db.get_connection, so the transaction is opened by hand
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another connection may have seeded them while this one waited for the lock
+        if not conn.execute('SELECT 1 FROM company_profiles LIMIT 1').fetchone():
+            now = datetime.now().isoformat()
+            conn.executemany('INSERT INTO company_profiles (profile_name, data, updated_at) VALUES (?, ?, ?)',
+                             [(name, json.dumps(profile), now) for name, profile in DEFAULT_PROFILES.items()])
+            _bump_version(conn)
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+db.register_migration(_seed_profiles)
+
+# Seeded email of DEVSHRI MARKETING in databases created before it was corrected
+_MISTYPED_EMAIL = 'sales@devshrimarketing.com.com'
+
+def _correct_seeded_email(conn):
+    """Fix the mistyped default email in profiles that still carry it"""
+    mistyped = """SELECT 1 FROM company_profiles
+                  WHERE profile_name = 'DEVSHRI MARKETING' AND json_extract(data, '$.email') = ?"""
+    if not conn.execute(mistyped, (_MISTYPED_EMAIL,)).fetchone():
+        return
+    # Runs inside db.get_connection, so the transaction is opened by hand
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        cursor = conn.execute(
+            """
+            UPDATE company_profiles SET data = json_set(data, '$.email', ?)
+            WHERE profile_name = 'DEVSHRI MARKETING' AND json_extract(data, '$.email') = ?
+            """,
+            (DEFAULT_PROFILES['DEVSHRI MARKETING']['email'], _MISTYPED_EMAIL),
+        )
+        if cursor.rowcount:
+            _bump_version(conn)
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+db.register_migration(_correct_seeded_email)
+
+# Parsed profiles by (database, version), shared read-only by every session
+_cache = {}
+_cache_lock = threading.Lock()
+
+def profiles_version():
+    """Counter that changes whenever a profile is saved or deleted (in any process)"""
+    row = db.get_connection().execute("SELECT value FROM store_meta WHERE key = 'profiles_version'").fetchone()
+    return row[0]
+
+def get_profiles():
+    """Read-only {profile name: read-only profile} of every stored profile
+
+    Loaded once per process and re-read only after the version changes, so
+    sessions share one copy instead of each holding their own.
+    """
+    key = (db.get_db_path(), profiles_version())
+    profiles = _cache.get(key)
+    if profiles is not None:
+        return profiles
+
+    rows = db.get_connection().execute(
+        'SELECT profile_name, data FROM company_profiles ORDER BY rowid').fetchall()
+    profiles = MappingProxyType({
+        row['profile_name']: MappingProxyType({field: '' for field in PROFILE_FIELDS} | json.loads(row['data']))
+        for row in rows
+    })
+    with _cache_lock:
+        # Older versions are never asked for again
+        _cache.clear()
+        _cache[key] = profiles
+    return profiles
+
+def get_profile(profile_name):
+    """A profile by name, falling back to the first one if it no longer exists"""
+    profiles = get_profiles()
+    profile = profiles.get(profile_name)
+    if profile is None and profiles:
+        profile = next(iter(profiles.values()))
+    return profile
+
+def save_profile(profile_name, fields):
+    """Create or update a profile (only PROFILE_FIELDS are kept)"""
+    profile_name = profile_name.strip()
+    if not profile_name:
+        raise ValueError('Profile name is required')
+    profile = {field: str(fields.get(field) or '') for field in PROFILE_FIELDS}
+    with db.transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO company_profiles (profile_name, data, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT (profile_name) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+            """,
+            (profile_name, json.dumps(profile), datetime.now().isoformat()),
+        )
+        _bump_version(conn)
+
+def delete_profile(profile_name):
+    """Delete a profile, returning True if it existed (the last profile is kept)"""
+    with db.transaction() as conn:
+        if conn.execute('SELECT COUNT(*) FROM company_profiles').fetchone()[0] <= 1:
+            raise ValueError('At least one company profile is needed')
+        cursor = conn.execute('DELETE FROM company_profiles WHERE profile_name = ?', (profile_name,))
+        if cursor.rowcount:
+            _bump_version(conn)
+    return cursor.rowcount > 0
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Default location of the local quotation database (override with QUOTATION_DB_PATH)
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quotations.db')
+
+_db_path = os.environ.get('QUOTATION_DB_PATH', DEFAULT_DB_PATH)
+
+# Streamlit runs every session in its own thread, so each thread keeps its own connection
+_local = threading.local()
+
+_schema_lock = threading.Lock()
+_schema_scripts = []
+_migrations = []
+_initialized_paths = set()
+
+def get_db_path():
+    """Get the path of the active quotation database"""
+    return _db_path
+
+def set_db_path(path):
+    """Point the store at a different SQLite file"""
+    global _db_path
+    _db_path = path
+
+def register_schema(script):
+    """Register CREATE ... IF NOT EXISTS statements to run on every database"""
+    with _schema_lock:
+        _schema_scripts.append(script)
+        # Force already opened databases to pick up the new tables
+        _initialized_paths.clear()
+
+def register_migration(migrate):
+    """Register a migrate(conn) function run after the schema scripts on every database
+
+    It must check whether its change is still needed, as it runs on every new
+    and already migrated database alike.
+    """
+    with _schema_lock:
+        _migrations.append(migrate)
+        _initialized_paths.clear()
+
+def _connect(path):
+    """Open a new connection with the pragmas the store relies on"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    # Autocommit mode - transactions are opened explicitly in transaction()
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA busy_timeout = 30000')
+    conn.execute('PRAGMA foreign_keys = ON')
+    if path != ':memory:':
+        # WAL lets readers in other sessions/processes proceed while one writer commits
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+def get_connection():
+    """Get this thread's connection to the active database, creating the schema if needed"""
+    path = _db_path
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _connect(path)
+
+    if path not in _initialized_paths:
+        with _schema_lock:
+            if path not in _initialized_paths:
+                for script in _schema_scripts:
+                    conn.executescript(script)
+                for migrate in _migrations:
+                    migrate(conn)
+                _initialized_paths.add(path)
+
+    return conn
+
+def close_connection():
+    """Close this thread's connections"""
+    connections = getattr(_local, 'connections', None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+@contextmanager
+def transaction():
+    """Run a block of statements as one write transaction"""
+    conn = get_connection()
+
+    # Nested blocks simply join the outer transaction
+    if conn.in_transaction:
+        yield conn
+        return
+
+    # IMMEDIATE takes the write lock up front so concurrent writers queue instead of deadlocking
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    else:
+        conn.execute('COMMIT')
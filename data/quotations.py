@@ -1,87 +1,224 @@
 import streamlit as st
 import json
 from datetime import datetime
+from data import company_profiles, rollups, store
+from utils.line_items import LineItem, RunningTotals
+from utils.gst_rates import lookup_gst_rate
+from utils import metrics
 
+@metrics.timed('session.init_session_state')
 def init_session_state():
     """Initialize session state for quotations"""
-    if 'quotations' not in st.session_state:
-        st.session_state.quotations = []
-    
+    # Only the first run of a session has anything to set up
+    if st.session_state.get('session_initialized'):
+        return
+
+    # Quotation history lives in the SQLite store, only the draft is kept per session
+    # (as LineItem objects, converted to dicts when it is saved)
     if 'current_line_items' not in st.session_state:
         st.session_state.current_line_items = []
     
-    # Initialize company configuration with defaults
-    if 'company_name' not in st.session_state:
-        st.session_state.company_name = 'MACHT AUTOMATION LLP'
-    if 'company_address' not in st.session_state:
-        st.session_state.company_address = 'Off 01, Grd Floor, Laxmi Niwas, Ram Maruti Road, Naupada, Thane (W) Thane 400602, Maharashtra, India.'
-    if 'company_email' not in st.session_state:
-        st.session_state.company_email = 'sales@macht-automation.com'
-    if 'company_phone' not in st.session_state:
-        st.session_state.company_phone = '9820667352 / 9167930569'
-    if 'company_gst' not in st.session_state:
-        st.session_state.company_gst = '27ABRFM7709G1ZR'
-    if 'company_msme' not in st.session_state:
-        st.session_state.company_msme = 'UDYAM-MH-33-0133361'
-    if 'company_warranty' not in st.session_state:
-        st.session_state.company_warranty = 'Period shall be within 12 months from the date of commissioning or 18 months from the date of supply whichever is earlier. Warranty is not applicable for spare parts.'
-    if 'company_cancellation' not in st.session_state:
-        st.session_state.company_cancellation = 'In case of cancellation of order after 7 days of PO placement, cancellation charges would be applicable at the rate of 20% for standard valves and 40% for Non Standard valves on the order value.'
-    if 'company_penalty' not in st.session_state:
-        st.session_state.company_penalty = 'In case of Non lifting of consignment after the contractual delivery date, we reserve the right to charge penalty at the rate of 5% per month on order value.'
+    # Running totals of the draft, updated as items are added and deleted
+    if 'line_item_totals' not in st.session_state:
+        st.session_state.line_item_totals = RunningTotals.from_items(st.session_state.current_line_items)
+    
+    # Company details live in the shared profile store, a session only picks a profile
+    if 'company_profile' not in st.session_state:
+        st.session_state.company_profile = company_profiles.DEFAULT_PROFILE_NAME
+
+    st.session_state.session_initialized = True
+
+def get_company_profile():
+    """Read-only company profile this session quotes as"""
+    return company_profiles.get_profile(st.session_state.get('company_profile'))
+
+def get_company_profiles():
+    """Read-only {profile name: profile} shared by every session"""
+    return company_profiles.get_profiles()
+
+def save_company_profile(profile_name, fields):
+    """Create or update a shared company profile"""
+    company_profiles.save_profile(profile_name, fields)
+
+def delete_company_profile(profile_name):
+    """Delete a shared company profile"""
+    return company_profiles.delete_profile(profile_name)
 
 def save_quotation(quotation_data):
-    """Save quotation to session state"""
+    """Save a new quotation to the quotation store
+
+    Raises store.QuotationExists (a ValueError) if the reference is already taken.
+    """
     # Add timestamp
     quotation_data['created_at'] = datetime.now().isoformat()
     
-    # Add to session state
-    st.session_state.quotations.append(quotation_data)
+    # Persist as a new quotation, never over a stored one
+    store.put_quotation(quotation_data)
     
-    # Clear current line items after saving
+    # Clear current line items and the reserved reference after saving
+    clear_line_items()
+    st.session_state.pop('draft_quote_ref', None)
+
+def _line_items_changed():
+    """Bump the draft version so widgets keyed on it start from fresh data"""
+    st.session_state.line_items_version = st.session_state.get('line_items_version', 0) + 1
+
+def add_line_item(item):
+    """Append a LineItem to the draft and update the running totals"""
+    running = _running_totals()
+    st.session_state.current_line_items.append(item)
+    running.add(item)
+    _line_items_changed()
+
+def add_line_items(items):
+    """Append a batch of LineItem objects to the draft in a single update"""
+    running = _running_totals()
+    st.session_state.current_line_items.extend(items)
+    running.extend(items)
+    _line_items_changed()
+
+def remove_line_item(index):
+    """Delete a draft line item by position and update the running totals"""
+    running = _running_totals()
+    item = st.session_state.current_line_items.pop(index)
+    running.remove(item)
+    _line_items_changed()
+    return item
+
+def remove_line_items(indexes):
+    """Delete several draft line items by position"""
+    for index in sorted(set(indexes), reverse=True):
+        remove_line_item(index)
+
+def update_line_item(index, changes):
+    """Edit fields of a draft line item, recomputing only that line's amounts"""
+    items = st.session_state.current_line_items
+    running = _running_totals()
+    old_item = items[index]
+
+    fields = {**old_item.to_dict(), **changes}
+    # A new HSN code brings its own GST rate unless one was entered too
+    if 'hsn' in changes and 'gst_percent' not in changes:
+        fields['gst_percent'] = lookup_gst_rate(fields['hsn'])
+    fields['discount_percent'] = fields['discount_percent'] or 0
+    # LineItem derives the edited line's amounts again
+    fields['discount_amount'] = fields['total_price'] = None
+    new_item = LineItem.from_dict(fields)
+
+    items[index] = new_item
+    running.remove(old_item)
+    running.add(new_item)
+    _line_items_changed()
+    return new_item
+
+def clear_line_items():
+    """Remove every draft line item"""
     st.session_state.current_line_items = []
+    st.session_state.line_item_totals = RunningTotals()
+    _line_items_changed()
 
-def get_quotations():
-    """Get all quotations from session state"""
-    return st.session_state.quotations
+def _running_totals():
+    """Running totals of the draft, rebuilt if the item list was changed behind their back"""
+    running = st.session_state.get('line_item_totals')
+    items = st.session_state.current_line_items
+    if running is None or running.count != len(items):
+        running = st.session_state.line_item_totals = RunningTotals.from_items(items)
+    return running
+
+def get_draft_totals(discount_percent=0, gst_percent=18, interstate=False):
+    """Totals of the draft quotation, independent of its line count"""
+    return _running_totals().totals(discount_percent, gst_percent, interstate)
+
+def get_quotations(customer=None, date_from=None, date_to=None, limit=None, offset=0):
+    """Get quotations from the store, optionally filtered and paged"""
+    return store.fetch_quotations(customer, date_from, date_to, limit, offset)
+
+def iter_quotations(customer=None, date_from=None, date_to=None):
+    """Stream quotations from the store one at a time"""
+    return store.iter_quotations(customer, date_from, date_to)
+
+def get_quotation_summaries(customer=None, date_from=None, date_to=None, min_total=None, max_total=None,
+                            sort='date', descending=True, limit=50, offset=0):
+    """One page of quotation summaries for listings (cached until the store changes)"""
+    return store.fetch_summaries(customer, date_from, date_to, min_total, max_total,
+                                 sort, descending, limit, offset)
+
+def count_quotation_summaries(customer=None, date_from=None, date_to=None, min_total=None, max_total=None):
+    """Number of quotations matching the listing filters"""
+    return store.count_summaries(customer, date_from, date_to, min_total, max_total)
+
+def search_quotations(query, customer=None, date_from=None, date_to=None, min_total=None, max_total=None,
+                      limit=50, offset=0):
+    """One page of full-text search results as summaries with a 'match' snippet"""
+    return store.search_summaries(query, customer, date_from, date_to, min_total, max_total,
+                                  limit, offset)
+
+def count_search_results(query, customer=None, date_from=None, date_to=None, min_total=None, max_total=None,
+                         cap=None):
+    """Number of quotations matching a full-text search (at most cap)"""
+    return store.count_search_results(query, customer, date_from, date_to, min_total, max_total, cap)
+
+def get_sales_rollups(dimension):
+    """Sales totals per customer, month or HSN code, maintained as quotations are saved"""
+    return rollups.fetch_rollups(dimension)
 
 def get_quotation_by_ref(quote_ref):
     """Get specific quotation by reference"""
-    for quotation in st.session_state.quotations:
-        if quotation['quote_ref'] == quote_ref:
-            return quotation
-    return None
+    return store.fetch_quotation(quote_ref)
 
 def delete_quotation(quote_ref):
     """Delete quotation by reference"""
-    st.session_state.quotations = [
-        q for q in st.session_state.quotations 
-        if q['quote_ref'] != quote_ref
-    ]
+    return store.remove_quotation(quote_ref)
+
+def clear_quotations():
+    """Delete all stored quotations"""
+    store.clear_quotations()
+
+def count_quotations(customer=None, date_from=None, date_to=None):
+    """Count stored quotations"""
+    return store.count_quotations(customer, date_from, date_to)
 
 def export_quotations_json():
     """Export all quotations as JSON"""
-    return json.dumps(st.session_state.quotations, indent=2, default=str)
+    return json.dumps(store.fetch_quotations(), indent=2, default=str)
+
+def import_quotations_json(json_data, on_conflict='update'):
+    """Import quotations from JSON, merging them with the stored history by quote_ref
 
-def import_quotations_json(json_data):
-    """Import quotations from JSON"""
+    Returns the merge counts and the first invalid records, as import_quotations_ndjson
+    does; a document that is not valid JSON counts as one invalid record.
+    """
     try:
         quotations = json.loads(json_data)
-        st.session_state.quotations = quotations
-        return True
-    except json.JSONDecodeError:
-        return False
+    except json.JSONDecodeError as e:
+        return {'inserted': 0, 'updated': 0, 'skipped': 0, 'invalid': 1,
+                'errors': [(e.lineno, f'not valid JSON: {e.msg}')]}
+    if isinstance(quotations, dict):
+        quotations = [quotations]
+    return store.merge_quotations(quotations, on_conflict)
+
+def export_quotations_ndjson(customer=None, date_from=None, date_to=None):
+    """Stream quotations as NDJSON lines (one quotation per line, constant memory)"""
+    for data in store.iter_quotation_json(customer, date_from, date_to):
+        yield data + '\n'
+
+def import_quotations_ndjson(lines, on_conflict='update'):
+    """Merge NDJSON lines (e.g. an open file) into the store one record at a time
+
+    Returns the merge counts and the first invalid lines (see store.merge_quotations).
+    """
+    return store.merge_quotations(lines, on_conflict, parse=json.loads)
 
 def get_next_quote_number():
-    """Generate next quote reference number"""
-    today = datetime.now()
-    date_str = today.strftime('%Y%m%d')
-    
-    # Count existing quotations for today
-    today_quotes = [
-        q for q in st.session_state.quotations 
-        if q['quote_ref'].startswith(f'Q{date_str}')
-    ]
-    
-    next_number = len(today_quotes) + 1
-    return f'Q{date_str}{next_number:03d}'
+    """Allocate the next quote reference number (unique across sessions)"""
+    # Per-day sequence shared by every session and process
+    return store.next_quote_ref()
+
+def get_draft_quote_ref():
+    """Get the quote reference reserved for the quotation being drafted"""
+    # Reserve once per draft so reruns do not burn sequence numbers
+    draft_ref = st.session_state.get('draft_quote_ref')
+    if not draft_ref or not draft_ref.startswith(f"Q{datetime.now().strftime('%Y%m%d')}"):
+        draft_ref = get_next_quote_number()
+        st.session_state.draft_quote_ref = draft_ref
+    return draft_ref
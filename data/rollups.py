@@ -0,0 +1,154 @@
+import json
+
+import numpy as np
+
+from data import db
+from utils import metrics
+from utils.calculations import line_amounts
+from utils.gst_rates import normalise_hsn
+
+# Sales totals per customer, month (YYYY-MM) and HSN code, kept in step with the
+# quotations table by data/store.py inside the same write transactions, so the
+# Analytics page reads a few hundred rows instead of every stored quotation.
+# Amounts are apportioned with utils.calculations.line_amounts, the split that
+# calculate_totals uses. For HSN rows, quotes counts the quotations with at least
+# one line of that code.
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales_rollups (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    quotes INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    gross_amount REAL NOT NULL,
+    discount_amount REAL NOT NULL,
+    taxable_amount REAL NOT NULL,
+    gst_amount REAL NOT NULL,
+    igst_amount REAL NOT NULL,
+    total_amount REAL NOT NULL,
+    PRIMARY KEY (dimension, key)
+)
+"""
+
+DIMENSIONS = ('customer', 'month', 'hsn')
+
+# Summed columns, in table order
+MEASURES = ('quotes', 'lines', 'gross_amount', 'discount_amount', 'taxable_amount',
+            'gst_amount', 'igst_amount', 'total_amount')
+
+# Rows read from the quotations table per batch while rebuilding
+REBUILD_BATCH_SIZE = 500
+
+_UPSERT_SQL = f"""
+    INSERT INTO sales_rollups (dimension, key, {', '.join(MEASURES)})
+    VALUES (?, ?, {', '.join('?' * len(MEASURES))})
+    ON CONFLICT (dimension, key) DO UPDATE SET
+        {', '.join(f'{m} = {m} + excluded.{m}' for m in MEASURES)}
+"""
+
+def contributions(quotation_data, quote_day):
+    """(dimension, key, measures...) rows a quotation adds to the rollups"""
+    totals = quotation_data.get('totals') or {}
+    line_items = quotation_data.get('line_items') or []
+    amounts = line_amounts(line_items, totals.get('discount_percent') or 0, totals.get('gst_percent', 18))
+    # Inter-state quotations are taxed as IGST, the rest split into CGST and SGST
+    igst = amounts['gst_amount'] if totals.get('interstate') else np.zeros(len(line_items))
+    columns = (amounts['gross_amount'], amounts['discount_amount'], amounts['taxable_amount'],
+               amounts['gst_amount'], igst, amounts['total_amount'])
+
+    quotation = (1, len(line_items)) + tuple(float(column.sum()) for column in columns)
+    customer = ((quotation_data.get('client') or {}).get('name') or '').strip()
+    rows = [('customer', customer) + quotation, ('month', (quote_day or '')[:7]) + quotation]
+
+    if line_items:
+        # One row per HSN code in the quotation, summed in a single vectorised pass
+        codes = [normalise_hsn(item.get('hsn')) for item in line_items]
+        keys, inverse = np.unique(codes, return_inverse=True)
+        lines = np.bincount(inverse, minlength=len(keys))
+        sums = [np.bincount(inverse, weights=column, minlength=len(keys)) for column in columns]
+        for index, key in enumerate(keys.tolist()):
+            rows.append(('hsn', key, 1, int(lines[index])) + tuple(float(s[index]) for s in sums))
+    return rows
+
+def add_quotation(conn, quotation_data, quote_day):
+    """Add a stored quotation to the rollups (inside the writing transaction)"""
+    conn.executemany(_UPSERT_SQL, contributions(quotation_data, quote_day))
+
+def subtract_quotation(conn, quotation_data, quote_day):
+    """Take a quotation back out of the rollups, given the quote day it was added under"""
+    rows = contributions(quotation_data, quote_day)
+    conn.executemany(_UPSERT_SQL, [row[:2] + tuple(-value for value in row[2:]) for row in rows])
+    # Groups without quotations left disappear rather than showing zeros
+    conn.executemany('DELETE FROM sales_rollups WHERE dimension = ? AND key = ? AND quotes <= 0',
+                     [row[:2] for row in rows])
+
+def clear_rollups(conn):
+    conn.execute('DELETE FROM sales_rollups')
+
+def _rebuild(conn):
+    """Recompute every rollup from the quotations table (transaction held), returning the quotation count"""
+    groups = {}
+    count = 0
+    cursor = conn.execute('SELECT quote_day, data FROM quotations')
+    while True:
+        rows = cursor.fetchmany(REBUILD_BATCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            count += 1
+            for dimension, key, *values in contributions(json.loads(row['data']), row['quote_day']):
+                group = groups.get((dimension, key))
+                if group is None:
+                    groups[(dimension, key)] = values
+                else:
+                    for index, value in enumerate(values):
+                        group[index] += value
+
+    conn.execute('DELETE FROM sales_rollups')
+    conn.executemany(_UPSERT_SQL, [key + tuple(values) for key, values in groups.items()])
+    return count
+
+@metrics.timed('rollups.rebuild')
+def rebuild_rollups():
+    """Recompute every rollup from the stored quotations, returning how many were read
+
+    The rollups are maintained incrementally; this is the fallback after editing
+    the database by hand or changing how amounts are apportioned.
+    """
+    with db.transaction() as conn:
+        return _rebuild(conn)
+
+def _build_rollups(conn):
+    """Create the rollups on databases that do not have them yet, from what is already stored"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sales_rollups'").fetchone()
+    if exists:
+        return
+    # Runs inside db.get_connection, so the transaction is opened by hand
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another connection may have built them while this one waited for the lock
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sales_rollups'").fetchone():
+            conn.execute('COMMIT')
+            return
+        conn.execute(ROLLUP_SCHEMA)
+        _rebuild(conn)
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+db.register_migration(_build_rollups)
+
+@metrics.timed('rollups.fetch_rollups')
+def fetch_rollups(dimension):
+    """All rollup rows of one dimension as dicts (key plus the MEASURES), largest total first"""
+    if dimension not in DIMENSIONS:
+        raise ValueError(f'dimension must be one of {", ".join(DIMENSIONS)}')
+    rows = db.get_connection().execute(
+        f"""
+        SELECT key, {', '.join(MEASURES)} FROM sales_rollups
+        WHERE dimension = ?
+        ORDER BY total_amount DESC, key
+        """,
+        (dimension,),
+    ).fetchall()
+    return [dict(row) for row in rows]
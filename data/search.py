@@ -0,0 +1,153 @@
+import hashlib
+import json
+import re
+from datetime import date
+
+from data import db
+
+# Full-text index of the stored quotations, kept in step with the quotations table
+# by data/store.py inside the same write transactions. Each document's rowid is
+# derived from its quote date and reference (see doc_id): updates and deletes are
+# direct rowid lookups that never depend on the implicit rowids of the quotations
+# table, and rowid order is quote date order.
+INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS quotation_search USING fts5(
+    quote_ref UNINDEXED,
+    customer,
+    address,
+    subject,
+    part_no,
+    description,
+    tokenize = 'unicode61 remove_diacritics 2',
+    -- Prefix indexes let 'pun*' or 'valv*' stream one doclist instead of merging those
+    -- of every word they start (about 60% more index, 100x faster typed-ahead terms)
+    prefix = '2 3 4 5 6'
+)
+"""
+
+# bm25 weight of each column (quote_ref is not indexed): a hit on the customer or a
+# part number says far more than one in a boilerplate description
+COLUMN_WEIGHTS = (0.0, 10.0, 3.0, 4.0, 8.0, 1.0)
+RANK = f"bm25(quotation_search, {', '.join(map(str, COLUMN_WEIGHTS))})"
+
+# Queries matching more quotations than this are listed newest first (index order)
+# instead of by relevance: ranking every match of a word found in most quotations
+# costs hundreds of ms at 100k quotes and tells the user little
+RANKED_MATCHES = 1000
+
+# Longer queries are cut to their first terms
+MAX_QUERY_TERMS = 8
+
+# Indexed columns, in table order
+_COLUMNS = 'quote_ref, customer, address, subject, part_no, description'
+
+# Rowids tried after a quotation's own doc_id when another reference already holds it
+ID_PROBES = 16
+
+# Rows read from the quotations table per batch while building the index
+INDEX_BATCH_SIZE = 500
+
+def doc_id(quote_ref, quote_day):
+    """Index rowid of a quotation: quote day ordinal above a 32-bit hash of the reference"""
+    day = date.fromisoformat(quote_day).toordinal() if quote_day else 0
+    digest = hashlib.blake2b(quote_ref.encode('utf-8'), digest_size=4).digest()
+    return (day << 32) | int.from_bytes(digest, 'big')
+
+def document(quotation_data):
+    """Indexed column values (quote_ref, customer, address, subject, part numbers, descriptions)"""
+    client = quotation_data.get('client') or {}
+    line_items = quotation_data.get('line_items') or ()
+    # Repeated parts and descriptions add nothing to a match, only to the index size
+    part_numbers = dict.fromkeys(str(item.get('part_no') or '') for item in line_items)
+    descriptions = dict.fromkeys(str(item.get('description') or '') for item in line_items)
+    return (
+        quotation_data['quote_ref'],
+        client.get('name') or '',
+        client.get('address') or '',
+        quotation_data.get('subject') or '',
+        ' '.join(part_numbers),
+        ' '.join(descriptions),
+    )
+
+def _insert(conn, doc, quote_day):
+    first = doc_id(doc[0], quote_day)
+    # Two references of one day rarely share a hash; the later one takes the next free rowid
+    taken = {row[0] for row in conn.execute(
+        'SELECT rowid FROM quotation_search WHERE rowid >= ? AND rowid < ?', (first, first + ID_PROBES))}
+    rowid = next((rowid for rowid in range(first, first + ID_PROBES) if rowid not in taken), None)
+    if rowid is None:
+        raise RuntimeError(f'No free search index slot for {doc[0]}')
+    conn.execute(f'INSERT INTO quotation_search (rowid, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                 (rowid,) + doc)
+
+def _find(conn, quote_ref, quote_day):
+    """(rowid, quote_ref, customer, ...) of a quotation's document, or None"""
+    first = doc_id(quote_ref, quote_day)
+    return conn.execute(f'SELECT rowid, {_COLUMNS} FROM quotation_search '
+                        'WHERE rowid >= ? AND rowid < ? AND quote_ref = ?',
+                        (first, first + ID_PROBES, quote_ref)).fetchone()
+
+def index_quotation(conn, quotation_data, quote_day):
+    """Add a new quotation's document (inside the writing transaction)"""
+    _insert(conn, document(quotation_data), quote_day)
+
+def reindex_quotation(conn, quotation_data, quote_day, previous_day):
+    """Refresh the document of an updated quotation stored before under previous_day"""
+    doc = document(quotation_data)
+    row = _find(conn, doc[0], previous_day)
+    if row is not None:
+        # Re-imports mostly write back what is already indexed
+        if previous_day == quote_day and tuple(row[1:]) == doc:
+            return
+        conn.execute('DELETE FROM quotation_search WHERE rowid = ?', (row[0],))
+    _insert(conn, doc, quote_day)
+
+def unindex_quotation(conn, quote_ref, quote_day):
+    """Drop a quotation's document, given the quote day it was indexed under"""
+    row = _find(conn, quote_ref, quote_day)
+    if row is not None:
+        conn.execute('DELETE FROM quotation_search WHERE rowid = ?', (row[0],))
+
+def clear_index(conn):
+    conn.execute('DELETE FROM quotation_search')
+
+def _build_index(conn):
+    """Create the index on databases that do not have it yet, indexing what is already stored"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'quotation_search'").fetchone()
+    if exists:
+        return
+    # Runs inside db.get_connection, so the transaction is opened by hand
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another connection may have built it while this one waited for the lock
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'quotation_search'").fetchone():
+            conn.execute('COMMIT')
+            return
+        conn.execute(INDEX_SCHEMA)
+        cursor = conn.execute('SELECT quote_day, data FROM quotations')
+        while True:
+            rows = cursor.fetchmany(INDEX_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                index_quotation(conn, json.loads(row['data']), row['quote_day'])
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+db.register_migration(_build_index)
+
+# Query terms are split on whitespace only, so part numbers stay whole
+_TERM_PATTERN = re.compile(r'[^\s"]+')
+
+def match_expression(query):
+    """FTS5 MATCH expression for a free-text query, or None if it has no terms
+
+    Every whitespace-separated term must match, either as a word or as the start
+    of one ('pun' finds Pune); a term such as 'MA-0012' matches as a phrase.
+    """
+    terms = _TERM_PATTERN.findall(query or '')[:MAX_QUERY_TERMS]
+    # Quoting keeps FTS5 operators and punctuation in the query literal
+    terms = [f'"{term}"*' for term in terms if any(c.isalnum() for c in term)]
+    return ' AND '.join(terms) or None
@@ -0,0 +1,571 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from data import db, rollups, search
+from utils import metrics
+
+db.register_schema("""
+CREATE TABLE IF NOT EXISTS quotations (
+    quote_ref TEXT PRIMARY KEY,
+    quote_day TEXT,
+    customer_name TEXT,
+    created_at TEXT,
+    data TEXT NOT NULL,
+    -- Summary columns so listings never decode the JSON
+    total_amount REAL,
+    item_count INTEGER
+);
+-- quote_ref is covered by the primary key index; the date, customer and total
+-- indexes are created by _add_summary_columns once those columns exist
+
+-- Last quote number handed out per day (YYYYMMDD)
+CREATE TABLE IF NOT EXISTS quote_sequences (
+    day TEXT PRIMARY KEY,
+    last_number INTEGER NOT NULL
+);
+
+-- 'version' goes up with every write, so caches know when listings are stale
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', 0);
+""")
+
+def _add_summary_columns(conn):
+    """Add and backfill total_amount/item_count on databases created before they existed"""
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(quotations)')}
+    if 'total_amount' not in columns:
+        # Runs inside db.get_connection, so the transaction is opened by hand
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(quotations)')}
+            if 'total_amount' not in columns:
+                conn.execute('ALTER TABLE quotations ADD COLUMN total_amount REAL')
+                conn.execute('ALTER TABLE quotations ADD COLUMN item_count INTEGER')
+                conn.execute("""
+                    UPDATE quotations SET
+                        total_amount = json_extract(data, '$.totals.total_amount'),
+                        item_count = json_array_length(data, '$.line_items')
+                """)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    # Covering indexes: filtered, sorted and paged listings never read the wide rows,
+    # so even deep pages skip through index entries only
+    conn.executescript("""
+        DROP INDEX IF EXISTS idx_quotations_quote_day;
+        DROP INDEX IF EXISTS idx_quotations_customer;
+        CREATE INDEX IF NOT EXISTS idx_quotations_day_summary
+            ON quotations (quote_day, quote_ref, customer_name, total_amount, item_count);
+        CREATE INDEX IF NOT EXISTS idx_quotations_customer_summary
+            ON quotations (customer_name COLLATE NOCASE, quote_ref, quote_day, total_amount, item_count);
+        CREATE INDEX IF NOT EXISTS idx_quotations_total_summary
+            ON quotations (total_amount, quote_ref, quote_day, customer_name, item_count);
+    """)
+
+db.register_migration(_add_summary_columns)
+
+# Quote references in the allocated format: 'Q' + YYYYMMDD + number
+_NUMBERED_REF = re.compile(r'Q(\d{8})(\d{1,9})')
+
+def _seed_quote_sequences(conn):
+    """Start every day's quote sequence after its highest stored reference, once per database
+
+    Afterwards each write advances the sequence itself (_advance_sequence), so
+    allocation never has to scan the day's references.
+    """
+    seeded = "SELECT 1 FROM store_meta WHERE key = 'quote_sequences_seeded'"
+    if conn.execute(seeded).fetchone():
+        return
+    # Runs inside db.get_connection, so the transaction is opened by hand
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if not conn.execute(seeded).fetchone():
+            conn.execute("""
+                INSERT INTO quote_sequences (day, last_number)
+                SELECT substr(quote_ref, 2, 8), MAX(CAST(substr(quote_ref, 10) AS INTEGER))
+                FROM quotations
+                WHERE quote_ref GLOB 'Q[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]*'
+                    AND substr(quote_ref, 10) NOT GLOB '*[^0-9]*' AND length(quote_ref) <= 18
+                GROUP BY 1
+                ON CONFLICT (day) DO UPDATE SET last_number = MAX(last_number, excluded.last_number)
+            """)
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('quote_sequences_seeded', 1)")
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+db.register_migration(_seed_quote_sequences)
+
+# Keys kept out of the stored JSON (the logo is company configuration, not quotation data)
+_UNSTORED_KEYS = ('company_logo',)
+
+def to_iso_date(value):
+    """Convert a quote date ('17-Oct-2026', ISO string or date) to 'YYYY-MM-DD'"""
+    if value is None or value == '':
+        return None
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+
+    for fmt in ('%d-%b-%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(str(value), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+def _serialize(quotation_data):
+    """Serialize a quotation dict for storage"""
+    record = {k: v for k, v in quotation_data.items() if k not in _UNSTORED_KEYS}
+    return json.dumps(record, default=str)
+
+def _row_params(quotation_data):
+    """Build the column values stored for a quotation"""
+    client = quotation_data.get('client') or {}
+    totals = quotation_data.get('totals') or {}
+    return (
+        quotation_data['quote_ref'],
+        to_iso_date(quotation_data.get('quote_date')),
+        client.get('name'),
+        quotation_data.get('created_at'),
+        _serialize(quotation_data),
+        totals.get('total_amount'),
+        len(quotation_data.get('line_items') or ()),
+    )
+
+def _advance_sequence(conn, quote_ref):
+    """Keep the day's quote sequence past a newly stored reference in the allocated format"""
+    # Imports, the API and hand-typed references add numbers the sequence did not hand out
+    match = _NUMBERED_REF.fullmatch(quote_ref)
+    if match:
+        conn.execute(
+            """
+            INSERT INTO quote_sequences (day, last_number) VALUES (?, ?)
+            ON CONFLICT (day) DO UPDATE SET last_number = MAX(last_number, excluded.last_number)
+            """,
+            (match.group(1), int(match.group(2))),
+        )
+
+def _bump_version(conn):
+    """Mark the stored quotations as changed (inside the writing transaction)"""
+    conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+
+class QuotationExists(ValueError):
+    """Raised by put_quotation when a quotation with the same reference is already stored"""
+
+@metrics.timed('store.put_quotation')
+def put_quotation(quotation_data):
+    """Insert a new quotation, raising QuotationExists if its reference is already stored
+
+    A stored quotation is only ever replaced by merge_quotations(on_conflict='update'),
+    where the caller asks for it.
+    """
+    with db.transaction() as conn:
+        if _upsert(conn, quotation_data, on_conflict='skip') is None:
+            raise QuotationExists(f"{quotation_data['quote_ref']} already exists")
+        _bump_version(conn)
+
+# What happens when a merged quotation's reference is already stored
+_CONFLICT_CLAUSES = {
+    'update': """DO UPDATE SET
+            quote_day = excluded.quote_day,
+            customer_name = excluded.customer_name,
+            created_at = excluded.created_at,
+            data = excluded.data,
+            total_amount = excluded.total_amount,
+            item_count = excluded.item_count""",
+    'skip': 'DO NOTHING',
+}
+# 'newer' only replaces quotations with an older created_at
+_CONFLICT_CLAUSES['newer'] = _CONFLICT_CLAUSES['update'] + """
+        WHERE COALESCE(excluded.created_at, '') > COALESCE(quotations.created_at, '')"""
+CONFLICT_MODES = tuple(_CONFLICT_CLAUSES)
+
+def _upsert(conn, quotation_data, on_conflict='update'):
+    """Write one quotation, its search document and rollups, returning 'inserted', 'updated' or None if skipped"""
+    params = _row_params(quotation_data)
+    # What was stored before is taken back out of the search index and the rollups
+    previous = conn.execute('SELECT quote_day, data FROM quotations WHERE quote_ref = ?',
+                            (params[0],)).fetchone()
+    # ON CONFLICT keeps the original rowid, so listing order stays insertion order
+    cursor = conn.execute(
+        f"""
+        INSERT INTO quotations (quote_ref, quote_day, customer_name, created_at, data,
+                                total_amount, item_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (quote_ref) {_CONFLICT_CLAUSES[on_conflict]}
+        """,
+        params,
+    )
+    if cursor.rowcount == 0:
+        return None
+    # Rollups are computed from the stored JSON both ways, so a later subtraction
+    # takes out exactly what was added
+    if previous is None:
+        _advance_sequence(conn, params[0])
+        search.index_quotation(conn, quotation_data, params[1])
+        rollups.add_quotation(conn, json.loads(params[4]), params[1])
+        return 'inserted'
+    # Re-imports often write back exactly what is stored
+    if previous['data'] != params[4]:
+        search.reindex_quotation(conn, quotation_data, params[1], previous['quote_day'])
+        rollups.subtract_quotation(conn, json.loads(previous['data']), previous['quote_day'])
+        rollups.add_quotation(conn, json.loads(params[4]), params[1])
+    return 'updated'
+
+def validate_quotation(quotation_data):
+    """Check that a record has the shape of a stored quotation, raising ValueError if not"""
+    if not isinstance(quotation_data, dict):
+        raise ValueError('record is not a JSON object')
+    quote_ref = quotation_data.get('quote_ref')
+    if not isinstance(quote_ref, str) or not quote_ref.strip():
+        raise ValueError('quote_ref is missing')
+    if not isinstance(quotation_data.get('client') or {}, dict):
+        raise ValueError(f'{quote_ref}: client must be an object')
+
+    line_items = quotation_data.get('line_items')
+    if not isinstance(line_items, list):
+        raise ValueError(f'{quote_ref}: line_items must be a list')
+    for number, item in enumerate(line_items, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f'{quote_ref}: line item {number} is not an object')
+        for field in ('qty', 'unit_price', 'total_price'):
+            value = item.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'{quote_ref}: line item {number} has no numeric {field}')
+
+    totals = quotation_data.get('totals')
+    if not isinstance(totals, dict) or not isinstance(totals.get('total_amount'), (int, float)):
+        raise ValueError(f'{quote_ref}: totals are missing')
+
+# Error messages kept by merge_quotations (counts are always complete)
+MAX_MERGE_ERRORS = 100
+
+@metrics.timed('store.merge_quotations')
+def merge_quotations(records, on_conflict='update', batch_size=500, parse=None):
+    """Merge quotations into the store by quote_ref instead of replacing the history
+
+    records is any iterable (e.g. the lines of an NDJSON file, with parse=json.loads)
+    and is consumed one record at a time, committing every batch_size records.
+    on_conflict is 'update', 'skip' or 'newer' (update only if created_at is later).
+    Returns counts of inserted, updated, skipped and invalid records plus the first
+    MAX_MERGE_ERRORS errors as (record number, message).
+    """
+    if on_conflict not in _CONFLICT_CLAUSES:
+        raise ValueError(f'on_conflict must be one of {", ".join(CONFLICT_MODES)}')
+
+    stats = {'inserted': 0, 'updated': 0, 'skipped': 0, 'invalid': 0, 'errors': []}
+    records = iter(records)
+    number = 0
+    while True:
+        # One write transaction per batch keeps the lock short for other sessions
+        with db.transaction() as conn:
+            _bump_version(conn)
+            for number, record in enumerate(records, number + 1):
+                try:
+                    if parse is not None:
+                        if not record.strip():
+                            continue
+                        record = parse(record)
+                    validate_quotation(record)
+                except ValueError as e:
+                    stats['invalid'] += 1
+                    if len(stats['errors']) < MAX_MERGE_ERRORS:
+                        stats['errors'].append((number, str(e)))
+                    continue
+
+                stats[_upsert(conn, record, on_conflict) or 'skipped'] += 1
+
+                if number % batch_size == 0:
+                    break
+            else:
+                return stats
+
+@metrics.timed('store.replace_quotations')
+def replace_quotations(quotations):
+    """Replace the whole history with the given quotations"""
+    with db.transaction() as conn:
+        conn.execute('DELETE FROM quotations')
+        search.clear_index(conn)
+        rollups.clear_rollups(conn)
+        _bump_version(conn)
+        for quotation in quotations:
+            _upsert(conn, quotation)
+        _bump_version(conn)
+
+def _where_clause(customer=None, date_from=None, date_to=None):
+    """Build an indexed WHERE clause for the listing filters"""
+    clauses = []
+    params = []
+    if customer:
+        clauses.append('customer_name = ? COLLATE NOCASE')
+        params.append(customer)
+    if date_from:
+        clauses.append('quote_day >= ?')
+        params.append(to_iso_date(date_from))
+    if date_to:
+        clauses.append('quote_day <= ?')
+        params.append(to_iso_date(date_to))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, params
+
+def _summary_where(customer=None, date_from=None, date_to=None, min_total=None, max_total=None):
+    """WHERE clause for summary listings (customer is a case-insensitive name prefix)"""
+    where, params = _where_clause(None, date_from, date_to)
+    clauses = [where[len('WHERE '):]] if where else []
+    if customer:
+        # A range on the NOCASE index rather than LIKE, which could not use it
+        clauses.append('customer_name >= ? COLLATE NOCASE AND customer_name < ? COLLATE NOCASE')
+        params += [customer, customer + '\uffff']
+    if min_total is not None:
+        clauses.append('total_amount >= ?')
+        params.append(min_total)
+    if max_total is not None:
+        clauses.append('total_amount <= ?')
+        params.append(max_total)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+# Sort orders for summary listings, each backed by a covering index
+# (quote_ref breaks ties so pages never overlap)
+SUMMARY_SORTS = {
+    'date': 'quote_day',
+    'customer': 'customer_name COLLATE NOCASE',
+    'total': 'total_amount',
+}
+
+# Summary pages and counts by (database, store version, query) - a write bumps
+# the version, so entries for older versions are simply never asked for again
+_SUMMARY_CACHE_ENTRIES = 256
+_summary_cache = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+def store_version():
+    """Counter that changes whenever the stored quotations change (in any process)"""
+    row = db.get_connection().execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()
+    return row[0]
+
+def _cached_summary_query(key, query):
+    key = (db.get_db_path(), store_version()) + key
+    with _summary_cache_lock:
+        if key in _summary_cache:
+            _summary_cache.move_to_end(key)
+            metrics.increment('store.summary_cache.hits')
+            return _summary_cache[key]
+
+    metrics.increment('store.summary_cache.misses')
+    result = query()
+    with _summary_cache_lock:
+        _summary_cache[key] = result
+        while len(_summary_cache) > _SUMMARY_CACHE_ENTRIES:
+            _summary_cache.popitem(last=False)
+    return result
+
+@metrics.timed('store.fetch_summaries')
+def fetch_summaries(customer=None, date_from=None, date_to=None, min_total=None, max_total=None,
+                    sort='date', descending=True, limit=50, offset=0):
+    """One page of quotation summaries (ref, date, customer, total, item count), cached until the store changes
+
+    Returns a tuple of read-only dicts; only the summary columns are read, never the JSON.
+    """
+    if sort not in SUMMARY_SORTS:
+        raise ValueError(f'sort must be one of {", ".join(SUMMARY_SORTS)}')
+    filters = (customer, to_iso_date(date_from), to_iso_date(date_to), min_total, max_total)
+
+    def query():
+        where, params = _summary_where(*filters)
+        direction = 'DESC' if descending else 'ASC'
+        rows = db.get_connection().execute(
+            f"""
+            SELECT quote_ref, quote_day, customer_name, total_amount, item_count
+            FROM quotations {where}
+            ORDER BY {SUMMARY_SORTS[sort]} {direction}, quote_ref {direction}
+            LIMIT ? OFFSET ?
+            """,
+            params + [limit, offset],
+        ).fetchall()
+        return tuple(dict(row) for row in rows)
+
+    return _cached_summary_query(('page',) + filters + (sort, descending, limit, offset), query)
+
+@metrics.timed('store.count_summaries')
+def count_summaries(customer=None, date_from=None, date_to=None, min_total=None, max_total=None):
+    """Number of quotations matching the summary filters, cached until the store changes"""
+    filters = (customer, to_iso_date(date_from), to_iso_date(date_to), min_total, max_total)
+
+    def query():
+        where, params = _summary_where(*filters)
+        return db.get_connection().execute(f'SELECT COUNT(*) FROM quotations {where}', params).fetchone()[0]
+
+    return _cached_summary_query(('count',) + filters, query)
+
+def _search_query(query, customer=None, date_from=None, date_to=None, min_total=None, max_total=None):
+    """FROM ... WHERE matching the search index and the summary filters, or None for an empty query"""
+    expression = search.match_expression(query)
+    if expression is None:
+        return None, None
+    where, params = _summary_where(customer, date_from, date_to, min_total, max_total)
+    match = 'quotation_search MATCH ?'
+    where = f'WHERE {match} AND {where[len("WHERE "):]}' if where else f'WHERE {match}'
+    sql = f"""
+        FROM quotation_search
+        JOIN quotations AS q ON q.quote_ref = quotation_search.quote_ref
+        {where}
+    """
+    return sql, [expression] + params
+
+def _count_matches(sql, params, cap):
+    """Matches of a _search_query, counting no further than cap"""
+    # LIMIT stops the index scan early for words found in most quotations
+    return db.get_connection().execute(f'SELECT COUNT(*) FROM (SELECT 1 {sql} LIMIT ?)',
+                                       params + [cap]).fetchone()[0]
+
+@metrics.timed('store.search_summaries')
+def search_summaries(query, customer=None, date_from=None, date_to=None, min_total=None, max_total=None,
+                     limit=50, offset=0):
+    """Summaries of the quotations matching a full-text query, with a 'match' snippet each
+
+    Every term must match a word (or the start of one) in the customer name or
+    address, subject, part numbers or descriptions. Up to search.RANKED_MATCHES
+    matches are ordered best first, larger result sets newest first. Cached until
+    the store changes like fetch_summaries.
+    """
+    filters = (customer, to_iso_date(date_from), to_iso_date(date_to), min_total, max_total)
+
+    def query_page():
+        sql, params = _search_query(query, *filters)
+        if sql is None:
+            return ()
+        order = 'quotation_search.rowid DESC'
+        if _count_matches(sql, params, search.RANKED_MATCHES + 1) <= search.RANKED_MATCHES:
+            order = f'{search.RANK}, {order}'
+        rows = db.get_connection().execute(
+            f"""
+            SELECT q.quote_ref, q.quote_day, q.customer_name, q.total_amount, q.item_count,
+                   snippet(quotation_search, -1, '[', ']', '...', 8) AS match
+            {sql}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+            """,
+            params + [limit, offset],
+        ).fetchall()
+        return tuple(dict(row) for row in rows)
+
+    return _cached_summary_query(('search', query) + filters + (limit, offset), query_page)
+
+@metrics.timed('store.count_search_results')
+def count_search_results(query, customer=None, date_from=None, date_to=None, min_total=None, max_total=None,
+                         cap=None):
+    """Number of quotations matching a full-text query and the summary filters (at most cap)"""
+    filters = (customer, to_iso_date(date_from), to_iso_date(date_to), min_total, max_total)
+
+    def query_count():
+        sql, params = _search_query(query, *filters)
+        if sql is None:
+            return 0
+        return _count_matches(sql, params, -1 if cap is None else cap)
+
+    return _cached_summary_query(('search_count', query) + filters + (cap,), query_count)
+
+@metrics.timed('store.fetch_quotations')
+def fetch_quotations(customer=None, date_from=None, date_to=None, limit=None, offset=0):
+    """Get stored quotations, optionally filtered by customer and date range"""
+    where, params = _where_clause(customer, date_from, date_to)
+    sql = f'SELECT data FROM quotations {where} ORDER BY rowid'
+    if limit is not None:
+        sql += ' LIMIT ? OFFSET ?'
+        params += [limit, offset]
+
+    rows = db.get_connection().execute(sql, params).fetchall()
+    return [json.loads(row['data']) for row in rows]
+
+def iter_quotations(customer=None, date_from=None, date_to=None, batch_size=500):
+    """Stream stored quotations one at a time without loading the whole history"""
+    where, params = _where_clause(customer, date_from, date_to)
+    cursor = db.get_connection().execute(f'SELECT data FROM quotations {where} ORDER BY rowid', params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield json.loads(row['data'])
+
+def iter_quotation_json(customer=None, date_from=None, date_to=None, batch_size=500,
+                        limit=None, offset=0):
+    """Stream stored quotations as their JSON text (one line each), without decoding them"""
+    where, params = _where_clause(customer, date_from, date_to)
+    sql = f'SELECT data FROM quotations {where} ORDER BY rowid'
+    if limit is not None:
+        sql += ' LIMIT ? OFFSET ?'
+        params += [limit, offset]
+    cursor = db.get_connection().execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield row['data']
+
+@metrics.timed('store.fetch_quotation')
+def fetch_quotation(quote_ref):
+    """Get a single quotation by reference"""
+    row = db.get_connection().execute(
+        'SELECT data FROM quotations WHERE quote_ref = ?', (quote_ref,)
+    ).fetchone()
+    return json.loads(row['data']) if row else None
+
+@metrics.timed('store.remove_quotation')
+def remove_quotation(quote_ref):
+    """Delete a quotation by reference, returning True if it existed"""
+    with db.transaction() as conn:
+        row = conn.execute('DELETE FROM quotations WHERE quote_ref = ? RETURNING quote_day, data',
+                           (quote_ref,)).fetchone()
+        if row is not None:
+            search.unindex_quotation(conn, quote_ref, row['quote_day'])
+            rollups.subtract_quotation(conn, json.loads(row['data']), row['quote_day'])
+            _bump_version(conn)
+    return row is not None
+
+@metrics.timed('store.clear_quotations')
+def clear_quotations():
+    """Delete every stored quotation"""
+    with db.transaction() as conn:
+        conn.execute('DELETE FROM quotations')
+        search.clear_index(conn)
+        rollups.clear_rollups(conn)
+        _bump_version(conn)
+
+@metrics.timed('store.count_quotations')
+def count_quotations(customer=None, date_from=None, date_to=None):
+    """Count stored quotations matching the listing filters"""
+    where, params = _where_clause(customer, date_from, date_to)
+    row = db.get_connection().execute(f'SELECT COUNT(*) FROM quotations {where}', params).fetchone()
+    return row[0]
+
+@metrics.timed('store.allocate_quote_number')
+def allocate_quote_number(day):
+    """Atomically reserve the next quote number for a day (YYYYMMDD)"""
+    # BEGIN IMMEDIATE serialises allocators across sessions and processes
+    with db.transaction() as conn:
+        # Stored references are already counted in the sequence (_advance_sequence)
+        row = conn.execute(
+            """
+            INSERT INTO quote_sequences (day, last_number) VALUES (?, 1)
+            ON CONFLICT (day) DO UPDATE SET last_number = last_number + 1
+            RETURNING last_number
+            """,
+            (day,),
+        ).fetchone()
+        return row[0]
+
+def next_quote_ref(when=None):
+    """Allocate the next quote reference for a day ('Q' + YYYYMMDD + 3-digit number)"""
+    day = (when or datetime.now()).strftime('%Y%m%d')
+    return f'Q{day}{allocate_quote_number(day):03d}'
@@ -0,0 +1,49 @@
+import pytest
+
+from data import db
+from utils.calculations import calculate_totals
+
+def _quotation(quote_ref, customer='ACME ENGINEERING', quote_date='17-Oct-2026', line_items=None,
+                created_at='2026-10-17T10:00:00', discount_percent=0, gst_percent=18):
+    """A complete stored-format quotation (renderable) with consistent line amounts and totals"""
+    if line_items is None:
+        line_items = [
+            {'part_no': 'MA-0012', 'description': 'Ball Valve 1"', 'hsn': '8481',
+             'qty': 2, 'unit_price': 1500.0, 'discount_percent': 0},
+            {'part_no': 'MA-0150', 'description': 'Pneumatic Actuator', 'hsn': '8412',
+             'qty': 1, 'unit_price': 4200.0, 'discount_percent': 10},
+        ]
+    items = []
+    for item in line_items:
+        gross = item['qty'] * item['unit_price']
+        discount = gross * item.get('discount_percent', 0) / 100
+        items.append({**item, 'discount_amount': discount, 'total_price': gross - discount})
+    return {
+        'quote_ref': quote_ref,
+        'quote_date': quote_date,
+        'validity_date': '01-Nov-2026',
+        'company': {'name': 'MACHT AUTOMATION LLP', 'address': 'Pune', 'email': 'sales@example.com',
+                    'phone': '+91 20 0000 0000', 'gst': '27AAAAA0000A1Z5', 'msme': 'UDYAM-MH-00-0000000'},
+        'client': {'name': customer, 'address': 'Pune', 'email': '', 'phone': '', 'contact_person': ''},
+        'subject': 'Offer for Supply of Valves',
+        'terms': {'payment': '100% against delivery', 'price': 'Ex-works', 'freight': 'Extra',
+                  'additional': '', 'warranty': '12 months', 'cancellation': 'Not accepted',
+                  'penalty': 'None'},
+        'line_items': items,
+        'totals': calculate_totals(items, discount_percent, gst_percent),
+        'created_at': created_at,
+    }
+
+@pytest.fixture
+def store_db(tmp_path):
+    """Point the store at an empty database for the test"""
+    previous = db.get_db_path()
+    db.set_db_path(str(tmp_path / 'quotations.db'))
+    yield
+    db.close_connection()
+    db.set_db_path(previous)
+
+@pytest.fixture
+def make_quotation():
+    """Factory for stored-format quotations (see _quotation)"""
+    return _quotation
@@ -0,0 +1,30 @@
+import io
+import zipfile
+
+import pytest
+
+from utils.batch_export import ExportTooLarge, export_quotations_zip
+
+def test_zip_export(make_quotation):
+    output = io.BytesIO()
+    progress = []
+    quotations = [make_quotation('Q20261017001'), make_quotation('Q20261017002')]
+    count = export_quotations_zip(iter(quotations), output, workers=1,
+                                  progress=lambda done, total: progress.append((done, total)), total=2)
+    assert count == 2
+    assert progress == [(1, 2), (2, 2)]
+    with zipfile.ZipFile(output) as archive:
+        assert archive.namelist() == ['Quotation_Q20261017001.pdf', 'Quotation_Q20261017002.pdf']
+
+def test_zip_export_stops_at_max_bytes(make_quotation):
+    rendered = []
+
+    def quotations():
+        for number in range(1, 10):
+            rendered.append(number)
+            yield make_quotation(f'Q20261017{number:03d}')
+
+    with pytest.raises(ExportTooLarge):
+        export_quotations_zip(quotations(), io.BytesIO(), workers=1, max_bytes=1)
+    # Nothing past the first PDF is rendered
+    assert rendered == [1]
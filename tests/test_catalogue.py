@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from data import catalogue
+from data.catalogue import ProductCatalogue
+
+@pytest.fixture
+def products():
+    return ProductCatalogue(
+        ['BV-15', 'bv-25', 'GV-15', 'ACT-63', 'XBV-15'],
+        ['Ball Valve', 'Ball Valve full bore stainless steel screwed ends', 'Gate Valve',
+         'Pneumatic Actuator', 'Ball Valve'],
+        ['8481', '8481', '8481', '8412', '8481'],
+        [1850, 2950, 6200, 4200, float('nan')],
+        [2, 2, 4, 3, float('nan')],
+    )
+
+def part_numbers(products, rows):
+    return [products.part_no[row] for row in rows]
+
+def test_prefix_matches_part_numbers_only(products):
+    # Case-insensitive, in part number order
+    assert part_numbers(products, products.prefix_rows('bv')) == ['BV-15', 'bv-25']
+    assert part_numbers(products, products.prefix_rows('BV-2')) == ['bv-25']
+    # Substrings of a part number are not prefixes
+    assert products.prefix_rows('15') == []
+    assert products.prefix_rows('bv', limit=1) == [0]
+
+def test_fuzzy_ranks_closest_text_first(products):
+    rows = products.fuzzy_rows('ball valve')
+    # Same words: the shorter text is the closer match, the long one ranks after the other valves
+    assert part_numbers(products, rows)[:2] == ['BV-15', 'XBV-15']
+    assert rows.index(2) < rows.index(1)
+    assert 3 not in rows
+    # A substring of a part number is found by its trigrams
+    assert set(part_numbers(products, products.fuzzy_rows('V-15'))) == {'BV-15', 'GV-15', 'XBV-15'}
+
+def test_search_puts_prefix_matches_first(products):
+    results = products.search('bv-1')
+    assert results[0]['part_no'] == 'BV-15'
+    # Fuzzy matches follow without repeating the prefix matches
+    assert 'XBV-15' in [r['part_no'] for r in results[1:]]
+    assert len({r['part_no'] for r in results}) == len(results)
+    assert products.get('xbv-15') == {'part_no': 'XBV-15', 'description': 'Ball Valve', 'hsn': '8481',
+                                      'list_price': None, 'delivery_weeks': None}
+
+def test_queries_without_known_trigrams_find_nothing(products):
+    assert products.fuzzy_rows('zzzz') == []
+    assert products.search('qq') == []
+    assert products.search('   ') == []
+    assert ProductCatalogue([], [], [], [], []).search('valve') == []
+
+def test_example_price_list(monkeypatch):
+    path = os.path.join(os.path.dirname(catalogue.DEFAULT_CATALOGUE_PATH), 'product_catalogue.example.csv')
+    monkeypatch.setenv('PRODUCT_CATALOGUE_PATH', path)
+    assert catalogue.get_catalogue().get('bv-25nb-ss')['list_price'] == 2950
+    assert catalogue.search_products('solenoid')[0]['part_no'] == 'SOV-522-24V'
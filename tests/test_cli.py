@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import cli
+from utils.batch_export import pdf_filename
+
+def write_ndjson(path, lines):
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+def test_render_file_reports_unreadable_lines(tmp_path, make_quotation):
+    path = write_ndjson(tmp_path / 'batch.ndjson', [
+        json.dumps(make_quotation('Q20261017001')),
+        '{"quote_ref": "Q20261017002", ',
+        json.dumps(make_quotation('Q20261017003')),
+    ])
+    output = tmp_path / 'pdfs'
+    output.mkdir()
+
+    stats = cli.render_file(path, str(output), None, 1)
+    assert (stats['quotations'], stats['failed']) == (3, 1)
+    assert stats['errors'][0].startswith('line 2: not valid JSON')
+    assert sorted(p.name for p in output.iterdir()) == ['Quotation_Q20261017001.pdf', 'Quotation_Q20261017003.pdf']
+
+def test_render_file_reports_records_without_a_quote_ref(tmp_path, make_quotation):
+    missing_ref = make_quotation('Q20261017002')
+    del missing_ref['quote_ref']
+    path = write_ndjson(tmp_path / 'batch.ndjson', [
+        json.dumps(missing_ref),
+        '"not a quotation"',
+        json.dumps(make_quotation('Q20261017003')),
+    ])
+
+    stats = cli.render_file(path, str(tmp_path), None, 1)
+    assert (stats['quotations'], stats['failed']) == (3, 2)
+    assert all(error.startswith('record without a quote_ref: ') for error in stats['errors'])
+    assert (tmp_path / 'Quotation_Q20261017003.pdf').exists()
+
+def test_quote_refs_cannot_leave_the_output_directory(tmp_path, make_quotation):
+    assert pdf_filename({'quote_ref': 'Q20261017001'}) == 'Quotation_Q20261017001.pdf'
+    assert pdf_filename({'quote_ref': '../../x'}) == 'Quotation_x.pdf'
+    assert pdf_filename({'quote_ref': '/etc/x"; y'}) == 'Quotation_etc_x_y.pdf'
+    for quote_ref in ('', '../', None):
+        with pytest.raises(ValueError):
+            pdf_filename({'quote_ref': quote_ref})
+
+    output = tmp_path / 'pdfs'
+    output.mkdir()
+    path = write_ndjson(tmp_path / 'batch.ndjson', [json.dumps(make_quotation('../../escaped'))])
+    stats = cli.render_file(path, str(output), None, 1)
+    assert stats['failed'] == 0
+    assert [p.name for p in output.iterdir()] == ['Quotation_escaped.pdf']
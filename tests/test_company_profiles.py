@@ -0,0 +1,78 @@
+import json
+import sqlite3
+
+import pytest
+
+from data import company_profiles, db
+from data.company_profiles import DEFAULT_PROFILES, PROFILE_FIELDS
+
+def test_new_databases_start_with_the_default_profiles(store_db):
+    profiles = company_profiles.get_profiles()
+    assert list(profiles) == list(DEFAULT_PROFILES)
+    assert profiles['DEVSHRI MARKETING']['email'] == 'sales@devshrimarketing.com'
+    assert set(profiles['MACHT AUTOMATION LLP']) == set(PROFILE_FIELDS)
+    # Shared by every session, so nobody can change them in place
+    with pytest.raises(TypeError):
+        profiles['DEVSHRI MARKETING']['email'] = 'x'
+
+def test_create_update_and_delete(store_db):
+    version = company_profiles.profiles_version()
+    company_profiles.save_profile(' ACME TRADERS ', {'name': 'ACME TRADERS', 'phone': 98200, 'logo': b'png'})
+    assert company_profiles.profiles_version() == version + 1
+    profile = company_profiles.get_profile('ACME TRADERS')
+    # Only the profile fields are kept, as text
+    assert set(profile) == set(PROFILE_FIELDS)
+    assert (profile['phone'], profile['email']) == ('98200', '')
+
+    company_profiles.save_profile('ACME TRADERS', {**profile, 'email': 'sales@acme.example'})
+    assert company_profiles.get_profiles()['ACME TRADERS']['email'] == 'sales@acme.example'
+    assert list(company_profiles.get_profiles())[-1] == 'ACME TRADERS'
+
+    assert company_profiles.delete_profile('ACME TRADERS')
+    assert not company_profiles.delete_profile('ACME TRADERS')
+    # A deleted profile falls back to the first one
+    assert company_profiles.get_profile('ACME TRADERS')['name'] == 'MACHT AUTOMATION LLP'
+
+    with pytest.raises(ValueError):
+        company_profiles.save_profile('  ', {})
+
+def test_last_profile_is_kept(store_db):
+    company_profiles.delete_profile('DEVSHRI MARKETING')
+    with pytest.raises(ValueError):
+        company_profiles.delete_profile('MACHT AUTOMATION LLP')
+    assert list(company_profiles.get_profiles()) == ['MACHT AUTOMATION LLP']
+
+def test_profiles_are_reread_only_when_the_version_changes(store_db):
+    profiles = company_profiles.get_profiles()
+    assert company_profiles.get_profiles() is profiles
+
+    # A save from another process is seen through the version counter
+    other = sqlite3.connect(db.get_db_path())
+    other.execute("UPDATE company_profiles SET data = json_set(data, '$.phone', '022 0000') "
+                  "WHERE profile_name = 'DEVSHRI MARKETING'")
+    other.commit()
+    assert company_profiles.get_profiles() is profiles
+    other.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'profiles_version'")
+    other.commit()
+    other.close()
+
+    reread = company_profiles.get_profiles()
+    assert reread is not profiles
+    assert reread['DEVSHRI MARKETING']['phone'] == '022 0000'
+
+def test_mistyped_seeded_email_is_corrected(tmp_path):
+    path = str(tmp_path / 'old.db')
+    seeded = {**DEFAULT_PROFILES['DEVSHRI MARKETING'], 'email': 'sales@devshrimarketing.com.com'}
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE company_profiles (profile_name TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at TEXT)')
+    conn.execute('INSERT INTO company_profiles VALUES (?, ?, NULL)', ('DEVSHRI MARKETING', json.dumps(seeded)))
+    conn.commit()
+    conn.close()
+
+    previous = db.get_db_path()
+    db.set_db_path(path)
+    try:
+        assert company_profiles.get_profile('DEVSHRI MARKETING')['email'] == 'sales@devshrimarketing.com'
+    finally:
+        db.close_connection()
+        db.set_db_path(previous)
@@ -0,0 +1,61 @@
+import pytest
+import streamlit as st
+
+from data import quotations
+from utils.calculations import calculate_totals
+from utils.line_items import LineItem
+
+@pytest.fixture
+def draft():
+    """An empty draft in a fresh (bare mode) session state"""
+    st.session_state.clear()
+    quotations.init_session_state()
+    yield st.session_state
+    st.session_state.clear()
+
+def assert_matches_full_totals(discount_percent=5, gst_percent=18, interstate=False):
+    # Checked before get_draft_totals, which rebuilds totals whose count is off
+    assert st.session_state.line_item_totals.count == len(st.session_state.current_line_items)
+    running = quotations.get_draft_totals(discount_percent, gst_percent, interstate)
+    full = calculate_totals(st.session_state.current_line_items, discount_percent, gst_percent, interstate)
+    for key in ('subtotal', 'total_discount_amount', 'taxable_amount', 'gst_amount', 'igst_amount', 'total_amount'):
+        assert running[key] == pytest.approx(full[key]), key
+    assert [s['rate'] for s in running['gst_slabs']] == [s['rate'] for s in full['gst_slabs']]
+
+ITEMS = [
+    LineItem('MA-0012', 'Ball Valve', '8481', 2, 1500.0, 4, 0.0, gst_percent=18.0),
+    LineItem('MA-0150', 'Actuator', '8412', 1, 4200.0, 6, 10.0, gst_percent=12.0),
+    LineItem('MA-0200', 'Gasket', '', 10, 35.5, 2, 2.5),
+]
+
+def test_add_and_remove_keep_totals_exact(draft):
+    for item in ITEMS:
+        quotations.add_line_item(item)
+        assert_matches_full_totals()
+
+    removed = quotations.remove_line_item(1)
+    assert removed is ITEMS[1]
+    assert_matches_full_totals()
+    assert_matches_full_totals(interstate=True)
+
+    quotations.remove_line_items([0, 1])
+    assert draft.current_line_items == []
+    assert quotations.get_draft_totals()['total_amount'] == 0
+
+def test_batch_add_and_edit_keep_totals_exact(draft):
+    quotations.add_line_items(ITEMS)
+    assert_matches_full_totals()
+
+    edited = quotations.update_line_item(2, {'qty': 4, 'hsn': '8481'})
+    assert edited.total_price == pytest.approx(4 * 35.5 * 0.975)
+    assert edited.gst_percent == 18
+    assert_matches_full_totals(discount_percent=0)
+
+def test_totals_rebuilt_when_items_change_behind_their_back(draft):
+    quotations.add_line_item(ITEMS[0])
+    draft.current_line_items.append(ITEMS[1])
+    full = calculate_totals(draft.current_line_items)
+    assert quotations.get_draft_totals()['total_amount'] == pytest.approx(full['total_amount'])
+
+    quotations.clear_line_items()
+    assert quotations.get_draft_totals()['subtotal'] == 0
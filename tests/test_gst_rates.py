@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utils.gst_rates import DEFAULT_RATES_PATH, HsnRateTable
+
+@pytest.fixture
+def table():
+    # Nested prefixes, with siblings sorting between a code and its match
+    return HsnRateTable({'84': 18, '8413': 12, '841320': 5, '84132010': 28, '8414': 18, '85': 18, '9': 0})
+
+CASES = [
+    ('8413', 12),            # exact prefix
+    ('84132099', 5),         # longer code, nearest enclosing prefix
+    ('8413.20 10', 28),      # punctuation is ignored
+    ('84139000', 12),        # sorts after 84132010, so the parents are walked
+    ('8499', 18),            # only the chapter matches
+    ('9999', 0),             # a zero rate is a match, not a miss
+    ('7307', None),          # unknown code
+    ('', None),
+    (None, None),
+]
+
+@pytest.mark.parametrize('hsn, rate', CASES)
+def test_lookup_uses_longest_prefix(table, hsn, rate):
+    assert table.lookup(hsn) == rate
+
+def test_lookup_many_agrees_with_lookup(table):
+    codes = [hsn for hsn, _ in CASES] + [84132010.0]
+    rates = table.lookup_many(codes, default=-1)
+    assert rates.tolist() == [table.lookup(hsn, default=-1) for hsn in codes]
+    assert rates[-1] == 28
+
+def test_empty_table_matches_nothing():
+    assert HsnRateTable({}).lookup('8481', default=18) == 18
+    assert np.isnan(HsnRateTable({}).lookup_many(['8481'])).all()
+
+def test_shipped_rate_file():
+    table = HsnRateTable.from_csv(DEFAULT_RATES_PATH)
+    assert table.lookup('84818030') == 18
+    assert table.lookup('84132000') == 5
+    assert table.lookup('84133000') == 18
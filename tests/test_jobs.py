@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from utils.jobs import CANCELLED, DONE, FAILED, QUEUED, TIMED_OUT, JobQueue, QueueFull
+
+def wait_finished(queue, job_id, seconds=5):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'{job_id} did not finish')
+
+def test_runs_jobs_and_reports_failures():
+    queue = JobQueue(max_workers=2)
+    try:
+        done = wait_finished(queue, queue.submit(sum, [1, 2, 3]))
+        assert (done.state, done.result) == (DONE, 6)
+
+        failed = wait_finished(queue, queue.submit(int, 'x'))
+        assert failed.state == FAILED
+        assert failed.error.startswith('ValueError')
+    finally:
+        queue.shutdown()
+
+def test_rejects_jobs_beyond_max_pending():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, max_pending=2)
+    try:
+        queue.submit(release.wait)
+        queue.submit(release.wait)
+        with pytest.raises(QueueFull):
+            queue.submit(release.wait)
+    finally:
+        release.set()
+        queue.shutdown()
+
+def test_time_waiting_for_a_worker_does_not_count_towards_the_timeout():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, default_timeout=0.2)
+    try:
+        blocker = queue.submit(release.wait)
+        waiting = queue.submit(sum, [1, 2], timeout=0.2)
+        time.sleep(0.3)
+        # The running job is overdue, the queued one has not started yet
+        assert queue.get(blocker).state == TIMED_OUT
+        assert queue.get(waiting).state == QUEUED
+        release.set()
+        job = wait_finished(queue, waiting)
+        assert (job.state, job.result) == (DONE, 3)
+    finally:
+        release.set()
+        queue.shutdown()
+
+def test_cancel_a_queued_job():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1)
+    try:
+        queue.submit(release.wait)
+        waiting = queue.submit(sum, [1])
+        assert queue.cancel(waiting)
+        assert queue.get(waiting).state == CANCELLED
+        assert not queue.cancel(waiting)
+    finally:
+        release.set()
+        queue.shutdown()
@@ -0,0 +1,44 @@
+import io
+
+import pandas as pd
+import pytest
+
+from utils.line_item_import import import_line_items, validate_line_items
+
+def sheet(text):
+    return io.StringIO(text)
+
+def test_thousands_separators_and_percent_suffixes():
+    items, errors = import_line_items(sheet(
+        'Part No,Description,HSN Code,Qty,Unit Price,Disc %,Delivery\n'
+        'MA-0012,Ball Valve,8481,"1,200","1,500.50",5%,4\n'
+    ), 'items.csv')
+    assert errors == []
+    item, = items
+    assert (item.qty, item.unit_price, item.discount_percent, item.delivery_weeks) == (1200, 1500.5, 5, 4)
+    assert item.total_price == pytest.approx(1200 * 1500.5 * 0.95)
+    assert item.gst_percent == 18
+
+def test_errors_name_spreadsheet_rows():
+    items, errors = import_line_items(sheet(
+        'part_no,description,qty,unit_price,discount_percent\n'
+        'MA-0012,Ball Valve,2,1500,\n'
+        ',Gasket,abc,35.5,\n'
+        ',,,,\n'
+        'MA-0150,Actuator,1,4200,120%\n'
+    ), 'items.csv')
+    assert [item.part_no for item in items] == ['MA-0012']
+    # The header is row 1 and blank rows keep their place in the numbering
+    assert errors == [
+        (3, 'part_no is required; qty must be a number'),
+        (5, 'discount must be between 0 and 100'),
+    ]
+
+def test_missing_required_columns():
+    frame = pd.DataFrame({'Item Code': ['MA-0012'], 'Rate': ['1500']})
+    with pytest.raises(ValueError, match='Missing required column\\(s\\): description, qty'):
+        validate_line_items(frame)
+
+def test_unknown_file_types_are_refused():
+    with pytest.raises(ValueError, match='.csv or .xlsx'):
+        import_line_items(sheet('part_no\n'), 'items.txt')
@@ -0,0 +1,64 @@
+import copy
+
+import pytest
+
+from utils import pdf_cache
+from utils.pdf_cache import PDFCache, quotation_cache_key
+from utils.pdf_generator import generate_quotation_pdf
+
+@pytest.mark.parametrize('engine', ['platypus', 'canvas'])
+def test_same_quotation_renders_identical_bytes(make_quotation, engine):
+    quotation = make_quotation('Q20261017001')
+    first = generate_quotation_pdf(quotation, engine=engine)
+    assert first.startswith(b'%PDF')
+    assert generate_quotation_pdf(copy.deepcopy(quotation), engine=engine) == first
+
+def counting_render():
+    calls = []
+
+    def render(quotation_data, engine):
+        calls.append(quotation_data['quote_ref'])
+        return generate_quotation_pdf(quotation_data, engine=engine)
+    return render, calls
+
+def test_cache_hits_for_unchanged_quotations(make_quotation):
+    cache = PDFCache()
+    render, calls = counting_render()
+    quotation = make_quotation('Q20261017001')
+
+    first = cache.get_or_render(quotation, render=render)
+    # Only the content counts - a fresh copy with a new timestamp is the same document
+    again = cache.get_or_render({**copy.deepcopy(quotation), 'created_at': '2026-10-18T09:00:00'}, render=render)
+    assert again == first
+    assert (cache.hits, cache.misses, len(calls)) == (1, 1, 1)
+
+def test_cache_misses_after_a_line_item_changes(make_quotation):
+    cache = PDFCache()
+    render, calls = counting_render()
+    quotation = make_quotation('Q20261017001')
+    cache.get_or_render(quotation, render=render)
+
+    changed = copy.deepcopy(quotation)
+    changed['line_items'][1]['qty'] = 2
+    cache.get_or_render(changed, render=render)
+    assert (cache.hits, cache.misses, len(calls)) == (0, 2, 2)
+    assert quotation_cache_key(changed) != quotation_cache_key(quotation)
+
+def test_cache_misses_after_the_layout_version_changes(make_quotation, monkeypatch):
+    cache = PDFCache()
+    render, calls = counting_render()
+    quotation = make_quotation('Q20261017001')
+    cache.get_or_render(quotation, render=render)
+
+    monkeypatch.setattr(pdf_cache, 'PDF_LAYOUT_VERSION', pdf_cache.PDF_LAYOUT_VERSION + 1)
+    cache.get_or_render(quotation, render=render)
+    assert (cache.hits, cache.misses, len(calls)) == (0, 2, 2)
+
+def test_disk_tier_survives_a_new_cache(make_quotation, tmp_path):
+    quotation = make_quotation('Q20261017001')
+    data = PDFCache(disk_dir=str(tmp_path)).get_or_render(quotation)
+
+    render, calls = counting_render()
+    cache = PDFCache(disk_dir=str(tmp_path))
+    assert cache.get_or_render(quotation, render=render) == data
+    assert (cache.hits, calls) == (1, [])
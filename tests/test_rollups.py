@@ -0,0 +1,56 @@
+import pytest
+
+from data import rollups, store
+
+def snapshot():
+    """Every rollup row, keyed by (dimension, key)"""
+    return {(dimension, row['key']): row
+            for dimension in rollups.DIMENSIONS
+            for row in rollups.fetch_rollups(dimension)}
+
+def assert_matches_rebuild():
+    incremental = snapshot()
+    rollups.rebuild_rollups()
+    rebuilt = snapshot()
+    assert incremental.keys() == rebuilt.keys()
+    for group, row in rebuilt.items():
+        for measure in rollups.MEASURES:
+            assert incremental[group][measure] == pytest.approx(row[measure], abs=1e-6), (group, measure)
+
+@pytest.fixture
+def history(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261001001', 'ACME ENGINEERING', '01-Oct-2026'))
+    store.put_quotation(make_quotation('Q20260915001', 'Bharat Pumps', '15-Sep-2026', line_items=[
+        {'part_no': 'MA-0200', 'description': 'Gasket', 'hsn': '4016', 'qty': 10, 'unit_price': 35.5},
+    ]))
+    store.put_quotation(make_quotation('Q20261017001', 'ACME ENGINEERING', discount_percent=5))
+
+def test_saves_add_to_rollups(history):
+    customers = {row['key']: row for row in rollups.fetch_rollups('customer')}
+    assert customers['ACME ENGINEERING']['quotes'] == 2
+    assert customers['Bharat Pumps']['lines'] == 1
+    assert [row['key'] for row in rollups.fetch_rollups('month')] == ['2026-10', '2026-09']
+    assert_matches_rebuild()
+
+def test_rollups_follow_deletes(history):
+    assert store.remove_quotation('Q20260915001')
+    # Groups left without quotations disappear
+    assert 'Bharat Pumps' not in {row['key'] for row in rollups.fetch_rollups('customer')}
+    assert [row['key'] for row in rollups.fetch_rollups('month')] == ['2026-10']
+    assert_matches_rebuild()
+
+def test_rollups_follow_replaced_quotations(history, make_quotation):
+    replacement = make_quotation('Q20261001001', 'Bharat Pumps', '02-Oct-2026', line_items=[
+        {'part_no': 'MA-0200', 'description': 'Gasket', 'hsn': '4016', 'qty': 4, 'unit_price': 35.5},
+    ], created_at='2026-10-18T10:00:00')
+    stats = store.merge_quotations([replacement], on_conflict='update')
+    assert stats['updated'] == 1
+
+    customers = {row['key']: row['quotes'] for row in rollups.fetch_rollups('customer')}
+    assert customers == {'ACME ENGINEERING': 1, 'Bharat Pumps': 2}
+    assert_matches_rebuild()
+
+def test_clear_empties_rollups(history):
+    store.clear_quotations()
+    assert snapshot() == {}
+    assert rollups.rebuild_rollups() == 0
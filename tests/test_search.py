@@ -0,0 +1,77 @@
+import pytest
+
+from data import db, search, store
+
+def indexed_refs():
+    rows = db.get_connection().execute('SELECT quote_ref FROM quotation_search ORDER BY quote_ref')
+    return [row[0] for row in rows]
+
+@pytest.mark.parametrize('query, expression', [
+    ('pune', '"pune"*'),
+    ('MA-0012 valve', '"MA-0012"* AND "valve"*'),
+    # Operators and quotes are searched for literally, never parsed
+    ('ball AND valve', '"ball"* AND "AND"* AND "valve"*'),
+    ('NEAR(ball valve)', '"NEAR(ball"* AND "valve)"*'),
+    ('say "hi', '"say"* AND "hi"*'),
+    ('valve* OR -x', '"valve*"* AND "OR"* AND "-x"*'),
+    ('* " -', None),
+    ('', None),
+    (None, None),
+])
+def test_match_expression_quotes_user_input(query, expression):
+    assert search.match_expression(query) == expression
+
+def test_queries_with_fts_syntax_run(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261017001'))
+    for query in ('ball AND valve', 'NEAR(ball valve)', 'say "hi', 'valve* OR -x', '"', '*'):
+        store.search_summaries(query)
+    assert store.count_search_results('ball AND') == 0
+    assert store.count_search_results('ball valve') == 1
+
+def test_customer_hits_rank_above_description_hits(store_db, make_quotation):
+    item = {'part_no': 'KV-1', 'description': 'Kirloskar pump spares', 'hsn': '8413', 'qty': 1, 'unit_price': 100.0}
+    store.put_quotation(make_quotation('Q20261017001', 'Bharat Pumps', line_items=[item]))
+    store.put_quotation(make_quotation('Q20261016001', 'Kirloskar Brothers', '16-Oct-2026'))
+
+    # The older quotation ranks first on relevance, not on index order
+    results = store.search_summaries('kirloskar')
+    assert [r['quote_ref'] for r in results] == ['Q20261016001', 'Q20261017001']
+
+def test_snippet_marks_the_match(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261017001'))
+    result, = store.search_summaries('actuat')
+    assert '[Actuator]' in result['match']
+    assert store.search_summaries('MA-0150')[0]['match'] == 'MA-0012 [MA-0150]'
+
+def test_index_follows_deletes_and_replacements(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261017001'))
+    store.put_quotation(make_quotation('Q20261017002', 'Bharat Pumps'))
+
+    store.remove_quotation('Q20261017001')
+    assert indexed_refs() == ['Q20261017002']
+
+    store.replace_quotations([make_quotation('Q20261017003', 'Kirloskar Brothers')])
+    assert indexed_refs() == ['Q20261017003']
+    assert store.count_search_results('bharat') == 0
+    assert store.count_search_results('kirloskar') == 1
+
+def test_colliding_doc_ids_use_the_probe_slots(store_db, make_quotation, monkeypatch):
+    # Every reference hashes to the same rowid
+    monkeypatch.setattr(search, 'doc_id', lambda quote_ref, quote_day: 1 << 32)
+    refs = [f'Q20261017{number:03d}' for number in range(1, search.ID_PROBES + 1)]
+    for quote_ref in refs:
+        store.put_quotation(make_quotation(quote_ref, customer=f'Customer {quote_ref}'))
+    assert indexed_refs() == refs
+
+    # Documents are still told apart by their reference
+    store.merge_quotations([make_quotation(refs[3], 'Renamed Customer')], on_conflict='update')
+    assert [r['quote_ref'] for r in store.search_summaries('renamed')] == [refs[3]]
+    store.remove_quotation(refs[0])
+    assert refs[0] not in indexed_refs()
+
+    # A freed slot is reused; with every slot taken the write fails as a whole
+    store.put_quotation(make_quotation('Q20261017100'))
+    with pytest.raises(RuntimeError, match='No free search index slot'):
+        store.put_quotation(make_quotation('Q20261017101'))
+    assert store.fetch_quotation('Q20261017101') is None
+    assert len(indexed_refs()) == search.ID_PROBES
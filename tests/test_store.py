@@ -0,0 +1,167 @@
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from data import db, store
+
+def test_put_and_fetch_quotation(store_db, make_quotation):
+    quotation = make_quotation('Q20261017001')
+    store.put_quotation(quotation)
+
+    assert store.fetch_quotation('Q20261017001') == quotation
+    assert store.fetch_quotation('Q20261017999') is None
+    assert store.count_quotations() == 1
+
+def test_put_never_overwrites_a_stored_quotation(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261017002', 'Imported Customer'))
+
+    with pytest.raises(store.QuotationExists):
+        store.put_quotation(make_quotation('Q20261017002', 'NEW'))
+    assert store.count_quotations() == 1
+    assert store.fetch_quotation('Q20261017002')['client']['name'] == 'Imported Customer'
+    assert store.count_search_results('NEW') == 0
+
+def test_filters_by_customer_and_date(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261001001', 'ACME ENGINEERING', '01-Oct-2026'))
+    store.put_quotation(make_quotation('Q20261015001', 'Bharat Pumps', '15-Oct-2026'))
+    store.put_quotation(make_quotation('Q20261016001', 'acme engineering', '16-Oct-2026'))
+
+    assert store.count_quotations(customer='ACME ENGINEERING') == 2
+    refs = [q['quote_ref'] for q in store.fetch_quotations(date_from='10-Oct-2026')]
+    assert refs == ['Q20261015001', 'Q20261016001']
+    assert [q['quote_ref'] for q in store.fetch_quotations(limit=1, offset=1)] == ['Q20261015001']
+
+def test_remove_and_clear(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261017001'))
+    store.put_quotation(make_quotation('Q20261017002'))
+
+    assert store.remove_quotation('Q20261017001')
+    assert not store.remove_quotation('Q20261017001')
+    assert store.count_quotations() == 1
+
+    store.clear_quotations()
+    assert store.count_quotations() == 0
+
+def test_writes_invalidate_cached_summaries(store_db, make_quotation):
+    store.put_quotation(make_quotation('Q20261017001'))
+    assert store.count_summaries() == 1
+    assert [s['quote_ref'] for s in store.fetch_summaries()] == ['Q20261017001']
+
+    store.clear_quotations()
+    assert store.count_summaries() == 0
+    assert store.fetch_summaries() == ()
+
+def test_summary_columns_added_to_older_databases(tmp_path, make_quotation):
+    path = str(tmp_path / 'old.db')
+    quotation = make_quotation('Q20261017001')
+    # Layout of the quotations table before the summary columns
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE quotations (quote_ref TEXT PRIMARY KEY, quote_day TEXT, '
+                 'customer_name TEXT, created_at TEXT, data TEXT NOT NULL)')
+    conn.execute('INSERT INTO quotations VALUES (?, ?, ?, ?, ?)',
+                 ('Q20261017001', '2026-10-17', 'ACME ENGINEERING', None, json.dumps(quotation)))
+    conn.commit()
+    conn.close()
+
+    previous = db.get_db_path()
+    db.set_db_path(path)
+    try:
+        summary, = store.fetch_summaries()
+        assert summary['total_amount'] == quotation['totals']['total_amount']
+        assert summary['item_count'] == 2
+        # Existing quotations are indexed for search too
+        assert store.count_search_results('valve') == 1
+        assert store.fetch_quotation('Q20261017001') == quotation
+    finally:
+        db.close_connection()
+        db.set_db_path(previous)
+
+def test_allocation_continues_after_stored_references(store_db, make_quotation):
+    assert store.allocate_quote_number('20261017') == 1
+
+    # References of the same day added later by an import, the API or by hand
+    store.merge_quotations([make_quotation('Q20261017002'), make_quotation('Q20261017005')])
+    assert store.allocate_quote_number('20261017') == 6
+    assert store.allocate_quote_number('20261017') == 7
+    assert store.next_quote_ref(datetime(2026, 10, 17)) == 'Q20261017008'
+
+    # Deleting the latest reference never hands its number out again
+    store.remove_quotation('Q20261017005')
+    assert store.allocate_quote_number('20261017') == 9
+    assert store.allocate_quote_number('20261018') == 1
+
+def test_merge_conflict_modes(store_db, make_quotation):
+    store.merge_quotations([make_quotation('Q20261017001', 'Stored', created_at='2026-10-17T10:00:00')])
+
+    older = make_quotation('Q20261017001', 'Older', created_at='2026-10-16T10:00:00')
+    newer = make_quotation('Q20261017001', 'Newer', created_at='2026-10-18T10:00:00')
+
+    stats = store.merge_quotations([older, make_quotation('Q20261017002')], on_conflict='skip')
+    assert (stats['inserted'], stats['updated'], stats['skipped']) == (1, 0, 1)
+    assert store.fetch_quotation('Q20261017001')['client']['name'] == 'Stored'
+
+    stats = store.merge_quotations([older], on_conflict='newer')
+    assert (stats['updated'], stats['skipped']) == (0, 1)
+    stats = store.merge_quotations([newer], on_conflict='newer')
+    assert (stats['updated'], stats['skipped']) == (1, 0)
+    assert store.fetch_quotation('Q20261017001')['client']['name'] == 'Newer'
+
+    stats = store.merge_quotations([older], on_conflict='update')
+    assert stats['updated'] == 1
+    assert store.fetch_quotation('Q20261017001')['client']['name'] == 'Older'
+    assert store.count_quotations() == 2
+    # The search index follows the stored version
+    assert store.count_search_results('Older') == 1
+    assert store.count_search_results('Newer') == 0
+
+    with pytest.raises(ValueError):
+        store.merge_quotations([], on_conflict='overwrite')
+
+def test_merge_counts_invalid_records(store_db, make_quotation):
+    lines = [json.dumps(make_quotation('Q20261017001')), '', '{"quote_ref": "Q20261017002"}', 'not json']
+    stats = store.merge_quotations(lines, parse=json.loads, batch_size=2)
+    assert (stats['inserted'], stats['invalid']) == (1, 2)
+    assert [number for number, _ in stats['errors']] == [3, 4]
+
+def test_malformed_client_fails_only_its_own_record(store_db, make_quotation):
+    bad = {**make_quotation('Q20261017002'), 'client': 'ACME ENGINEERING'}
+    records = [make_quotation('Q20261017001'), bad, make_quotation('Q20261017003')]
+    stats = store.merge_quotations(records)
+    assert (stats['inserted'], stats['invalid']) == (2, 1)
+    assert stats['errors'] == [(2, 'Q20261017002: client must be an object')]
+    assert store.fetch_quotation('Q20261017003') is not None
+
+def test_json_import_reports_rejected_records(store_db, make_quotation):
+    from data import quotations
+
+    records = [make_quotation('Q20261017001'), {'quote_ref': 'Q20261017002'}]
+    result = quotations.import_quotations_json(json.dumps(records))
+    assert (result['inserted'], result['invalid']) == (1, 1)
+    assert result['errors'][0][0] == 2
+
+    result = quotations.import_quotations_json('[{"quote_ref": ')
+    assert (result['inserted'], result['invalid']) == (0, 1)
+    assert store.count_quotations() == 1
+
+def test_quote_sequences_seeded_from_older_databases(tmp_path, make_quotation):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE quotations (quote_ref TEXT PRIMARY KEY, quote_day TEXT, '
+                 'customer_name TEXT, created_at TEXT, data TEXT NOT NULL)')
+    for quote_ref in ('Q20261017004', 'Q20261017012', 'Q20261016001', 'Q20261017-A', 'ENQ-17'):
+        conn.execute('INSERT INTO quotations VALUES (?, ?, ?, ?, ?)',
+                     (quote_ref, '2026-10-17', 'ACME ENGINEERING', None, json.dumps(make_quotation(quote_ref))))
+    conn.commit()
+    conn.close()
+
+    previous = db.get_db_path()
+    db.set_db_path(path)
+    try:
+        assert store.allocate_quote_number('20261017') == 13
+        assert store.allocate_quote_number('20261016') == 2
+        assert store.allocate_quote_number('20261015') == 1
+    finally:
+        db.close_connection()
+        db.set_db_path(previous)
@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.pdf_generator import generate_quotation_pdf
+from utils.calculations import recalculate_quotation
+
+class ExportTooLarge(Exception):
+    """Raised by export_quotations_zip when the PDFs add up to more than max_bytes"""
+
+def default_worker_count():
+    """Number of render processes to use when none is configured"""
+    return os.cpu_count() or 1
+
+# quote_refs come from input files and API requests - anything else could
+# leave the output directory or break a Content-Disposition header
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+def _filename_ref(quotation_data):
+    """quote_ref reduced to file-name-safe characters ('' when there is none)"""
+    quote_ref = quotation_data.get('quote_ref') if isinstance(quotation_data, dict) else None
+    if quote_ref is None:
+        return ''
+    return _UNSAFE_FILENAME_CHARS.sub('_', str(quote_ref)).strip('._')
+
+def pdf_filename(quotation_data):
+    """File name used for a quotation inside an export (ValueError without a usable quote_ref)"""
+    quote_ref = _filename_ref(quotation_data)
+    if not quote_ref:
+        raise ValueError('quote_ref is missing or has no usable characters')
+    return f'Quotation_{quote_ref}.pdf'
+
+def render_quotation(quotation_data, engine='auto'):
+    """Worker entry point: render one quotation to (file name, PDF bytes)"""
+    return pdf_filename(quotation_data), generate_quotation_pdf(quotation_data, engine=engine)
+
+def render_quotation_timed(quotation_data, recalculate=False, engine='auto'):
+    """Worker entry point that also reports render time and failures
+
+    Returns (file name, PDF bytes or None, seconds, error message or None).
+    With recalculate, line amounts and totals are recomputed before rendering.
+    """
+    start = time.perf_counter()
+    # Named up front - the record may be the very thing that is broken
+    quote_ref = _filename_ref(quotation_data)
+    failed_name = f'Quotation_{quote_ref}.pdf' if quote_ref else 'record without a quote_ref'
+    try:
+        if recalculate:
+            quotation_data = recalculate_quotation(quotation_data)
+        filename, pdf_data = render_quotation(quotation_data, engine)
+    except Exception as e:
+        return failed_name, None, time.perf_counter() - start, f'{type(e).__name__}: {e}'
+    return filename, pdf_data, time.perf_counter() - start, None
+
+def create_render_pool(workers=None):
+    """Process pool for PDF rendering"""
+    # Fork is unsafe from Streamlit's multi-threaded server, so start clean workers
+    context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers or default_worker_count(), mp_context=context)
+
+def _drain(executor, quotations, max_pending, render):
+    """Submit quotations with a bounded number in flight, yielding results as they finish"""
+    pending = set()
+    for quotation_data in quotations:
+        pending.add(executor.submit(render, quotation_data))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+def render_quotations_parallel(quotations, workers=None, max_pending=None, render=render_quotation,
+                               executor=None):
+    """Render quotations across a process pool, yielding results as they finish
+
+    Pass an existing executor to reuse one pool across several batches.
+    """
+    workers = workers or default_worker_count()
+
+    # Keep only a few jobs in flight so neither inputs nor PDFs pile up in memory
+    max_pending = max_pending or workers * 2
+
+    if executor is not None:
+        yield from _drain(executor, quotations, max_pending, render)
+        return
+
+    if workers == 1:
+        # No pool overhead for a single worker
+        for quotation_data in quotations:
+            yield render(quotation_data)
+        return
+
+    with create_render_pool(workers) as executor:
+        yield from _drain(executor, quotations, max_pending, render)
+
+def export_quotations_zip(quotations, output, workers=None, progress=None, total=None, max_bytes=None):
+    """Render quotations in parallel and stream the PDFs into a ZIP archive
+
+    output is a path or binary file object; progress(done, total) is called
+    after each PDF is written. Returns the number of PDFs exported. With
+    max_bytes, rendering stops with ExportTooLarge once the PDFs outgrow it.
+    """
+    count = 0
+    size = 0
+    # PDF streams are already compressed - storing keeps the writer off the critical path
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, pdf_data in render_quotations_parallel(quotations, workers):
+            size += len(pdf_data)
+            if max_bytes is not None and size > max_bytes:
+                raise ExportTooLarge(f'PDFs exceed {max_bytes} bytes after {count} quotations')
+            archive.writestr(filename, pdf_data)
+            count += 1
+            if progress:
+                progress(count, total)
+    return count
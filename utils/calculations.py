@@ -1,8 +1,65 @@
-def calculate_totals(line_items, discount_percent=0, gst_percent=18):
-    """Calculate totals for quotation including discount and GST"""
+import numpy as np
+
+from utils import metrics
+
+def _amount_columns(line_items):
+    """total_price and discount_amount arrays for a LineItemTable, LineItem objects or dicts"""
+    # Columnar tables already hold NumPy arrays
+    if isinstance(getattr(line_items, 'total_price', None), np.ndarray):
+        return line_items.total_price, line_items.discount_amount
+
+    count = len(line_items)
+    if count and not isinstance(line_items[0], dict):
+        total_prices = np.fromiter((item.total_price for item in line_items), dtype=np.float64, count=count)
+        discount_amounts = np.fromiter((item.discount_amount or 0 for item in line_items), dtype=np.float64, count=count)
+    else:
+        total_prices = np.fromiter((item['total_price'] for item in line_items), dtype=np.float64, count=count)
+        discount_amounts = np.fromiter((item.get('discount_amount', 0) for item in line_items), dtype=np.float64, count=count)
+    return total_prices, discount_amounts
+
+def _rate_column(line_items, default_rate):
+    """Per-line GST rates, using the quotation's default rate where a line has none"""
+    rates = getattr(line_items, 'gst_percent', None)
+    if isinstance(rates, np.ndarray):
+        return np.where(np.isnan(rates), default_rate, rates)
+
+    count = len(line_items)
+    if count and not isinstance(line_items[0], dict):
+        values = (item.gst_percent for item in line_items)
+    else:
+        values = (item.get('gst_percent') for item in line_items)
+    return np.fromiter((default_rate if v is None else v for v in values), dtype=np.float64, count=count)
+
+def slab_values(total_prices, rates):
+    """{GST rate: summed line value} for every rate present, in one vectorised pass"""
+    slab_rates, inverse = np.unique(rates, return_inverse=True)
+    values = np.bincount(inverse, weights=total_prices, minlength=len(slab_rates))
+    return dict(zip(slab_rates.tolist(), values.tolist()))
+
+@metrics.timed('calc.calculate_totals')
+def calculate_totals(line_items, discount_percent=0, gst_percent=18, interstate=False):
+    """Calculate totals for quotation including discount and GST
+
+    line_items may be a list of dicts, a list of LineItem objects or a LineItemTable.
+    Each line is taxed at its own gst_percent (gst_percent is the default for lines
+    without one). Tax is split into CGST/SGST, or IGST for inter-state supplies.
+    """
+    total_prices, discount_amounts = _amount_columns(line_items)
+    rates = _rate_column(line_items, gst_percent)
     
     # Calculate subtotal (sum of all item totals after individual discounts)
-    subtotal = sum(item['total_price'] for item in line_items)
+    subtotal = float(total_prices.sum())
+    total_item_discounts = float(discount_amounts.sum())
+    
+    return derive_totals(subtotal, total_item_discounts, discount_percent, gst_percent,
+                         slab_values(total_prices, rates), interstate)
+
+def derive_totals(subtotal, total_item_discounts, discount_percent=0, gst_percent=18,
+                  slabs=None, interstate=False):
+    """Derive discount, GST and total amounts from the summed line values
+
+    slabs maps each GST rate to the summed value of its lines (all at gst_percent if omitted).
+    """
     
     # Calculate additional discount on subtotal if specified
     additional_discount_amount = subtotal * (discount_percent / 100)
@@ -10,14 +67,27 @@ def calculate_totals(line_items, discount_percent=0, gst_percent=18):
     # Calculate taxable amount after additional discount
     taxable_amount = subtotal - additional_discount_amount
     
-    # Calculate GST
-    gst_amount = taxable_amount * (gst_percent / 100)
+    # Calculate GST per rate slab - the additional discount reduces every slab in proportion
+    if slabs is None:
+        slabs = {gst_percent: subtotal}
+    gst_slabs = []
+    for rate in sorted(slabs):
+        slab_taxable = slabs[rate] * (1 - discount_percent / 100)
+        slab_gst = slab_taxable * (rate / 100)
+        gst_slabs.append({
+            'rate': rate,
+            'taxable_amount': slab_taxable,
+            'gst_amount': slab_gst,
+            'cgst_amount': 0.0 if interstate else slab_gst / 2,
+            'sgst_amount': 0.0 if interstate else slab_gst / 2,
+            'igst_amount': slab_gst if interstate else 0.0
+        })
+    gst_amount = sum((slab['gst_amount'] for slab in gst_slabs), 0.0)
     
     # Calculate total amount
     total_amount = taxable_amount + gst_amount
     
     # Calculate total discount including item-wise discounts
-    total_item_discounts = sum(item.get('discount_amount', 0) for item in line_items)
     total_discount_amount = total_item_discounts + additional_discount_amount
     
     return {
@@ -28,13 +98,69 @@ def calculate_totals(line_items, discount_percent=0, gst_percent=18):
         'taxable_amount': taxable_amount,
         'gst_percent': gst_percent,
         'gst_amount': gst_amount,
+        'interstate': interstate,
+        'cgst_amount': 0.0 if interstate else gst_amount / 2,
+        'sgst_amount': 0.0 if interstate else gst_amount / 2,
+        'igst_amount': gst_amount if interstate else 0.0,
+        'gst_slabs': gst_slabs,
         'total_amount': total_amount
     }
 
+def line_amounts(line_items, discount_percent=0, gst_percent=18):
+    """Per-line gross, discount, taxable, GST and total amounts (NumPy arrays)
+
+    The quotation discount and GST are apportioned to the lines exactly as
+    calculate_totals applies them, so the lines of any group (e.g. one HSN code)
+    sum to that group's share of the quotation totals.
+    """
+    total_prices, discount_amounts = _amount_columns(line_items)
+    rates = _rate_column(line_items, gst_percent)
+    taxable = total_prices * (1 - discount_percent / 100)
+    gst = taxable * (rates / 100)
+    return {
+        'gross_amount': total_prices + discount_amounts,
+        'discount_amount': discount_amounts + total_prices * (discount_percent / 100),
+        'taxable_amount': taxable,
+        'gst_amount': gst,
+        'total_amount': taxable + gst,
+    }
+
 def format_currency(amount):
     """Format currency in Indian format"""
     return f"₹{amount:,.2f}"
 
-def calculate_line_total(quantity, unit_price):
-    """Calculate total for a single line item"""
-    return quantity * unit_price
+def calculate_line_total(quantity, unit_price, discount_percent=0):
+    """Calculate total for a single line item after its discount"""
+    gross_amount = quantity * unit_price
+    return gross_amount - gross_amount * (discount_percent / 100)
+
+def calculate_line_item_amounts(quantity, unit_price, discount_percent=0):
+    """Calculate discount amount and total price for a line item (scalars or NumPy arrays)"""
+    gross_amount = quantity * unit_price
+    discount_amount = gross_amount * (discount_percent / 100)
+    return discount_amount, gross_amount - discount_amount
+
+def recalculate_quotation(quotation_data):
+    """Return a copy of a quotation with line amounts and totals recomputed"""
+    items = quotation_data.get('line_items', [])
+    count = len(items)
+    
+    # All lines in one vectorised pass
+    quantities = np.fromiter((item['qty'] for item in items), dtype=np.float64, count=count)
+    unit_prices = np.fromiter((item['unit_price'] for item in items), dtype=np.float64, count=count)
+    discount_percents = np.fromiter((item.get('discount_percent', 0) for item in items), dtype=np.float64, count=count)
+    discount_amounts, total_prices = calculate_line_item_amounts(quantities, unit_prices, discount_percents)
+    
+    line_items = [
+        {**item, 'discount_amount': discount_amount, 'total_price': total_price}
+        for item, discount_amount, total_price in zip(items, discount_amounts.tolist(), total_prices.tolist())
+    ]
+    
+    # Keep the quotation's own discount, default GST rate and place of supply
+    previous_totals = quotation_data.get('totals') or {}
+    totals = calculate_totals(line_items,
+                              previous_totals.get('discount_percent', 0),
+                              previous_totals.get('gst_percent', 18),
+                              previous_totals.get('interstate', False))
+
+    return {**quotation_data, 'line_items': line_items, 'totals': totals}
@@ -0,0 +1,104 @@
+import csv
+import os
+import re
+import threading
+from bisect import bisect_right
+
+import numpy as np
+
+# HSN/SAC prefix -> GST rate table shipped with the app (override with HSN_GST_RATES_PATH).
+# Review it whenever GST rates are notified; quotations keep the rate stamped on each line.
+DEFAULT_RATES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'data', 'hsn_gst_rates.csv')
+
+def normalise_hsn(hsn):
+    """Digits of an HSN/SAC code ('8481.80 30' -> '84818030')"""
+    if hsn is None:
+        return ''
+    if isinstance(hsn, float) and hsn.is_integer():
+        # Spreadsheets hand codes over as numbers
+        hsn = int(hsn)
+    return re.sub(r'\D', '', str(hsn))
+
+class HsnRateTable:
+    """Longest-prefix HSN rate lookup on a sorted prefix array with parent pointers"""
+
+    def __init__(self, rates):
+        # rates: {hsn prefix: gst percent}
+        rates = {normalise_hsn(prefix): float(rate) for prefix, rate in rates.items()}
+        prefixes = sorted(rates)
+        self.prefixes = prefixes
+        self.rates = np.array([rates[prefix] for prefix in prefixes], dtype=np.float64)
+        self._prefix_array = np.array(prefixes, dtype=str)
+
+        # parent[i]: nearest shorter prefix of prefixes[i] in the table (-1 if none)
+        self.parents = np.full(len(prefixes), -1, dtype=np.int64)
+        stack = []
+        for i, prefix in enumerate(prefixes):
+            while stack and not prefix.startswith(prefixes[stack[-1]]):
+                stack.pop()
+            if stack:
+                self.parents[i] = stack[-1]
+            stack.append(i)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Load a table with hsn_prefix and gst_percent columns"""
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls({row['hsn_prefix']: row['gst_percent'] for row in csv.DictReader(f)})
+
+    def __len__(self):
+        return len(self.prefixes)
+
+    def lookup(self, hsn, default=None):
+        """GST rate of the longest table prefix of an HSN code"""
+        code = normalise_hsn(hsn)
+        if not code:
+            return default
+
+        # The greatest prefix <= code is the match or a descendant of it
+        index = bisect_right(self.prefixes, code) - 1
+        while index >= 0 and not code.startswith(self.prefixes[index]):
+            index = self.parents[index]
+        return float(self.rates[index]) if index >= 0 else default
+
+    def lookup_many(self, hsn_codes, default=np.nan):
+        """GST rates for many HSN codes at once (default where nothing matches)"""
+        codes = np.array([normalise_hsn(hsn) for hsn in hsn_codes], dtype=str)
+        if not len(codes) or not len(self):
+            return np.full(len(codes), default, dtype=np.float64)
+
+        index = np.searchsorted(self._prefix_array, codes, side='right') - 1
+        # Walk up the parent pointers until each candidate is a prefix of its code
+        pending = index >= 0
+        while pending.any():
+            candidates = self._prefix_array[index[pending]]
+            matched = np.char.startswith(codes[pending], candidates)
+            pending_rows = np.flatnonzero(pending)
+            index[pending_rows[~matched]] = self.parents[index[pending_rows[~matched]]]
+            pending[pending_rows[matched]] = False
+            pending &= index >= 0
+
+        rates = np.full(len(codes), default, dtype=np.float64)
+        found = (index >= 0) & (codes != '')
+        rates[found] = self.rates[index[found]]
+        return rates
+
+_rate_table = None
+_rate_table_path = None
+_rate_table_lock = threading.Lock()
+
+def get_rate_table():
+    """Process-wide HSN rate table (empty if the rate file is missing)"""
+    global _rate_table, _rate_table_path
+    path = os.environ.get('HSN_GST_RATES_PATH', DEFAULT_RATES_PATH)
+    if _rate_table_path != path:
+        with _rate_table_lock:
+            if _rate_table_path != path:
+                _rate_table = HsnRateTable.from_csv(path) if os.path.exists(path) else HsnRateTable({})
+                _rate_table_path = path
+    return _rate_table
+
+def lookup_gst_rate(hsn, default=None):
+    """GST rate for an HSN/SAC code, or default when the table has no matching prefix"""
+    return get_rate_table().lookup(hsn, default)
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TIMED_OUT = 'timed out'
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED, TIMED_OUT)
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when too many jobs are already waiting or running"""
+
+class Job:
+    """State of one background job (read it, JobQueue updates it)"""
+
+    __slots__ = ('id', 'label', 'state', 'submitted_at', 'started_at', 'finished_at',
+                 'timeout', 'result', 'error', 'future')
+
+    def __init__(self, label=None, timeout=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.state = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.timeout = timeout
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    @property
+    def elapsed(self):
+        """Seconds since submission (until finished)"""
+        return (self.finished_at or time.time()) - self.submitted_at
+
+    def __repr__(self):
+        return f'Job({self.id!r}, {self.label!r}, state={self.state!r})'
+
+class JobQueue:
+    """Bounded thread pool running jobs in the background, shared by every session
+
+    submit() returns a job id straight away; callers poll get() until the job is
+    finished. Jobs beyond max_pending are refused with QueueFull (backpressure).
+    A running job cannot be interrupted: cancelling or timing it out marks it
+    finished at once and its result is dropped when it completes.
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, default_timeout=120, result_ttl=600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+        self.result_ttl = result_ttl
+
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, func, *args, label=None, timeout=None, **kwargs):
+        """Queue func(*args, **kwargs), returning the job id (raises QueueFull when saturated)"""
+        with self._lock:
+            self._expire()
+            # Timed out or cancelled jobs still occupy a worker until they return
+            busy = sum(1 for job in self._jobs.values() if not job.future.done())
+            if busy >= self.max_pending:
+                metrics.increment('jobs.rejected')
+                raise QueueFull(f'{busy} jobs are already queued or running')
+
+            job = Job(label, self.default_timeout if timeout is None else timeout)
+            job.future = self._executor.submit(self._run, job, func, args, kwargs)
+            self._jobs[job.id] = job
+        metrics.increment('jobs.submitted')
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        with self._lock:
+            if job.state != QUEUED:
+                return
+            job.state = RUNNING
+            job.started_at = time.time()
+        # Time spent waiting for a worker
+        metrics.observe('jobs.queue_wait', job.started_at - job.submitted_at)
+
+        try:
+            result, error = func(*args, **kwargs), None
+        except Exception as e:
+            result, error = None, f'{type(e).__name__}: {e}'
+
+        with self._lock:
+            # Cancelled or timed out meanwhile - the result is no longer wanted
+            if job.state != RUNNING:
+                return
+            job.state = FAILED if error else DONE
+            metrics.increment(f'jobs.{job.state}')
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        """Current state of a job, or None if it is unknown or expired"""
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job, returning True if it was still unfinished"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.future.cancel()
+            self._finish(job, CANCELLED, 'Cancelled')
+            return True
+
+    def forget(self, job_id):
+        """Drop a job and its result (cancelling it if unfinished)"""
+        self.cancel(job_id)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def stats(self):
+        """Number of known jobs in each state"""
+        with self._lock:
+            self._expire()
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _finish(self, job, state, error=None):
+        metrics.increment(f"jobs.{state.replace(' ', '_')}")
+        job.state = state
+        job.error = error
+        job.result = None
+        job.finished_at = time.time()
+
+    def _expire(self):
+        """Time out jobs running past their timeout and drop finished ones older than result_ttl (lock held)"""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished:
+                if now - job.finished_at > self.result_ttl:
+                    del self._jobs[job_id]
+            # The timeout covers the render only, not the wait for a worker
+            elif job.timeout and job.state == RUNNING and now - job.started_at > job.timeout:
+                job.future.cancel()
+                self._finish(job, TIMED_OUT, f'Timed out after {job.timeout:g} s')
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Process-wide background job queue (sized by QUOTATION_JOB_WORKERS / _QUEUE_SIZE / _TIMEOUT)"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(
+                    max_workers=int(os.environ.get('QUOTATION_JOB_WORKERS', 2)),
+                    max_pending=int(os.environ.get('QUOTATION_JOB_QUEUE_SIZE', 16)),
+                    default_timeout=float(os.environ.get('QUOTATION_JOB_TIMEOUT', 120)),
+                )
+    return _job_queue
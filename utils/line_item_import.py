@@ -0,0 +1,120 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.line_items import LineItemTable
+from utils.gst_rates import get_rate_table
+
+# Accepted spreadsheet headers (lower-cased, punctuation stripped) for each line item field
+COLUMN_ALIASES = {
+    'part_no': ('part_no', 'part no', 'part number', 'item', 'item code', 'item no', 'model'),
+    'description': ('description', 'desc', 'item description'),
+    'hsn': ('hsn', 'hsn code', 'hsn sac'),
+    'qty': ('qty', 'quantity', 'nos'),
+    'unit_price': ('unit_price', 'unit price', 'price', 'rate', 'unit rate'),
+    'discount_percent': ('discount_percent', 'discount', 'discount %', 'disc', 'disc %'),
+    'delivery_weeks': ('delivery_weeks', 'delivery', 'delivery weeks'),
+}
+REQUIRED_COLUMNS = ('part_no', 'description', 'qty', 'unit_price')
+
+# HSN/SAC codes are 4, 6 or 8 digits
+HSN_PATTERN = r'^\d{4}(?:\d{2}){0,2}$'
+
+def _header_key(header):
+    """Normalise a spreadsheet header for alias lookup"""
+    return ' '.join(re.sub(r'[^a-z0-9%]+', ' ', str(header).lower()).split())
+
+def normalise_columns(frame):
+    """Rename known header variants to line item field names, dropping other columns"""
+    lookup = {_header_key(alias): field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    renamed = {}
+    for column in frame.columns:
+        field = lookup.get(_header_key(column))
+        if field and field not in renamed.values():
+            renamed[column] = field
+    frame = frame[list(renamed)].rename(columns=renamed)
+
+    missing = [field for field in REQUIRED_COLUMNS if field not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    return frame
+
+def read_line_item_file(file, filename=None):
+    """Read a CSV or XLSX upload into a DataFrame of raw (string) cells"""
+    name = (filename or getattr(file, 'name', '') or '').lower()
+    # Everything is read as text, validation converts the numeric columns
+    if name.endswith(('.xlsx', '.xlsm')):
+        frame = pd.read_excel(file, dtype=str, engine='openpyxl')
+    elif name.endswith('.csv'):
+        frame = pd.read_csv(file, dtype=str, skipinitialspace=True)
+    else:
+        raise ValueError('Upload a .csv or .xlsx file')
+    return frame
+
+def _text_column(frame, field):
+    if field not in frame.columns:
+        return pd.Series('', index=frame.index)
+    return frame[field].fillna('').astype(str).str.strip()
+
+def _number_column(frame, field):
+    """Numeric values, NaN where blank; also a mask of cells that are filled but not numbers"""
+    if field not in frame.columns:
+        blank = pd.Series(np.nan, index=frame.index)
+        return blank, pd.Series(False, index=frame.index)
+    raw = frame[field].fillna('').astype(str).str.strip().str.replace(',', '', regex=False)
+    raw = raw.str.rstrip('%')
+    values = pd.to_numeric(raw, errors='coerce')
+    return values, values.isna() & (raw != '')
+
+def validate_line_items(frame):
+    """Validate a sheet of line items with column-wise checks
+
+    Returns (valid line item dicts with amounts computed, [(sheet row, error message)]).
+    Sheet rows are numbered as in the spreadsheet, the header being row 1.
+    """
+    frame = normalise_columns(frame).reset_index(drop=True)
+    # Skip rows that are completely empty (trailing rows of a spreadsheet)
+    frame = frame[~frame.isna().all(axis=1)]
+
+    part_no = _text_column(frame, 'part_no')
+    description = _text_column(frame, 'description')
+    # Excel stores codes as numbers, so '8481.0' is read back as '8481'
+    hsn = _text_column(frame, 'hsn').str.replace(r'\.0+$', '', regex=True)
+    qty, qty_invalid = _number_column(frame, 'qty')
+    unit_price, price_invalid = _number_column(frame, 'unit_price')
+    discount, discount_invalid = _number_column(frame, 'discount_percent')
+    delivery, delivery_invalid = _number_column(frame, 'delivery_weeks')
+    discount = discount.fillna(0.0)
+
+    checks = [
+        (part_no == '', 'part_no is required'),
+        (description == '', 'description is required'),
+        ((hsn != '') & ~hsn.str.match(HSN_PATTERN), 'HSN must be 4, 6 or 8 digits'),
+        (qty_invalid | qty.isna(), 'qty must be a number'),
+        (qty <= 0, 'qty must be greater than 0'),
+        (price_invalid | unit_price.isna(), 'unit price must be a number'),
+        (unit_price <= 0, 'unit price must be greater than 0'),
+        (discount_invalid, 'discount must be a number'),
+        ((discount < 0) | (discount > 100), 'discount must be between 0 and 100'),
+        (delivery_invalid | (delivery < 1) | (delivery % 1 > 0), 'delivery must be a whole number of weeks'),
+    ]
+
+    invalid = pd.Series(False, index=frame.index)
+    messages = {}
+    for failed, message in checks:
+        invalid |= failed
+        # Only the failing rows are visited
+        for row in failed.index[failed.to_numpy()]:
+            messages.setdefault(row, []).append(message)
+    errors = [(int(row) + 2, '; '.join(messages[row])) for row in sorted(messages)]
+
+    valid = ~invalid.to_numpy()
+    table = LineItemTable(part_no[valid], description[valid], hsn[valid], qty[valid],
+                          unit_price[valid], delivery[valid], discount[valid],
+                          gst_percent=get_rate_table().lookup_many(hsn[valid]))
+    return table.to_line_items(), errors
+
+def import_line_items(file, filename=None):
+    """Read and validate an uploaded CSV/XLSX sheet of line items"""
+    return validate_line_items(read_line_item_file(file, filename))
@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+from utils.calculations import calculate_line_item_amounts, derive_totals
+
+# Field order shared by LineItem and LineItemTable
+TEXT_FIELDS = ('part_no', 'description', 'hsn')
+NUMERIC_FIELDS = ('qty', 'unit_price', 'delivery_weeks', 'discount_percent', 'discount_amount', 'total_price',
+                  'gst_percent')
+
+class LineItem:
+    """Compact single line item (slots instead of a per-item dict)"""
+
+    __slots__ = TEXT_FIELDS + NUMERIC_FIELDS
+
+    def __init__(self, part_no, description, hsn, qty, unit_price, delivery_weeks=None,
+                 discount_percent=0.0, discount_amount=None, total_price=None, gst_percent=None):
+        self.part_no = part_no
+        self.description = description
+        self.hsn = hsn
+        self.qty = qty
+        self.unit_price = unit_price
+        self.delivery_weeks = delivery_weeks
+        self.discount_percent = discount_percent
+
+        # Derive the amounts unless they are supplied (e.g. loaded from a saved quotation)
+        if discount_amount is None or total_price is None:
+            discount_amount, total_price = calculate_line_item_amounts(qty, unit_price, discount_percent)
+        self.discount_amount = discount_amount
+        self.total_price = total_price
+        # Line GST rate (None - the quotation's default rate applies)
+        self.gst_percent = gst_percent
+
+    @classmethod
+    def from_dict(cls, item):
+        """Build from the dict format stored in quotations"""
+        return cls(item['part_no'], item['description'], item.get('hsn', ''), item['qty'],
+                   item['unit_price'], item.get('delivery_weeks'), item.get('discount_percent', 0),
+                   item.get('discount_amount'), item.get('total_price'), item.get('gst_percent'))
+
+    def to_dict(self):
+        """Convert to the dict format stored in quotations"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f'LineItem({self.part_no!r}, qty={self.qty}, total_price={self.total_price})'
+
+class LineItemTable:
+    """Column-oriented line items with NumPy arrays for the numeric fields"""
+
+    __slots__ = TEXT_FIELDS + NUMERIC_FIELDS
+
+    def __init__(self, part_no, description, hsn, qty, unit_price, delivery_weeks,
+                 discount_percent, discount_amount=None, total_price=None, gst_percent=None):
+        self.part_no = list(part_no)
+        self.description = list(description)
+        self.hsn = list(hsn)
+        self.qty = np.asarray(qty, dtype=np.float64)
+        self.unit_price = np.asarray(unit_price, dtype=np.float64)
+        self.delivery_weeks = np.asarray(delivery_weeks, dtype=np.float64)
+        self.discount_percent = np.asarray(discount_percent, dtype=np.float64)
+        # NaN where the quotation's default GST rate applies
+        if gst_percent is None:
+            self.gst_percent = np.full(len(self.qty), np.nan)
+        else:
+            self.gst_percent = np.asarray(gst_percent, dtype=np.float64)
+
+        if discount_amount is None or total_price is None:
+            self.compute_amounts()
+        else:
+            self.discount_amount = np.asarray(discount_amount, dtype=np.float64)
+            self.total_price = np.asarray(total_price, dtype=np.float64)
+
+    @classmethod
+    def from_items(cls, line_items, recompute=False):
+        """Build from line item dicts or LineItem objects"""
+        if isinstance(line_items, LineItemTable):
+            return line_items
+
+        items = [item.to_dict() if isinstance(item, LineItem) else item for item in line_items]
+        count = len(items)
+
+        def column(field, default=0.0):
+            values = (item.get(field, default) for item in items)
+            return np.fromiter((default if v is None else v for v in values), dtype=np.float64, count=count)
+
+        table = cls(
+            [item['part_no'] for item in items],
+            [item['description'] for item in items],
+            [item.get('hsn', '') for item in items],
+            column('qty'),
+            column('unit_price'),
+            column('delivery_weeks', np.nan),
+            column('discount_percent'),
+            None if recompute else column('discount_amount'),
+            None if recompute else column('total_price'),
+            column('gst_percent', np.nan),
+        )
+        return table
+
+    def compute_amounts(self):
+        """Recompute discount amounts and totals for every line in one vectorised pass"""
+        self.discount_amount, self.total_price = calculate_line_item_amounts(
+            self.qty, self.unit_price, self.discount_percent)
+
+    def __len__(self):
+        return len(self.qty)
+
+    def subtotal(self):
+        return float(self.total_price.sum())
+
+    def item_discount_total(self):
+        return float(self.discount_amount.sum())
+
+    def to_line_items(self):
+        """Convert to LineItem objects, the representation of a draft's lines"""
+        items = []
+        columns = zip(self.part_no, self.description, self.hsn,
+                      self.qty.tolist(), self.unit_price.tolist(), self.delivery_weeks.tolist(),
+                      self.discount_percent.tolist(), self.discount_amount.tolist(), self.total_price.tolist(),
+                      self.gst_percent.tolist())
+        for part_no, description, hsn, qty, unit_price, delivery_weeks, discount_percent, discount_amount, total_price, gst_percent in columns:
+            items.append(LineItem(
+                part_no, description, hsn,
+                # Whole quantities print as '2 Nos', not '2.0 Nos'
+                int(qty) if qty.is_integer() else qty,
+                unit_price,
+                None if delivery_weeks != delivery_weeks else int(delivery_weeks),
+                discount_percent, discount_amount, total_price,
+                None if gst_percent != gst_percent else gst_percent,
+            ))
+        return items
+
+    def to_dicts(self):
+        """Convert back to the dict format stored in quotations"""
+        return [item.to_dict() for item in self.to_line_items()]
+
+class RunningTotals:
+    """Subtotal, item-discount total, line count and per-GST-rate values of LineItem objects, maintained in O(1) per add/delete"""
+
+    __slots__ = ('subtotal', 'item_discounts', 'count', 'slabs')
+
+    def __init__(self):
+        self.reset()
+
+    @classmethod
+    def from_items(cls, line_items):
+        """Build from existing LineItem objects (one O(n) pass)"""
+        running = cls()
+        for item in line_items:
+            running.add(item)
+        return running
+
+    def reset(self):
+        self.subtotal = 0.0
+        self.item_discounts = 0.0
+        self.count = 0
+        # {line GST rate (None for the default rate): [summed value, line count]}
+        self.slabs = {}
+
+    def add(self, item):
+        """Account for a LineItem that was appended"""
+        self.subtotal += item.total_price
+        self.item_discounts += item.discount_amount or 0
+        self.count += 1
+        slab = self.slabs.setdefault(item.gst_percent, [0.0, 0])
+        slab[0] += item.total_price
+        slab[1] += 1
+
+    def extend(self, items):
+        """Account for a batch of appended LineItem objects"""
+        for item in items:
+            self.add(item)
+
+    def remove(self, item):
+        """Account for a LineItem that was deleted"""
+        self.count -= 1
+        if self.count <= 0:
+            # Drop accumulated floating point residue once the draft is empty
+            self.reset()
+            return
+        self.subtotal -= item.total_price
+        self.item_discounts -= item.discount_amount or 0
+        rate = item.gst_percent
+        slab = self.slabs[rate]
+        slab[1] -= 1
+        if slab[1] == 0:
+            del self.slabs[rate]
+        else:
+            slab[0] -= item.total_price
+
+    def totals(self, discount_percent=0, gst_percent=18, interstate=False):
+        """Same dict as calculate_totals, derived from the running values"""
+        slabs = {}
+        for rate, (value, _) in self.slabs.items():
+            rate = gst_percent if rate is None else rate
+            slabs[rate] = slabs.get(rate, 0.0) + value
+        return derive_totals(self.subtotal, self.item_discounts, discount_percent, gst_percent,
+                             slabs, interstate)
+
+# Columns shown in the line item grid editor, in display order
+EDITOR_COLUMNS = ['part_no', 'description', 'hsn', 'gst_percent', 'delivery_weeks', 'qty',
+                  'unit_price', 'discount_percent', 'total_price']
+EDITABLE_COLUMNS = ['part_no', 'description', 'hsn', 'gst_percent', 'delivery_weeks', 'qty',
+                    'unit_price', 'discount_percent']
+
+def items_page_frame(line_items, start, stop):
+    """DataFrame of one page of LineItem objects for the grid editor, indexed by item position"""
+    page = line_items[start:stop]
+    frame = pd.DataFrame({column: [getattr(item, column) for item in page] for column in EDITOR_COLUMNS},
+                         columns=EDITOR_COLUMNS, index=range(start, start + len(page)))
+    frame.insert(0, 'sr', frame.index + 1)
+    frame['delete'] = False
+    return frame
+
+def _cell_value(value):
+    """Convert a pandas cell back to a plain Python value"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def changed_rows(original, edited):
+    """{item position: {field: new value}} for rows edited in the grid (vectorised compare)"""
+    before = original[EDITABLE_COLUMNS]
+    after = edited[EDITABLE_COLUMNS]
+    differs = (before != after) & ~(before.isna() & after.isna())
+    rows = differs.any(axis=1)
+
+    changes = {}
+    for position in rows[rows].index:
+        columns = differs.columns[differs.loc[position]]
+        changes[int(position)] = {column: _cell_value(edited.at[position, column]) for column in columns}
+    return changes
@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image as PILImage
+
+# Printed size of the logo in the PDF header and the resolution it is prepared at
+LOGO_WIDTH_INCHES = 1.5
+LOGO_HEIGHT_INCHES = 1
+LOGO_DPI = 200
+
+JPEG_QUALITY = 90
+
+# Prepared logos by content hash (of the upload and of the prepared image itself)
+_MAX_CACHED_LOGOS = 32
+_prepared = OrderedDict()
+_prepared_lock = threading.Lock()
+
+def logo_bytes(logo):
+    """Get raw bytes from a logo (UploadedFile, BytesIO or bytes)"""
+    if not logo:
+        return b''
+    if isinstance(logo, (bytes, bytearray)):
+        return bytes(logo)
+    return logo.getvalue()
+
+def _encode_logo(data):
+    """Downscale an image to the printed logo size and encode it compactly"""
+    with PILImage.open(BytesIO(data)) as image:
+        image.load()
+        size = (round(LOGO_WIDTH_INCHES * LOGO_DPI), round(LOGO_HEIGHT_INCHES * LOGO_DPI))
+
+        # Stretched to the box exactly as the PDF prints it
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB').resize(size, PILImage.LANCZOS)
+
+        png = BytesIO()
+        image.save(png, format='PNG', optimize=True, dpi=(LOGO_DPI, LOGO_DPI))
+        if has_alpha:
+            return png.getvalue()
+
+        # JPEGs are embedded by reportlab as-is; flat logos are usually smaller as PNG
+        jpeg = BytesIO()
+        image.save(jpeg, format='JPEG', quality=JPEG_QUALITY, optimize=True, dpi=(LOGO_DPI, LOGO_DPI))
+        return min(png.getvalue(), jpeg.getvalue(), key=len)
+
+def prepare_logo(logo):
+    """Logo bytes ready for embedding, processed once per distinct image"""
+    data = logo_bytes(logo)
+    if not data:
+        return b''
+
+    key = hashlib.sha256(data).hexdigest()
+    with _prepared_lock:
+        if key in _prepared:
+            _prepared.move_to_end(key)
+            return _prepared[key]
+
+    prepared = _encode_logo(data)
+
+    with _prepared_lock:
+        # Prepared images map to themselves so passing one in again is free
+        _prepared[key] = prepared
+        _prepared[hashlib.sha256(prepared).hexdigest()] = prepared
+        while len(_prepared) > _MAX_CACHED_LOGOS:
+            _prepared.popitem(last=False)
+    return prepared
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket catches the rest
+BUCKET_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Off unless QUOTATION_METRICS is set (or switched on from the Diagnostics page)
+_enabled = os.environ.get('QUOTATION_METRICS', '').lower() not in ('', '0', 'false', 'no')
+
+# Returned by timer() while metrics are off, so a disabled hook allocates nothing
+_NULL_TIMER = nullcontext()
+
+class Histogram:
+    """Count, sum, extremes and bucketed distribution of timings in milliseconds"""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        # A linear scan beats bisect for a couple of dozen buckets
+        index = 0
+        for bound in BUCKET_BOUNDS_MS:
+            if ms <= bound:
+                break
+            index += 1
+        self.buckets[index] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of timings (capped at max)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return max(min(bound, self.max), self.min)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'min_ms': self.min if self.count else 0.0,
+            'max_ms': self.max,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': self.buckets[:],
+        }
+
+class MetricsRegistry:
+    """Process-wide timers and counters, shared by every session"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+        self.started_at = time.time()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = Histogram()
+            histogram.add(seconds * 1000)
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """Plain-dict copy of everything recorded so far"""
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'taken_at': time.time(),
+                'bucket_bounds_ms': list(BUCKET_BOUNDS_MS),
+                'timers': {name: h.to_dict() for name, h in sorted(self.timers.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.started_at = time.time()
+
+_registry = MetricsRegistry()
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _registry.observe(self.name, time.perf_counter() - self.start)
+
+def is_enabled():
+    return _enabled
+
+def set_enabled(enabled):
+    """Turn recording on or off for the whole process"""
+    global _enabled
+    _enabled = bool(enabled)
+
+def timer(name):
+    """Context manager recording how long a block takes (a shared no-op while disabled)"""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+def timed(name):
+    """Decorator recording the duration of every call under name"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _registry.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def observe(name, seconds):
+    """Record a duration measured elsewhere"""
+    if _enabled:
+        _registry.observe(name, seconds)
+
+def increment(name, value=1):
+    """Add to a counter"""
+    if _enabled:
+        _registry.increment(name, value)
+
+def snapshot():
+    return _registry.snapshot()
+
+def reset():
+    _registry.reset()
+
+def export_json():
+    """Current metrics as a JSON document"""
+    return json.dumps({'enabled': _enabled, **snapshot()}, indent=2)
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from utils.pdf_generator import generate_quotation_pdf, PDF_LAYOUT_VERSION
+from utils.logo import logo_bytes
+from utils import metrics
+
+# Keys that never affect the rendered document
+_IGNORED_KEYS = ('created_at', 'company_logo')
+
+def quotation_cache_key(quotation_data, engine='platypus'):
+    """Stable content hash of a quotation, its logo and the rendering engine"""
+    canonical = json.dumps(
+        {k: v for k, v in quotation_data.items() if k not in _IGNORED_KEYS},
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=str,
+    )
+
+    digest = hashlib.sha256()
+    digest.update(f'v{PDF_LAYOUT_VERSION}:{engine}\0'.encode())
+    digest.update(canonical.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(logo_bytes(quotation_data.get('company_logo')))
+    return digest.hexdigest()
+
+class PDFCache:
+    """Two-tier (memory LRU + optional disk) cache of rendered quotation PDFs"""
+
+    def __init__(self, max_entries=128, max_memory_bytes=64 * 1024 * 1024,
+                 disk_dir=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+
+        # key -> size of files on disk, oldest first (loaded lazily)
+        self._disk_index = None
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    # Memory tier
+
+    def _remember(self, key, data):
+        """Add to the memory tier, evicting least recently used entries"""
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # Disk tier
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.pdf')
+
+    def _load_disk_index(self):
+        """Scan the cache directory once, ordering entries by modification time"""
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        entries.sort()
+
+        self._disk_index = OrderedDict((key, size) for _, key, size in entries)
+        self._disk_bytes = sum(self._disk_index.values())
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        if self._disk_index is None:
+            self._load_disk_index()
+        if key not in self._disk_index:
+            return None
+
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Removed by another process sharing the directory
+            self._disk_bytes -= self._disk_index.pop(key)
+            return None
+
+        # Refresh recency for size-based eviction
+        self._disk_index.move_to_end(key)
+        try:
+            os.utime(self._disk_path(key))
+        except OSError:
+            pass
+        return data
+
+    def _write_disk(self, key, data):
+        if self.disk_dir is None or len(data) > self.max_disk_bytes:
+            return
+        if self._disk_index is None:
+            self._load_disk_index()
+
+        # Write to a temporary file first so readers never see a partial PDF
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._disk_path(key))
+
+        self._disk_bytes -= self._disk_index.pop(key, 0)
+        self._disk_index[key] = len(data)
+        self._disk_bytes += len(data)
+
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            evicted, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._disk_path(evicted))
+            except FileNotFoundError:
+                pass
+
+    # Public API
+
+    def get(self, key):
+        """Get cached PDF bytes or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+            data = self._read_disk(key)
+            if data is not None:
+                self._remember(key, data)
+            return data
+
+    def put(self, key, data):
+        """Store PDF bytes in both tiers"""
+        with self._lock:
+            self._remember(key, data)
+            self._write_disk(key, data)
+
+    def get_or_render(self, quotation_data, engine='platypus', render=generate_quotation_pdf):
+        """Return the cached PDF for a quotation, rendering it on a miss"""
+        key = quotation_cache_key(quotation_data, engine)
+        data = self.get(key)
+        if data is not None:
+            with self._lock:
+                self.hits += 1
+            metrics.increment('pdf_cache.hits')
+            return data
+
+        with self._lock:
+            self.misses += 1
+        metrics.increment('pdf_cache.misses')
+        data = render(quotation_data, engine=engine)
+        self.put(key, data)
+        return data
+
+    def clear(self):
+        """Drop every cached PDF from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self.disk_dir is not None:
+                if self._disk_index is None:
+                    self._load_disk_index()
+                for key in list(self._disk_index):
+                    try:
+                        os.remove(self._disk_path(key))
+                    except FileNotFoundError:
+                        pass
+                self._disk_index.clear()
+                self._disk_bytes = 0
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+def get_pdf_cache():
+    """Process-wide PDF cache (disk tier enabled by QUOTATION_PDF_CACHE_DIR)"""
+    global _pdf_cache
+    if _pdf_cache is None:
+        with _pdf_cache_lock:
+            if _pdf_cache is None:
+                _pdf_cache = PDFCache(
+                    max_entries=int(os.environ.get('QUOTATION_PDF_CACHE_ENTRIES', 128)),
+                    disk_dir=os.environ.get('QUOTATION_PDF_CACHE_DIR') or None,
+                    max_disk_bytes=int(os.environ.get('QUOTATION_PDF_CACHE_DISK_MB', 512)) * 1024 * 1024,
+                )
+    return _pdf_cache
+
+def get_quotation_pdf(quotation_data, engine='auto'):
+    """Generate a quotation PDF, reusing the cached bytes when nothing changed"""
+    return get_pdf_cache().get_or_render(quotation_data, engine)
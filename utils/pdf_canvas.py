@@ -0,0 +1,260 @@
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.platypus import Paragraph
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from utils.pdf_styles import get_style_set, get_palette
+from utils import metrics
+from utils.pdf_generator import (build_front_matter, build_back_matter, line_item_row,
+                                 summary_rows, LINE_ITEM_COL_WIDTHS, LINE_ITEM_HEADERS)
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 0.5*inch
+
+# SimpleDocTemplate frames are inset by 6pt padding on every side
+FRAME_PADDING = 6
+FRAME_LEFT = MARGIN + FRAME_PADDING
+FRAME_TOP = PAGE_HEIGHT - MARGIN - FRAME_PADDING
+FRAME_BOTTOM = MARGIN + FRAME_PADDING
+FRAME_WIDTH = PAGE_WIDTH - 2*(MARGIN + FRAME_PADDING)
+
+# Cell metrics matching the platypus line item table
+FONT_NAME = 'Helvetica'
+BOLD_FONT_NAME = 'Helvetica-Bold'
+FONT_SIZE = 8
+LEADING = 12
+PADDING_X = 6
+PADDING_Y = 3
+HEADER_PADDING_TOP = 8
+HEADER_PADDING_BOTTOM = 12
+
+# Column alignment: Sr. centre, description left, HSN centre, numbers right
+COLUMN_ALIGNMENT = ['CENTER', 'LEFT', 'CENTER', 'RIGHT', 'RIGHT', 'RIGHT', 'RIGHT']
+
+class _CanvasPage:
+    """Tracks the drawing position and page breaks on a reportlab canvas"""
+
+    def __init__(self, canv):
+        self.canv = canv
+        self.y = FRAME_TOP
+
+    @property
+    def remaining(self):
+        return self.y - FRAME_BOTTOM
+
+    def new_page(self):
+        self.canv.showPage()
+        self.y = FRAME_TOP
+
+    @property
+    def at_top(self):
+        return self.y == FRAME_TOP
+
+    def draw_flowable(self, flowable):
+        """Draw a platypus flowable, splitting it or moving to a new page when it does not fit"""
+        pending = [flowable]
+        while pending:
+            flowable = pending.pop(0)
+            space_before = flowable.getSpaceBefore()
+            available = self.remaining - space_before
+            width, height = flowable.wrapOn(self.canv, FRAME_WIDTH, available)
+
+            if height <= available or (self.at_top and not pending):
+                # Fits (or can never fit) - draw it here
+                self.y -= space_before
+                self._place(flowable, width, height)
+                self.y -= flowable.getSpaceAfter()
+                continue
+
+            parts = flowable.split(FRAME_WIDTH, available) if available > 0 else []
+            if len(parts) > 1:
+                # Draw what fits, continue with the rest on the next page
+                first = parts[0]
+                width, height = first.wrapOn(self.canv, FRAME_WIDTH, available)
+                self.y -= space_before
+                self._place(first, width, height)
+                self.new_page()
+                pending[:0] = parts[1:]
+            elif self.at_top:
+                self._place(flowable, width, height)
+            else:
+                self.new_page()
+                pending.insert(0, flowable)
+
+    def _place(self, flowable, width, height):
+        # Centre wide tables the way SimpleDocTemplate does
+        x = FRAME_LEFT
+        if getattr(flowable, 'hAlign', 'LEFT') in ('CENTER', 'CENTRE'):
+            x += (FRAME_WIDTH - width) / 2
+        flowable.drawOn(self.canv, x, self.y - height)
+        self.y -= height
+
+class _LineItemTable:
+    """Draws line item rows straight onto the canvas with a fixed page-break rule"""
+
+    def __init__(self, page, style_set, palette):
+        self.page = page
+        self.canv = page.canv
+        self.table_width = sum(LINE_ITEM_COL_WIDTHS)
+        self.x0 = FRAME_LEFT + (FRAME_WIDTH - self.table_width) / 2
+
+        # Column edges, computed once
+        self.edges = [self.x0]
+        for width in LINE_ITEM_COL_WIDTHS:
+            self.edges.append(self.edges[-1] + width)
+
+        self.accent = colors.HexColor(palette['accent'])
+        self.grid = colors.HexColor(palette['grid'])
+        self.summary_background = colors.HexColor(palette['summary_background'])
+
+        # Header paragraphs are wrapped once and redrawn on every page
+        self.header_cells = []
+        header_height = 0
+        for label, width in zip(LINE_ITEM_HEADERS, LINE_ITEM_COL_WIDTHS):
+            para = Paragraph(label, style_set.header_wrapped)
+            w, h = para.wrap(width - 2*PADDING_X, PAGE_HEIGHT)
+            self.header_cells.append((para, w, h))
+            header_height = max(header_height, h)
+        self.header_height = header_height + HEADER_PADDING_TOP + HEADER_PADDING_BOTTOM
+
+        self.segment_top = None
+
+    def _row_height(self, lines):
+        return lines*LEADING + 2*PADDING_Y
+
+    def _start_segment(self):
+        """Draw the header row at the current position"""
+        canv = self.canv
+        top = self.page.y
+        bottom = top - self.header_height
+
+        canv.setFillColor(self.accent)
+        canv.rect(self.x0, bottom, self.table_width, self.header_height, stroke=0, fill=1)
+
+        content_height = self.header_height - HEADER_PADDING_TOP - HEADER_PADDING_BOTTOM
+        for (para, w, h), left, right in zip(self.header_cells, self.edges, self.edges[1:]):
+            x = left + (right - left - w) / 2
+            y = bottom + HEADER_PADDING_BOTTOM + (content_height - h) / 2
+            para.drawOn(canv, x, y)
+
+        self.segment_top = top
+        self.page.y = bottom
+        self._hline(bottom)
+        self._hline(top)
+        canv.setFont(FONT_NAME, FONT_SIZE)
+        canv.setFillColor(colors.black)
+
+    def _hline(self, y):
+        self.canv.setStrokeColor(self.grid)
+        self.canv.setLineWidth(1)
+        self.canv.line(self.x0, y, self.x0 + self.table_width, y)
+
+    def _end_segment(self):
+        """Close the table on this page with the vertical grid lines"""
+        canv = self.canv
+        canv.setStrokeColor(self.grid)
+        canv.setLineWidth(1)
+        for x in self.edges:
+            canv.line(x, self.segment_top, x, self.page.y)
+        self.segment_top = None
+
+    def _ensure_room(self, height):
+        if self.segment_top is None:
+            if self.page.remaining < self.header_height + height:
+                self.page.new_page()
+            self._start_segment()
+        elif self.page.remaining < height:
+            self._end_segment()
+            self.page.new_page()
+            self._start_segment()
+
+    def draw_row(self, cells, background=None, bold=False):
+        """Draw one row, starting a new page first when it does not fit"""
+        canv = self.canv
+        lines = [str(cell).split('\n') for cell in cells]
+        height = self._row_height(max(len(cell_lines) for cell_lines in lines))
+        self._ensure_room(height)
+
+        top = self.page.y
+        bottom = top - height
+
+        if background is not None:
+            canv.setFillColor(background)
+            canv.rect(self.x0, bottom, self.table_width, height, stroke=0, fill=1)
+            canv.setFillColor(colors.black)
+        # One text object per row keeps the emitted operators (and their cost) small
+        font_name = BOLD_FONT_NAME if bold else FONT_NAME
+        text = canv.beginText()
+        text.setFont(font_name, FONT_SIZE)
+        for cell_lines, align, left, right in zip(lines, COLUMN_ALIGNMENT, self.edges, self.edges[1:]):
+            # Vertically centred like VALIGN MIDDLE in the platypus table
+            y = bottom + (height + len(cell_lines)*LEADING) / 2 - FONT_SIZE
+            for line in cell_lines:
+                if not line:
+                    y -= LEADING
+                    continue
+                if align == 'LEFT':
+                    x = left + PADDING_X
+                elif align == 'RIGHT':
+                    x = right - PADDING_X - stringWidth(line, font_name, FONT_SIZE)
+                else:
+                    x = (left + right - stringWidth(line, font_name, FONT_SIZE)) / 2
+                text.setTextOrigin(x, y)
+                text.textOut(line)
+                y -= LEADING
+        canv.drawText(text)
+
+        self.page.y = bottom
+        self._hline(bottom)
+
+    def draw_summary_row(self, label, value):
+        """Draw a discount/GST/total row"""
+        self.draw_row(['', '', '', '', '', label, value], background=self.summary_background, bold=True)
+
+    def finish(self):
+        if self.segment_top is not None:
+            self._end_segment()
+
+def render_quotation_canvas(quotation_data):
+    """Render a quotation by drawing line items straight onto a canvas
+
+    Line items are consumed one at a time (any iterable works), so memory stays
+    flat and layout cost is linear in the number of rows.
+    """
+    buffer = BytesIO()
+    # Fixed creation date and document ID, as in the platypus engine
+    canv = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+
+    branding = quotation_data.get('company', {}).get('branding', 'default')
+    with metrics.timer('pdf.style_setup'):
+        style_set = get_style_set(branding)
+    page = _CanvasPage(canv)
+
+    with metrics.timer('pdf.canvas_draw'):
+        # Header, party details and greeting (a handful of flowables)
+        for flowable in build_front_matter(quotation_data, style_set):
+            page.draw_flowable(flowable)
+
+        table = _LineItemTable(page, style_set, get_palette(branding))
+        for idx, item in enumerate(quotation_data['line_items'], 1):
+            table.draw_row(line_item_row(idx, item))
+        for label, value in summary_rows(quotation_data['totals']):
+            table.draw_summary_row(label, value)
+        table.finish()
+
+        # Terms, footer and signature
+        for flowable in build_back_matter(quotation_data, style_set):
+            page.draw_flowable(flowable)
+
+    with metrics.timer('pdf.canvas_save'):
+        canv.showPage()
+        canv.save()
+
+    pdf_data = buffer.getvalue()
+    buffer.close()
+
+    return pdf_data
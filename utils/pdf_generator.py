@@ -1,58 +1,37 @@
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT, TA_JUSTIFY
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, Image, PageBreak
+from reportlab.lib.enums import TA_RIGHT, TA_LEFT, TA_JUSTIFY
 from io import BytesIO
 import os
+from utils.pdf_styles import get_style_set
+from utils.logo import prepare_logo, LOGO_WIDTH_INCHES, LOGO_HEIGHT_INCHES
+from utils import metrics
 
-def generate_quotation_pdf(quotation_data):
-    """Generate a professional quotation PDF"""
-    
-    # Create a buffer to hold the PDF
-    buffer = BytesIO()
-    
-    # Create the PDF document with reduced margins
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=0.5*inch,
-        leftMargin=0.5*inch,
-        topMargin=0.5*inch,
-        bottomMargin=0.5*inch
-    )
-    
-    # Container for the 'Flowable' objects
+# Bump when the rendered layout changes so cached PDFs are invalidated
+PDF_LAYOUT_VERSION = 4
+
+# Line item table layout shared by the platypus and canvas engines
+LINE_ITEM_COL_WIDTHS = [0.4*inch, 2.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 1*inch]
+LINE_ITEM_HEADERS = ['Sr.', 'Item Description', 'HSN/SAC Code', 'Quantity/UOM', 'Rate', 'Discount', 'Total']
+
+# Quotations with more line items than this use the canvas engine when engine='auto'
+CANVAS_ENGINE_THRESHOLD = 1000
+
+# Usable frame inside the 0.5 inch margins (SimpleDocTemplate frames add 6pt padding per side)
+FRAME_WIDTH = A4[0] - 2*(0.5*inch + 6)
+FRAME_HEIGHT = A4[1] - 2*(0.5*inch + 6)
+
+# Item row metrics of the line item table (8pt text, 12pt leading, 3pt vertical padding)
+ROW_LEADING = 12
+ROW_PADDING = 3
+HEADER_ROW_PADDING = 8 + 12
+
+def build_front_matter(quotation_data, style_set):
+    """Flowables above the line item table (header, title, party details, greeting)"""
     elements = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#2563EB'),
-        fontName='Helvetica-Bold'
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12,
-        textColor=colors.HexColor('#1E293B')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=6,
-        textColor=colors.HexColor('#1E293B')
-    )
+    normal_style = style_set.normal
+    title_style = style_set.title
     
     # Header Section - Company info aligned to top-right
     header_company_info = f"""
@@ -70,9 +49,9 @@ def generate_quotation_pdf(quotation_data):
     logo_element = "[LOGO PLACEHOLDER]"
     if 'company_logo' in quotation_data and quotation_data['company_logo']:
         try:
-            # If logo data is available, create an Image element from BytesIO
-            logo_buffer = BytesIO(quotation_data['company_logo'].getvalue())
-            logo_element = Image(logo_buffer, width=1.5*inch, height=1*inch)
+            # Downscaled print-size image, prepared once per distinct logo
+            logo_buffer = BytesIO(prepare_logo(quotation_data['company_logo']))
+            logo_element = Image(logo_buffer, width=LOGO_WIDTH_INCHES*inch, height=LOGO_HEIGHT_INCHES*inch)
         except Exception as e:
             logo_element = "[LOGO]"
     
@@ -82,12 +61,7 @@ def generate_quotation_pdf(quotation_data):
     ]
     
     header_table = Table(header_data, colWidths=[2*inch, 2*inch, 3.5*inch])
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
+    header_table.setStyle(style_set.header_table)
     
     elements.append(header_table)
     elements.append(Spacer(1, 20))
@@ -121,10 +95,7 @@ def generate_quotation_pdf(quotation_data):
     ]
     
     party_quote_table = Table(party_quote_data, colWidths=[3*inch, 1*inch, 3*inch])
-    party_quote_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
+    party_quote_table.setStyle(style_set.party_quote_table)
     
     elements.append(party_quote_table)
     elements.append(Spacer(1, 20))
@@ -140,97 +111,126 @@ def generate_quotation_pdf(quotation_data):
     elements.append(greeting)
     elements.append(Spacer(1, 20))
     
-    # Line Items Table with updated structure and better formatting
-    # Create wrapped headers to prevent overflow
-    header_style_wrapped = ParagraphStyle(
-        'HeaderWrapped',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.whitesmoke,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    line_items_data = [
-        [
-            Paragraph('Sr.', header_style_wrapped),
-            Paragraph('Item Description', header_style_wrapped),
-            Paragraph('HSN/SAC Code', header_style_wrapped),
-            Paragraph('Quantity/UOM', header_style_wrapped),
-            Paragraph('Rate', header_style_wrapped),
-            Paragraph('Discount', header_style_wrapped),
-            Paragraph('Total', header_style_wrapped)
-        ]
+    return elements
+
+def line_item_row(idx, item):
+    """Table cells for one line item"""
+    # Combine part_no and description
+    item_description = f"{item['part_no']}\n{item['description']}"
+    if item.get('delivery_weeks'):
+        item_description += f"\nDelivery: {item['delivery_weeks']} weeks"
+    
+    # Format quantity with proper UOM
+    qty_formatted = f"{item['qty']} No" if item['qty'] == 1 else f"{item['qty']} Nos"
+    
+    # Get item discount from data
+    item_discount = item.get('discount_percent', 0)
+    
+    return [
+        str(idx),
+        item_description,
+        item['hsn'],
+        qty_formatted,
+        f"{item['unit_price']:,.2f}",
+        f"{item_discount:,.1f}%" if item_discount > 0 else "0",
+        f"{item['total_price']:,.2f}"
     ]
-    
-    for idx, item in enumerate(quotation_data['line_items'], 1):
-        # Combine part_no and description
-        item_description = f"{item['part_no']}\n{item['description']}"
-        if item.get('delivery_weeks'):
-            item_description += f"\nDelivery: {item['delivery_weeks']} weeks"
-        
-        # Format quantity with proper UOM
-        qty_formatted = f"{item['qty']} No" if item['qty'] == 1 else f"{item['qty']} Nos"
-        
-        # Get item discount from data
-        item_discount = item.get('discount_percent', 0)
-        
-        line_items_data.append([
-            str(idx),
-            item_description,
-            item['hsn'],
-            qty_formatted,
-            f"{item['unit_price']:,.2f}",
-            f"{item_discount:,.1f}%" if item_discount > 0 else "0",
-            f"{item['total_price']:,.2f}"
-        ])
+
+def summary_rows(totals):
+    """(label, value) rows printed below the line items"""
+    rows = []
     
     # Add discount row if applicable
-    if quotation_data['totals']['discount_amount'] > 0:
-        line_items_data.append(['', '', '', '', '', 'Discount:', f"-{quotation_data['totals']['discount_amount']:,.2f}"])
-    
-    # Add GST row
-    line_items_data.append(['', '', '', '', '', 'GST (18%):', f"{quotation_data['totals']['gst_amount']:,.2f}"])
+    if totals['discount_amount'] > 0:
+        rows.append(('Discount:', f"-{totals['discount_amount']:,.2f}"))
+    
+    # Add GST rows - one per rate slab, split into CGST/SGST or IGST
+    gst_slabs = totals.get('gst_slabs')
+    if gst_slabs is None:
+        # Quotations saved before per-line GST rates have one rate
+        rows.append((f"GST ({totals.get('gst_percent', 18):g}%):", f"{totals['gst_amount']:,.2f}"))
+    for slab in gst_slabs or []:
+        if not slab['rate']:
+            continue
+        if totals.get('interstate'):
+            rows.append((f"IGST {slab['rate']:g}%:", f"{slab['igst_amount']:,.2f}"))
+        else:
+            rows.append((f"CGST {slab['rate'] / 2:g}%:", f"{slab['cgst_amount']:,.2f}"))
+            rows.append((f"SGST {slab['rate'] / 2:g}%:", f"{slab['sgst_amount']:,.2f}"))
     
     # Add total row
-    line_items_data.append(['', '', '', '', '', 'Total Amount:', f"{quotation_data['totals']['total_amount']:,.2f}"])
-    
-    line_items_table = Table(line_items_data, colWidths=[0.4*inch, 2.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 1*inch], repeatRows=1)
-    line_items_table.setStyle(TableStyle([
-        # Header styling
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563EB')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        
-        # Data rows styling - remove background color
-        ('ALIGN', (0, 1), (0, -4), 'CENTER'),  # Sr. number center
-        ('ALIGN', (1, 1), (1, -4), 'LEFT'),    # Item description left
-        ('ALIGN', (2, 1), (2, -4), 'CENTER'),  # HSN center
-        ('ALIGN', (3, 1), (3, -4), 'RIGHT'),   # Quantity right
-        ('ALIGN', (4, 1), (4, -4), 'RIGHT'),   # Rate right
-        ('ALIGN', (5, 1), (5, -4), 'RIGHT'),   # Discount right
-        ('ALIGN', (6, 1), (6, -4), 'RIGHT'),   # Total right
-        
-        # Summary rows styling
-        ('BACKGROUND', (0, -3), (-1, -1), colors.HexColor('#F8FAFC')),
-        ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
-        ('ALIGN', (5, -3), (5, -1), 'RIGHT'),   # Summary labels right
-        ('ALIGN', (6, -3), (6, -1), 'RIGHT'),   # Summary values right
-        
-        # General styling
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0')),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('PADDING', (0, 0), (-1, -1), 6),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('WORDWRAP', (0, 0), (-1, -1), True),
-    ]))
-    
-    elements.append(line_items_table)
-    elements.append(Spacer(1, 20))
+    rows.append(('Total Amount:', f"{totals['total_amount']:,.2f}"))
+    return rows
+
+def row_height(cells):
+    """Height of an item row - string cells never wrap, so it depends only on line count"""
+    lines = max(str(cell).count('\n') + 1 for cell in cells)
+    return lines*ROW_LEADING + 2*ROW_PADDING
+
+def flowables_height(flowables):
+    """Upper bound of the vertical space a list of flowables takes"""
+    total = 0
+    for flowable in flowables:
+        _, height = flowable.wrap(FRAME_WIDTH, FRAME_HEIGHT)
+        total += flowable.getSpaceBefore() + height + flowable.getSpaceAfter()
+    return total
+
+def paginate_rows(rows, header_height, first_page_space, page_space=FRAME_HEIGHT):
+    """Cut item rows into chunks that each fit one page under a header row
+
+    Returns a list of (rows, row_heights) chunks.
+    """
+    chunks = []
+    chunk_rows, chunk_heights = [], []
+    space = first_page_space - header_height
+    for cells in rows:
+        height = row_height(cells)
+        if chunk_rows and height > space:
+            chunks.append((chunk_rows, chunk_heights))
+            chunk_rows, chunk_heights = [], []
+            space = page_space - header_height
+        chunk_rows.append(cells)
+        chunk_heights.append(height)
+        space -= height
+    if chunk_rows or not chunks:
+        chunks.append((chunk_rows, chunk_heights))
+    return chunks
+
+def build_line_item_tables(line_items, style_set, first_page_space):
+    """Page-sized line item tables (each with its own header) separated by page breaks"""
+    header_cells = [Paragraph(label, style_set.header_wrapped) for label in LINE_ITEM_HEADERS]
+    header_height = max(
+        cell.wrap(width - 12, FRAME_HEIGHT)[1] for cell, width in zip(header_cells, LINE_ITEM_COL_WIDTHS)
+    ) + HEADER_ROW_PADDING
+
+    # Start on a fresh page when not even the header and one row fit on the first one
+    if first_page_space < header_height + 3*ROW_LEADING + 2*ROW_PADDING:
+        first_page_space = FRAME_HEIGHT
+
+    rows = (line_item_row(idx, item) for idx, item in enumerate(line_items, 1))
+    elements = []
+    for chunk_rows, chunk_heights in paginate_rows(rows, header_height, first_page_space):
+        if elements:
+            elements.append(PageBreak())
+        # Known row heights spare the table from measuring every cell
+        table = Table([header_cells] + chunk_rows, colWidths=LINE_ITEM_COL_WIDTHS,
+                      rowHeights=[header_height] + chunk_heights, repeatRows=1)
+        table.setStyle(style_set.line_items_table)
+        elements.append(table)
+    return elements
+
+def build_summary_table(totals, style_set):
+    """Discount, GST and total rows as a separate flowable below the items"""
+    summary_data = [['', '', '', '', '', label, value] for label, value in summary_rows(totals)]
+    summary_table = Table(summary_data, colWidths=LINE_ITEM_COL_WIDTHS)
+    summary_table.setStyle(style_set.summary_table)
+    return summary_table
+
+def build_back_matter(quotation_data, style_set):
+    """Flowables below the line item table (terms, footer, signature)"""
+    elements = [Spacer(1, 20)]
+    normal_style = style_set.normal
+    header_style = style_set.header
     
     # Terms and Conditions
     terms_header = Paragraph("Terms & Conditions", header_style)
@@ -274,8 +274,56 @@ def generate_quotation_pdf(quotation_data):
     signature_para = Paragraph(signature_text, normal_style)
     elements.append(signature_para)
     
+    return elements
+
+@metrics.timed('pdf.generate_quotation_pdf')
+def generate_quotation_pdf(quotation_data, engine='platypus'):
+    """Generate a professional quotation PDF
+
+    engine selects the renderer: 'platypus' (default), 'canvas' for very large
+    quotations, or 'auto' to pick canvas above CANVAS_ENGINE_THRESHOLD items.
+    """
+    if engine == 'auto':
+        line_items = quotation_data['line_items']
+        engine = 'canvas' if len(line_items) > CANVAS_ENGINE_THRESHOLD else 'platypus'
+    if engine == 'canvas':
+        from utils.pdf_canvas import render_quotation_canvas
+        return render_quotation_canvas(quotation_data)
+    if engine != 'platypus':
+        raise ValueError(f"Unknown PDF engine: {engine}")
+    
+    # Create a buffer to hold the PDF
+    buffer = BytesIO()
+    
+    # Create the PDF document with reduced margins
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=0.5*inch,
+        leftMargin=0.5*inch,
+        topMargin=0.5*inch,
+        bottomMargin=0.5*inch,
+        # Fixed creation date and document ID so identical quotations give identical bytes
+        invariant=1
+    )
+    
+    # Look up shared styles for the company's branding profile
+    with metrics.timer('pdf.style_setup'):
+        style_set = get_style_set(quotation_data.get('company', {}).get('branding', 'default'))
+    
+    with metrics.timer('pdf.flowables'):
+        # Container for the 'Flowable' objects
+        elements = build_front_matter(quotation_data, style_set)
+        
+        # Line Items - paginated up front into page-sized tables so layout cost stays linear
+        first_page_space = FRAME_HEIGHT - flowables_height(elements)
+        elements.extend(build_line_item_tables(quotation_data['line_items'], style_set, first_page_space))
+        elements.append(build_summary_table(quotation_data['totals'], style_set))
+        elements.extend(build_back_matter(quotation_data, style_set))
+    
     # Build PDF
-    doc.build(elements)
+    with metrics.timer('pdf.doc_build'):
+        doc.build(elements)
     
     # Get PDF data
     pdf_data = buffer.getvalue()
@@ -0,0 +1,143 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.platypus import TableStyle
+from reportlab.lib.enums import TA_CENTER
+
+# Colour schemes per company branding profile
+BRANDING_PROFILES = {
+    'default': {
+        'accent': '#2563EB',
+        'text': '#1E293B',
+        'grid': '#E2E8F0',
+        'summary_background': '#F8FAFC',
+    },
+}
+
+StyleSet = namedtuple('StyleSet', [
+    'title', 'header', 'normal', 'header_wrapped',
+    'header_table', 'party_quote_table', 'line_items_table', 'summary_table',
+])
+
+def register_branding(name, **palette):
+    """Add or update a branding profile (unspecified colours fall back to the default)"""
+    BRANDING_PROFILES[name] = {**BRANDING_PROFILES['default'], **palette}
+    get_style_set.cache_clear()
+
+def get_palette(branding='default'):
+    """Colour palette of a branding profile"""
+    return BRANDING_PROFILES.get(branding, BRANDING_PROFILES['default'])
+
+@lru_cache(maxsize=None)
+def _sample_styles():
+    """Shared reportlab sample stylesheet (built once per process)"""
+    return getSampleStyleSheet()
+
+@lru_cache(maxsize=None)
+def get_style_set(branding='default'):
+    """Paragraph and table styles for a branding profile, built once and reused"""
+    palette = get_palette(branding)
+    accent = colors.HexColor(palette['accent'])
+    text = colors.HexColor(palette['text'])
+    styles = _sample_styles()
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=accent,
+        fontName='Helvetica-Bold'
+    )
+
+    header_style = ParagraphStyle(
+        'CustomHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=text
+    )
+
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=6,
+        textColor=text
+    )
+
+    # Wrapped line item headers to prevent overflow
+    header_style_wrapped = ParagraphStyle(
+        'HeaderWrapped',
+        parent=styles['Normal'],
+        fontSize=9,
+        textColor=colors.whitesmoke,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    header_table_style = TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+        ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
+        ('PADDING', (0, 0), (-1, -1), 8),
+    ])
+
+    party_quote_table_style = TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('PADDING', (0, 0), (-1, -1), 8),
+    ])
+
+    # Line item chunks hold only the header and item rows, so the style fits any row count
+    line_items_table_style = TableStyle([
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), accent),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TOPPADDING', (0, 0), (-1, 0), 8),
+        
+        # Data rows styling - remove background color
+        ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Sr. number center
+        ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Item description left
+        ('ALIGN', (2, 1), (2, -1), 'CENTER'),  # HSN center
+        ('ALIGN', (3, 1), (3, -1), 'RIGHT'),   # Quantity right
+        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),   # Rate right
+        ('ALIGN', (5, 1), (5, -1), 'RIGHT'),   # Discount right
+        ('ALIGN', (6, 1), (6, -1), 'RIGHT'),   # Total right
+        
+        # General styling
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor(palette['grid'])),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('PADDING', (0, 0), (-1, -1), 6),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('WORDWRAP', (0, 0), (-1, -1), True),
+    ])
+
+    # Discount, GST and total rows, laid out as their own table below the items
+    summary_table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor(palette['summary_background'])),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('ALIGN', (5, 0), (5, -1), 'RIGHT'),   # Summary labels right
+        ('ALIGN', (6, 0), (6, -1), 'RIGHT'),   # Summary values right
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor(palette['grid'])),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('PADDING', (0, 0), (-1, -1), 6),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+
+    return StyleSet(
+        title=title_style,
+        header=header_style,
+        normal=normal_style,
+        header_wrapped=header_style_wrapped,
+        header_table=header_table_style,
+        party_quote_table=party_quote_table_style,
+        line_items_table=line_items_table_style,
+        summary_table=summary_table_style,
+    )